@@ -2,34 +2,159 @@ import json
 import os
 import traceback
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import WebDriverException, InvalidSessionIdException, NoSuchWindowException, TimeoutException, StaleElementReferenceException
-from webdriver_manager.chrome import ChromeDriverManager
-import time
+import sys
+import asyncio
+import contextvars
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend_common"))
+from driver_resolver import create_chrome_service
+from profile_template import is_prepared
+from page_waits import EventWait, wait_until, wait_for_dom_quiet, wait_for_network_idle
+from async_cdp import SET_VALUE_SCRIPT
+from gotin_config import get_section
+from xhr_recorder import CALL_RECORDER_SCRIPT, READ_CALLS_SCRIPT, RECORDING_DEFAULTS, CallRecorder
+from engine_validation import engine_validator
+from sechem_engine import SechemEngine, threshold_table
+from tier_resolver import TierResolver
 class BenGurionUniversity:
     """
     Class for handling Ben Gurion University admission calculations.
     Includes built-in browser interaction functionality.
     """
 
-    def __init__(self, service=None, chrome_options=None):
-        # Initialize service immediately like TelAvivUniversity does
-        self.service = Service(ChromeDriverManager().install())
+    # Subjects that count for the science bonus, besides math
+    SCIENCE_SUBJECTS = [
+        "ביוטכנולוגיה", "ביולוגיה", "בקרת מכונות", "כימיה", "כימיה טכנולוגית",
+        "מדעי החיים והחקלאות", "מדעי המחשב", "מידע ונתונים", "מערכות ביוטכנולוגיות",
+        "ניתוח נתונים", "ע. גמר בתכנות ותכנון מער'", "תכנון ותכנות מערכות",
+        "פיסיקה", "פיזיקה"
+    ]
+
+    # Adds the subject rows and sets each row's react-select, units and grade in one round trip. The
+    # select is set by calling the onChange of the react-select component, found by walking up the React
+    # fiber of its input, with the option whose label matches the subject. Nothing is touched when React
+    # can't be reached (returns null), and every row is read back, so the caller types only what failed
+    REACT_ROWS_SCRIPT = SET_VALUE_SCRIPT + """
+        var done = arguments[arguments.length - 1];
+        var rows = arguments[0];
+        function sleep(ms) { return new Promise(function(resolve) { setTimeout(resolve, ms); }); }
+        function containers() { return document.querySelectorAll('.user-field'); }
+        function selectInput(container) {
+            return container ? container.querySelector('input[id^="react-select-"]') : null;
+        }
+        function selectProps(node) {
+            var key = Object.keys(node).find(function(k) {
+                return k.indexOf('__reactFiber$') === 0 || k.indexOf('__reactInternalInstance$') === 0;
+            });
+            for (var fiber = key ? node[key] : null; fiber; fiber = fiber.return) {
+                var props = fiber.memoizedProps;
+                if (props && typeof props.onChange === 'function' && Array.isArray(props.options)) { return props; }
+            }
+            return null;
+        }
+        function findOption(options, subject) {
+            var flat = [];
+            options.forEach(function(o) { if (Array.isArray(o.options)) { flat = flat.concat(o.options); } else { flat.push(o); } });
+            function label(o) { return String(o.label).trim(); }
+            return flat.find(function(o) { return label(o) === subject; })
+                || flat.find(function(o) { return label(o).indexOf(subject) !== -1; }) || null;
+        }
+        function rowInputs(container, idx) {
+            var simple = container ? container.querySelectorAll('input.simple-input') : [];
+            return [document.getElementById('item_' + idx + '_level') || simple[0],
+                    document.getElementById('item_' + idx + '_grade') || simple[1]];
+        }
+        (async function() {
+            var probe = document.querySelector('input[id^="react-select-"]');
+            if (!probe || !selectProps(probe)) { return null; }
+
+            // Add the missing rows, each click waits for its row before the next one
+            var needed = Math.max.apply(null, rows.map(function(row) { return row[0]; })) + 1;
+            while (containers().length < needed) {
+                var button = document.querySelector('.add-subject');
+                var before = containers().length;
+                if (!button) { break; }
+                button.click();
+                for (var tries = 0; containers().length === before && tries < 40; tries++) { await sleep(50); }
+                if (containers().length === before) { break; }
+            }
+
+            var list = containers();
+            var chosen = {}, failedSelects = [], failedInputs = [];
+            rows.forEach(function(row) {
+                var idx = row[0], container = list[idx];
+                try {
+                    var props = selectProps(selectInput(container));
+                    var option = props && findOption(props.options, row[1]);
+                    if (!option) { throw new Error('no option'); }
+                    props.onChange(option, {action: 'select-option', option: option, name: props.name});
+                    chosen[idx] = String(option.label).trim();
+                } catch (e) { failedSelects.push(idx); }
+                try {
+                    var inputs = rowInputs(container, idx);
+                    if (!setValue(inputs[0], row[2]) || !setValue(inputs[1], row[3])) { failedInputs.push(idx); }
+                } catch (e) { failedInputs.push(idx); }
+            });
+
+            // Let React render the new state, then read every row back
+            await sleep(0);
+            list = containers();
+            rows.forEach(function(row) {
+                var idx = row[0], container = list[idx];
+                if (idx in chosen) {
+                    var shown = container && container.querySelector('.react-select__single-value');
+                    if (!shown || shown.textContent.trim() !== chosen[idx]) { failedSelects.push(idx); }
+                }
+                if (failedInputs.indexOf(idx) === -1) {
+                    var inputs = rowInputs(container, idx);
+                    if (!inputs[0] || !inputs[1] || inputs[0].value !== row[2] || inputs[1].value !== row[3]) { failedInputs.push(idx); }
+                }
+            });
+            return {rows: containers().length, selects: failedSelects, inputs: failedInputs};
+        })().then(done, function(e) { done({error: String(e)}); });
+    """
+
+    def __init__(self, service=None, chrome_options=None, pool=None):
+        # Use the injected service, or one for the process-wide resolved chromedriver
+        self.service = service if service is not None else create_chrome_service()
         
         # Store chrome options
         self.chrome_options = chrome_options
         
+        # Pool of warm drivers shared by the backend (None when running standalone)
+        self.pool = pool
+        
         # Initialize WebDriver attributes
         self.driver = None
         self.wait = None
         
         # Set base URL
         self.base_url = "https://www.bgu.ac.il/welcome/ba/calculator/"
+
+        # Records the JSON calls of the calculator's iframe, its backend isn't documented
+        self.recorder = CallRecorder(get_section("bgu_call_recording", RECORDING_DEFAULTS),
+                                     os.path.join(os.path.dirname(os.path.abspath(__file__)), "calcprod_calls.json"),
+                                     "calcprod")
+
+        # In-process average and sechem, read against the per-degree thresholds the browser runs teach
+        self.engine = SechemEngine(self.SCIENCE_SUBJECTS)
+        self.thresholds = threshold_table(
+            self.engine.config["threshold_file"] or os.path.join(os.path.dirname(os.path.abspath(__file__)), "sechem_thresholds.json"),
+            self.engine.config["thresholds"])
+        self.average_validator = engine_validator("bgu_average")
+        # The engine's verdicts against the calculator's acceptance list, the sechem formula is only checked there
+        self.verdict_validator = engine_validator("bgu_verdicts")
+
+        # The average the browser flow read from the calculator, to check the engine's against
+        self.calculated_average = None
+
+        # The tiers that answered this request's steps, reported in the response
+        self.tiers = TierResolver("bgu")
         
     def start_browser(self, wait_time=15):
         if self.driver is None:
@@ -43,18 +168,29 @@ class BenGurionUniversity:
                 self.chrome_options.add_argument("--no-sandbox")
                 self.chrome_options.add_argument("--disable-dev-shm-usage")
             
-            # Initialize driver using the service we created in __init__
-            self.driver = webdriver.Chrome(service=self.service, options=self.chrome_options)
-            self.wait = WebDriverWait(self.driver, wait_time)
+            # Lease a warm driver from the pool, or start one using the service we created in __init__
+            if self.pool is not None:
+                self.driver = self.pool.acquire(step="calculator")
+            else:
+                self.driver = webdriver.Chrome(service=self.service, options=self.chrome_options)
+            self.wait = EventWait(self.driver, wait_time)
     
-    def close_browser(self):
+    def close_browser(self, discard=False):
     
         if self.driver:
-            self.driver.quit()
+            # Hand a pooled driver back instead of quitting it, a failed run discards it
+            if self.pool is not None:
+                self.pool.release(self.driver, discard=discard)
+            else:
+                self.driver.quit()
             self.driver = None
             self.wait = None
             
     def run(self, request_data):
+        """Answer a request, reporting the tiers that answered it in the response."""
+        return self.tiers.report(self._run(request_data))
+
+    def _run(self, request_data):
        
         if request_data["subject"] == "משפטים":
             return {
@@ -86,7 +222,6 @@ class BenGurionUniversity:
                 "verbal": 0,
                 "english": 0
             }
-        results = {}
         
         
         # Configure Chrome options with additional compatibility settings
@@ -103,10 +238,6 @@ class BenGurionUniversity:
             self.chrome_options.add_argument("--disable-web-security")
             self.chrome_options.add_argument("--allow-running-insecure-content")
         
-        self.start_browser()
-        driver = self.driver
-        wait = self.wait
-        
         # Get the data from the request
         highschool_scores = request_data.get("highschool_scores", {})
 
@@ -129,7 +260,6 @@ class BenGurionUniversity:
             
         # Check for law degree after degrees_to_check is properly initialized
         if "משפטים" in degrees_to_check:
-            self.close_browser()
             return {"isAccepted": None, "url": self.base_url, "message": "לא קיים תואר משפטים בבן גוריון"}
             
         # If degrees_to_check is empty and subject is provided, use subject
@@ -138,77 +268,14 @@ class BenGurionUniversity:
             
         # print(f"Degrees to check: {degrees_to_check}")
         
-        # Navigate to the calculator page
-        driver.get(self.base_url)
-        driver.maximize_window()
-        
-        # Handle popup window if present
-        # print("🔍 Checking for popup...")
-        try:
-            popup_close_btn = wait.until(
-                EC.element_to_be_clickable((By.ID, "closeXButton"))
-            )
-            driver.execute_script("arguments[0].click();", popup_close_btn)
-            # print("✅ Popup closed.")
-        except Exception as e:
-            # print(f"ℹ️ No popup detected: {e}")
-            pass
-
-        # Accept cookies if needed
-        # print("🍪 Looking for cookie accept button...")
-        try:
-            cookie_btn = wait.until(
-                EC.element_to_be_clickable((By.ID, "ct-ultimate-gdpr-cookie-accept"))
-            )
-            cookie_btn.click()
-            # print("✅ Cookie accepted.")
-        except Exception as e:
-            # print(f"ℹ️ No cookie prompt found: {e}")
-            pass
-
-        # Switch to iframe containing the calculator
-        # print("🔍 Looking for iframe...")
-        iframe = wait.until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "iframe[src*='apps4cloud.bgu.ac.il/calcprod']"))
-        )
-        driver.switch_to.frame(iframe)
-
+        # The local engine answers when its average and its verdicts are trusted and the thresholds of the degrees are known,
+        # otherwise the browser flow does
+        engine_scores = self._engine_scores(highschool_scores, psychometric, degrees_to_check)
+        results = self.tiers.resolve("acceptance", [
+            ("threshold", lambda: self._check_acceptance_engine(engine_scores)),
+            ("browser", lambda: self._check_acceptance_browser(engine_scores, highschool_scores, psychometric, degrees_to_check)),
+        ])
 
-        # Click on "Calculate High School Average" button
-        # print("🟠 Looking for 'לחישוב ממוצע בגרות' button...")
-        
-        calc_button = wait.until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "a.page-link.go-to-average"))
-        )
-        driver.execute_script("arguments[0].click();", calc_button)
-        # print("✅ Clicked 'לחישוב ממוצע בגרות' button.")
-            
-        # Fill high school subject scores
-        self._fill_highschool_scores(driver, wait, highschool_scores)
-        
-        # Calculate high school average
-        average_score = self._calculate_high_school_average(driver, wait)
-        
-        # Go back to main page and enter calculated average
-        self._navigate_to_main_and_enter_average(driver, wait, average_score)
-        
-        # Handle science bonus subjects
-        self._fill_science_bonus_subjects(driver, wait, highschool_scores)
-        
-        # Navigate through next pages to reach psychometric section
-        self._navigate_to_psychometric_page(driver, wait)
-        
-        # Enter psychometric scores
-        self._fill_psychometric_scores(driver, wait, psychometric)
-        
-        # Complete navigation through remaining pages
-        self._navigate_to_results_page(driver, wait)
-        
-        # Try to view acceptance list directly
-        results = self._check_acceptance_list(driver, wait, degrees_to_check)
-        
-        self.close_browser()
-        
         # Original results dictionary with degree-specific results
         all_degrees_results = results
         
@@ -266,6 +333,153 @@ class BenGurionUniversity:
                 "message": f"לא נמצאו תוצאות עבור תחום הלימוד {requested_degree}"
             }
     
+    def _run_calculator(self, highschool_scores, psychometric, degrees_to_check):
+        """Run the calculator in the browser, from the marketing page to the acceptance list."""
+        # Lease a browser for the calculator flow, it is always handed back when the flow ends
+        self.start_browser()
+        driver = self.driver
+        wait = self.wait
+        try:
+            # Navigate to the calculator page
+            driver.get(self.base_url)
+            driver.maximize_window()
+        
+            # A session prepared from the profile template already carries the popup and consent cookies,
+            # so the popups are only closed if they show up anyway instead of being waited for
+            if is_prepared(driver):
+                for element_id in ("closeXButton", "ct-ultimate-gdpr-cookie-accept"):
+                    for button in driver.find_elements(By.ID, element_id):
+                        driver.execute_script("arguments[0].click();", button)
+            else:
+                # Handle popup window if present
+                # print("🔍 Checking for popup...")
+                try:
+                    popup_close_btn = wait.until(
+                        EC.element_to_be_clickable((By.ID, "closeXButton"))
+                    )
+                    driver.execute_script("arguments[0].click();", popup_close_btn)
+                    # print("✅ Popup closed.")
+                except Exception as e:
+                    # print(f"ℹ️ No popup detected: {e}")
+                    pass
+
+                # Accept cookies if needed
+                # print("🍪 Looking for cookie accept button...")
+                try:
+                    cookie_btn = wait.until(
+                        EC.element_to_be_clickable((By.ID, "ct-ultimate-gdpr-cookie-accept"))
+                    )
+                    cookie_btn.click()
+                    # print("✅ Cookie accepted.")
+                except Exception as e:
+                    # print(f"ℹ️ No cookie prompt found: {e}")
+                    pass
+
+            # Switch to iframe containing the calculator
+            # print("🔍 Looking for iframe...")
+            iframe = wait.until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "iframe[src*='apps4cloud.bgu.ac.il/calcprod']"))
+            )
+            driver.switch_to.frame(iframe)
+
+            # record the calculator's own JSON calls, its endpoints and payloads are read off them
+            if self.recorder.recording:
+                driver.execute_script(CALL_RECORDER_SCRIPT)
+
+
+            # Click on "Calculate High School Average" button
+            # print("🟠 Looking for 'לחישוב ממוצע בגרות' button...")
+        
+            calc_button = wait.until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, "a.page-link.go-to-average"))
+            )
+            driver.execute_script("arguments[0].click();", calc_button)
+            # print("✅ Clicked 'לחישוב ממוצע בגרות' button.")
+            
+            # Fill high school subject scores
+            self._fill_highschool_scores(driver, wait, highschool_scores)
+        
+            # Calculate high school average
+            average_score = self._calculate_high_school_average(driver, wait)
+            self.calculated_average = average_score
+        
+            # Go back to main page and enter calculated average
+            self._navigate_to_main_and_enter_average(driver, wait, average_score)
+        
+            # Handle science bonus subjects
+            self._fill_science_bonus_subjects(driver, wait, highschool_scores)
+        
+            # Navigate through next pages to reach psychometric section
+            self._navigate_to_psychometric_page(driver, wait)
+        
+            # Enter psychometric scores
+            self._fill_psychometric_scores(driver, wait, psychometric)
+        
+            # Complete navigation through remaining pages
+            self._navigate_to_results_page(driver, wait)
+            if self.recorder.recording:
+                self.recorder.save(driver.execute_script(READ_CALLS_SCRIPT))
+        
+            # Try to view acceptance list directly
+            results = self._check_acceptance_list(driver, wait, degrees_to_check)
+        except Exception:
+            self.close_browser(discard=True)
+            raise
+        finally:
+            self.close_browser()
+
+        return results
+
+    def _check_acceptance_browser(self, engine_scores, highschool_scores, psychometric, degrees_to_check):
+        """Get the acceptance list from the calculator in the browser, and learn the thresholds from it."""
+        results = self._run_calculator(highschool_scores, psychometric, degrees_to_check)
+        self._learn_thresholds(engine_scores, results)
+        return results
+
+    def _engine_scores(self, highschool_scores, psychometric, degrees_to_check):
+        """The engine's (average, {degree: sechem}), or None when it can't compute them."""
+        try:
+            return self.engine.sechems(highschool_scores, psychometric, degrees_to_check)
+        except Exception as e:
+            print(f"⚠️ sechem engine failed: {e}")
+            return None
+
+    def _check_acceptance_engine(self, engine_scores):
+        """Read the verdicts of the engine's sechems off the threshold table, None when the browser is needed."""
+        if engine_scores is None:
+            return None
+        average, sechems = engine_scores
+        verdicts = {degree: self.thresholds.verdict(degree, sechem) for degree, sechem in sechems.items()}
+        if not verdicts or None in verdicts.values():
+            return None
+        # both validators count the request, and either one can send it to the calculator
+        validate_average = self.average_validator.should_validate()
+        validate_verdicts = self.verdict_validator.should_validate()
+        if validate_average or validate_verdicts:
+            return None
+        print(f"🧮 sechem engine average: {average}, sechems: {sechems}")
+        return {degree: "התקבלתי" if accepted else "לא התקבלתי" for degree, accepted in verdicts.items()}
+
+    def _learn_thresholds(self, engine_scores, results):
+        """Check the engine's average and verdicts against the calculator's, and narrow the thresholds once the average is trusted."""
+        if engine_scores is None:
+            return
+        average, sechems = engine_scores
+        if self.calculated_average is not None:
+            self.average_validator.record(average, self.calculated_average)
+
+        # the verdicts the table gave before the calculator answered, 1 for accepted, against the calculator's
+        predicted = {degree: self.thresholds.verdict(degree, sechem) for degree, sechem in sechems.items() if degree in results}
+        predicted = {degree: int(accepted) for degree, accepted in predicted.items() if accepted is not None}
+        if predicted:
+            self.verdict_validator.record(predicted, {degree: int(results[degree] == "התקבלתי") for degree in predicted})
+
+        # bounds are learned once the average matches the calculator's. The verdicts can't be trusted before
+        # there are bounds to read them from, so their validator only gates answering, in _check_acceptance_engine
+        if self.average_validator.trusted:
+            self.thresholds.learn({degree: (sechem, results[degree] == "התקבלתי")
+                                   for degree, sechem in sechems.items() if degree in results})
+
     def _fill_highschool_scores(self, driver, wait, highschool_scores):
         """Fill high school subjects, grades and units."""
         # print("📚 Starting to input high school subjects...")
@@ -285,13 +499,33 @@ class BenGurionUniversity:
         num_subjects = len(ordered_subjects)
         # print(f"🔢 Total subjects to enter: {num_subjects}")
 
-        # Click the add button for each additional subject (first one is already open)
-        for i in range(num_subjects - 1):
+        # Fast path: add the rows and set every subject, unit and grade through React in one script, then
+        # type only what it couldn't set
+        rows = [[idx, subject, str(level), str(grade)] for idx, (subject, (grade, level)) in enumerate(ordered_subjects)]
+        result = self._inject_subject_rows(driver, rows)
+        if result is None:
+            self._add_subject_rows(driver, wait, 1, num_subjects)
+            failed_selects = failed_inputs = list(range(num_subjects))
+        else:
+            self._add_subject_rows(driver, wait, result["rows"], num_subjects)
+            failed_selects, failed_inputs = result["selects"], result["inputs"]
+
+        for idx in failed_selects:
+            self._type_subject_select(driver, wait, idx, ordered_subjects[idx][0])
+        for idx in failed_inputs:
+            grade, level = ordered_subjects[idx][1]
+            self._type_subject_inputs(driver, wait, idx, level, grade)
+
+        # print("\n✅ Finished entering all subjects")
+
+    def _add_subject_rows(self, driver, wait, existing, total):
+        """Click the add button until the form has a row for every subject."""
+        for i in range(existing - 1, total - 1):
             # Scroll up to make sure the button is visible
             driver.execute_script("window.scrollTo(0, 0);")
             
             # Wait longer for the page to scroll to top
-            WebDriverWait(driver, 3).until(
+            EventWait(driver, 3).until(
                 lambda d: d.execute_script("return window.pageYOffset") == 0
             )
             
@@ -300,109 +534,113 @@ class BenGurionUniversity:
             # Click the button
             self._safe_click(driver, add_button, f"add subject button {i+2}")
             
-            # Wait longer for new field to appear with better detection
-            # Use a more reliable condition - check total field count AND check for a stable DOM
-            WebDriverWait(driver, 15).until(
-                lambda d: len(d.find_elements(By.CSS_SELECTOR, ".user-field, .subject-field, input.simple-input")) > (i+1)*2
-            )
-            # Add small pause to ensure field is fully rendered
-            time.sleep(0.1)
+            # Wait in the page for the new field to appear, a single round trip instead of one per poll
+            wait_until(driver, """
+                return document.querySelectorAll('.user-field, .subject-field, input.simple-input').length > arguments[0];
+            """, (i+1)*2, timeout=15, replaces=0.1)
             
-                # print("✅ Added new subject field")
-         
-
-        # Fill in subject data for each subject
-        # print("\n📝 Entering subject information...")
-        for idx, (subject, values) in enumerate(ordered_subjects):
-            # Extract grade and level
-            grade, level = values
-
-            # Find and fill subject name field
-            subject_input_id = f"react-select-{2 + idx}-input"
-            input_element = self._find_element_with_retry(driver, wait, 
-                                                            [(By.ID, subject_input_id),
-                                                            (By.CSS_SELECTOR, ".react-select__input input")])
+            # print("✅ Added new subject field")
+
+    def _type_subject_select(self, driver, wait, idx, subject):
+        """Type a subject name into the react-select of a row and pick the first option."""
+        # Find and fill subject name field
+        subject_input_id = f"react-select-{2 + idx}-input"
+        input_element = self._find_element_with_retry(driver, wait, 
+                                                        [(By.ID, subject_input_id),
+                                                        (By.CSS_SELECTOR, ".react-select__input input")])
+        
+        if input_element:
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", input_element)
+            
+            # Wait for element to be in view
+            self._wait_for_element_stable(driver, input_element)
+            
+            input_element.clear()
+            input_element.send_keys(Keys.CONTROL + "a")
+            input_element.send_keys(Keys.DELETE)
+            
+            # Type the subject name, react-select filters on every key event so no pause is needed
+            input_element.send_keys(subject)
+            
+            # Wait for the dropdown to show the options of the typed name
+            wait_until(driver, "return !!document.querySelector('.react-select__menu, .dropdown-menu');",
+                       timeout=3, replaces=0.1 * (len(subject) + 1))
+            
+            # Get the dropdown options
+            dropdown_options = driver.find_elements(
+                By.CSS_SELECTOR, ".react-select__option, .react-select__menu-list > div"
+            )
             
-            if input_element:
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", input_element)
+            # If options exist, click the first one directly
+            if dropdown_options and len(dropdown_options) > 0:
+                # Scroll the option into view
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", dropdown_options[0])
                 
-                # Wait for element to be in view
-                self._wait_for_element_stable(driver, input_element)
-                
-                input_element.clear()
-                input_element.send_keys(Keys.CONTROL + "a")
-                input_element.send_keys(Keys.DELETE)
-                
-                # Type the subject name character by character with pauses for better recognition
-                for char in subject:
-                    input_element.send_keys(char)
-                    time.sleep(0.1)  # Small pause between characters
-                
-                # Add extra pause to ensure dropdown has time to register
-                time.sleep(0.1)
-                
-                # Wait longer for dropdown to appear with options
-                WebDriverWait(driver, 3).until(
-                    lambda d: len(d.find_elements(By.CSS_SELECTOR, ".react-select__menu, .dropdown-menu")) > 0
-                )
-                
-                # Get the dropdown options
-                dropdown_options = driver.find_elements(
-                    By.CSS_SELECTOR, ".react-select__option, .react-select__menu-list > div"
-                )
-                
-                # If options exist, click the first one directly
-                if dropdown_options and len(dropdown_options) > 0:
-                    # Scroll the option into view
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", dropdown_options[0])
-                    
-                    # Wait for element to be stable
-                    self._wait_for_element_stable(driver, dropdown_options[0])
-                    
-                    # Click directly on the first option
-                    driver.execute_script("arguments[0].click();", dropdown_options[0])
-                else:
-                    # Fallback to ENTER key
-                    input_element.send_keys(Keys.ENTER)
+                # Wait for element to be stable
+                self._wait_for_element_stable(driver, dropdown_options[0])
                 
-                # Give time for selection to register
-                time.sleep(0.5)
-            
-            # Find and fill level/units field
-            level_input = self._find_element_with_retry(driver, wait,
-                                                        [(By.ID, f"item_{idx}_level"),
-                                                        (By.CSS_SELECTOR, f".user-field:nth-child({idx+1}) input.simple-input:first-child")])
-            
-            if level_input:
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", level_input)
-                self._wait_for_element_stable(driver, level_input)
-                level_input.clear()
-                level_input.send_keys(str(level))
-                # print(f"🔢 Entered level for {subject}: {level}")
+                # Click directly on the first option
+                driver.execute_script("arguments[0].click();", dropdown_options[0])
             else:
-                Exception(f"Could not find level input for subject {subject}")
-            
-            # Find and fill grade field
-            grade_input = self._find_element_with_retry(driver, wait,
-                                                        [(By.ID, f"item_{idx}_grade"),
-                                                        (By.CSS_SELECTOR, f".user-field:nth-child({idx+1}) input.simple-input:nth-child(2)")])
-            
-            if grade_input:
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", grade_input)
-                self._wait_for_element_stable(driver, grade_input)
-                grade_input.clear()
-                grade_input.send_keys(str(grade))
-                # print(f"🎯 Entered grade for {subject}: {grade}")
-            else:
-                Exception(f"Could not find grade input for subject {subject}")
-            
-            
-            # Wait for page to register the input
-            driver.implicitly_wait(1)
+                # Fallback to ENTER key
+                input_element.send_keys(Keys.ENTER)
             
+            # Wait for the selection to register, the menu closes once it does
+            try:
+                wait_until(driver, "return !document.querySelector('.react-select__menu');", timeout=2, replaces=0.5)
+            except TimeoutException:
+                pass
 
+    def _type_subject_inputs(self, driver, wait, idx, level, grade):
+        """Type the units and grade of a row."""
+        # Find and fill level/units field
+        level_input = self._find_element_with_retry(driver, wait,
+                                                    [(By.ID, f"item_{idx}_level"),
+                                                    (By.CSS_SELECTOR, f".user-field:nth-child({idx+1}) input.simple-input:first-child")])
+        
+        if level_input:
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", level_input)
+            self._wait_for_element_stable(driver, level_input)
+            level_input.clear()
+            level_input.send_keys(str(level))
+            # print(f"🔢 Entered level for row {idx}: {level}")
+        else:
+            Exception(f"Could not find level input for row {idx}")
+        
+        # Find and fill grade field
+        grade_input = self._find_element_with_retry(driver, wait,
+                                                    [(By.ID, f"item_{idx}_grade"),
+                                                    (By.CSS_SELECTOR, f".user-field:nth-child({idx+1}) input.simple-input:nth-child(2)")])
+        
+        if grade_input:
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", grade_input)
+            self._wait_for_element_stable(driver, grade_input)
+            grade_input.clear()
+            grade_input.send_keys(str(grade))
+            # print(f"🎯 Entered grade for row {idx}: {grade}")
+        else:
+            Exception(f"Could not find grade input for row {idx}")
         
-        # print("\n✅ Finished entering all subjects")
+        # Wait for page to register the input
+        driver.implicitly_wait(1)
+
+    def _inject_subject_rows(self, driver, rows):
+        """
+        Add subject rows and set their react-select value, units and grade through React's own handlers,
+        in one script. rows holds [row index, subject, units, grade]. Returns the number of rows the form
+        has and the rows whose select or inputs didn't take, or None when React can't be reached.
+        """
+        try:
+            driver.set_script_timeout(30)
+            result = driver.execute_async_script(self.REACT_ROWS_SCRIPT, rows)
+        except Exception as e:
+            print(f"⚠️ Direct react-select fill failed, typing instead: {e}")
+            return None
+        if result is None or result.get("error"):
+            if result:
+                print(f"⚠️ Direct react-select fill failed, typing instead: {result['error']}")
+            return None
+        return result
 
     def _calculate_high_school_average(self, driver, wait):
         """Calculate high school average after entering all scores."""
@@ -418,7 +656,7 @@ class BenGurionUniversity:
         )
         
         # Wait for the result to be populated
-        WebDriverWait(driver, 20).until(
+        EventWait(driver, 20).until(
             lambda d: avg_element.get_attribute("innerText").strip() != ""
         )
         
@@ -447,7 +685,7 @@ class BenGurionUniversity:
         #print("🔁 Re-entered iframe.")
         
         # Wait for page to load inside iframe
-        WebDriverWait(driver, 5).until(
+        EventWait(driver, 5).until(
             EC.presence_of_element_located((By.CLASS_NAME, "simple-input"))
         )
         
@@ -492,12 +730,7 @@ class BenGurionUniversity:
             self._fill_input_by_id(driver, "item_1_grade", str(physics_grade), "Physics grade")
         
         # Step 2: Find other science subjects
-        science_subjects = [
-            "ביוטכנולוגיה", "ביולוגיה", "בקרת מכונות", "כימיה", "כימיה טכנולוגית",
-            "מדעי החיים והחקלאות", "מדעי המחשב", "מידע ונתונים", "מערכות ביוטכנולוגיות",
-            "ניתוח נתונים", "ע. גמר בתכנות ותכנון מער'", "תכנון ותכנות מערכות",
-            "פיסיקה", "פיזיקה"
-        ]
+        science_subjects = self.SCIENCE_SUBJECTS
         
         # Find other subjects
         other_subjects = []
@@ -507,9 +740,21 @@ class BenGurionUniversity:
                 
         #print(f"📊 Found {len(other_subjects)} additional science subjects")
         
-        # Step 3: Process each additional subject
+        # Step 3: Set the additional subjects through React in one script, after math & physics, and
+        # type whatever it couldn't set
+        rows = [[idx + 2, subject, str(level), str(grade)] for idx, (subject, (grade, level)) in enumerate(other_subjects)]
+        result = self._inject_subject_rows(driver, rows) if rows else None
         for idx, (subject, values) in enumerate(other_subjects):
-            self._add_science_subject(driver, wait, subject, values, idx)
+            subject_idx = idx + 2
+            if result is None or subject_idx >= result["rows"]:
+                self._add_science_subject(driver, wait, subject, values, idx)
+                continue
+            if subject_idx in result["selects"]:
+                self._select_science_subject(driver, wait, subject)
+            if subject_idx in result["inputs"]:
+                containers = driver.find_elements(By.CSS_SELECTOR, ".user-field")
+                grade, level = values
+                self._type_science_inputs(containers[subject_idx], level, grade)
             
         #print("✅ Completed entering science bonus subjects")
     
@@ -532,7 +777,7 @@ class BenGurionUniversity:
             
             # Wait for page to scroll to bottom
             try:
-                WebDriverWait(driver, 2).until(
+                EventWait(driver, 2).until(
                     lambda d: d.execute_script(
                         "return (window.innerHeight + window.pageYOffset) >= document.body.scrollHeight"
                     )
@@ -550,7 +795,7 @@ class BenGurionUniversity:
             self._safe_click(driver, add_subject_btn, f"add subject button for {subject}")
             
             # Wait for UI to update - new field to appear
-            WebDriverWait(driver, 3).until(
+            EventWait(driver, 3).until(
                 lambda d: len(d.find_elements(By.CSS_SELECTOR, ".user-field")) > subject_idx
             )
             
@@ -559,6 +804,22 @@ class BenGurionUniversity:
             #print("❌ Could not find add subject button")
             return
             
+        self._select_science_subject(driver, wait, subject)
+        
+        # Find level and grade fields in the most recently added container
+        containers = driver.find_elements(By.CSS_SELECTOR, ".user-field")
+        newest_container = containers[-1] if containers else None
+        
+        if newest_container:
+            self._type_science_inputs(newest_container, level, grade)
+        
+       # print(f"✅ Completed processing subject: {subject}")
+        
+        # Wait for page to register changes
+        driver.implicitly_wait(2)
+
+    def _select_science_subject(self, driver, wait, subject):
+        """Type a subject into the first empty science dropdown and pick it."""
         # Find and use the subject dropdown
         dropdown = None
         dropdown_found = False
@@ -579,7 +840,7 @@ class BenGurionUniversity:
                     dropdown.send_keys(subject)
                     
                     # Wait longer for dropdown to appear
-                    WebDriverWait(driver, 5).until(
+                    EventWait(driver, 5).until(
                         lambda d: len(d.find_elements(By.CSS_SELECTOR, ".react-select__menu")) > 0
                     )
                     
@@ -604,11 +865,8 @@ class BenGurionUniversity:
                         dropdown.send_keys(Keys.ENTER)
                         #print(f"⚠️ No dropdown options found for {subject}, using ENTER key")
                     
-                    # Give time for selection to register
-                    time.sleep(0.5)
-                    
                     # Wait for selection to be applied
-                    WebDriverWait(driver, 2).until(
+                    EventWait(driver, 2, replaces=0.5).until(
                         lambda d: d.execute_script(
                             "return arguments[0].parentElement.parentElement.className.includes('has-value')",
                             dropdown
@@ -631,7 +889,7 @@ class BenGurionUniversity:
                         dropdown.send_keys(subject)
                         
                         # Wait for dropdown options
-                        WebDriverWait(driver, 2).until(
+                        EventWait(driver, 2).until(
                             lambda d: len(d.find_elements(By.CSS_SELECTOR, ".react-select__menu")) > 0
                         )
                         
@@ -640,32 +898,23 @@ class BenGurionUniversity:
                         break
             except Exception as e:
                 print(f"❌ Failed to select subject: {e}")
-        
-        # Find level and grade fields in the most recently added container
-        containers = driver.find_elements(By.CSS_SELECTOR, ".user-field")
-        newest_container = containers[-1] if containers else None
-        
-        if newest_container:
-            # Find level and grade inputs in the container
-            inputs = newest_container.find_elements(By.CSS_SELECTOR, "input.simple-input")
-            
-            if len(inputs) >= 1:
-                level_input = inputs[0]
-                level_input.clear()
-                level_input.send_keys(str(level))
-               # print(f"✅ Entered units: {level}")
-            
-            if len(inputs) >= 2:
-                grade_input = inputs[1]
-                grade_input.clear()
-                grade_input.send_keys(str(grade))
-              #  print(f"✅ Entered grade: {grade}")
-        
-       # print(f"✅ Completed processing subject: {subject}")
-        
-        # Wait for page to register changes
-        driver.implicitly_wait(2)
 
+    def _type_science_inputs(self, container, level, grade):
+        """Type the units and grade into a science subject row."""
+        # Find level and grade inputs in the container
+        inputs = container.find_elements(By.CSS_SELECTOR, "input.simple-input")
+        
+        if len(inputs) >= 1:
+            level_input = inputs[0]
+            level_input.clear()
+            level_input.send_keys(str(level))
+           # print(f"✅ Entered units: {level}")
+        
+        if len(inputs) >= 2:
+            grade_input = inputs[1]
+            grade_input.clear()
+            grade_input.send_keys(str(grade))
+          #  print(f"✅ Entered grade: {grade}")
 
     def _fill_input_by_id(self, driver, input_id, value, field_name):
         """Helper to fill an input field by ID with error handling."""
@@ -689,7 +938,7 @@ class BenGurionUniversity:
     def _wait_for_element_stable(self, driver, element, timeout=2):
         """Wait for an element to be in a stable position."""
         try:
-            WebDriverWait(driver, timeout).until(
+            EventWait(driver, timeout).until(
                 lambda d: d.execute_script(
                     "var rect = arguments[0].getBoundingClientRect(); " +
                     "return rect.top >= 0 && rect.left >= 0 && " +
@@ -717,7 +966,7 @@ class BenGurionUniversity:
                 self._safe_click(driver, next_button, f"'Next' button ({i+1}/2)")
                 
                 # Wait for page transition
-                WebDriverWait(driver, 3).until(
+                EventWait(driver, 3).until(
                     lambda d: d.execute_script("return document.readyState") == "complete"
                 )
                 
@@ -729,7 +978,7 @@ class BenGurionUniversity:
       #  print("\n📝 Now on psychometric score page")
         
         # Wait for the psychometric page to load completely
-        WebDriverWait(driver, 3).until(
+        EventWait(driver, 3).until(
             lambda d: len(d.find_elements(By.CSS_SELECTOR, ".user-field")) > 0
         )
 
@@ -861,7 +1110,8 @@ class BenGurionUniversity:
         # Enhanced approach - try multiple strategies to navigate forward
         for target in next_button_targets:
           #  print(f"🔄 Looking for {target['name']} 'Next' button ({target['href']})...")
-            time.sleep(1)
+            # let the previous page finish rendering
+            wait_for_dom_quiet(driver, quiet=0.2, timeout=1, replaces=1)
             success = False
             
             # Give a short delay between navigation attempts
@@ -908,7 +1158,7 @@ class BenGurionUniversity:
             
             # Wait for any page transitions, regardless of button click success
             try:
-                WebDriverWait(driver, 3).until(
+                EventWait(driver, 3).until(
                     lambda d: d.execute_script("return document.readyState") == "complete"
                 )
             except TimeoutException:
@@ -931,7 +1181,7 @@ class BenGurionUniversity:
                 # Wait for any page transitions
                 try:
                     # Wait for page to stabilize (check for changes in the URL or page content)
-                    WebDriverWait(driver, 3).until(
+                    EventWait(driver, 3).until(
                         lambda d: d.execute_script("return document.readyState") == "complete"
                     )
                 except TimeoutException:
@@ -989,13 +1239,12 @@ class BenGurionUniversity:
         Uses the degree mapping to match JSON request degree names to BGU website names.
         """
         print("\n🔍 Navigating to acceptance list page...")
-        results = {}
 
         # ודא שהעמוד נטען לגמרי
-        WebDriverWait(driver, 10).until(
+        EventWait(driver, 10).until(
             lambda d: d.execute_script("return document.readyState") == "complete"
         )
-        time.sleep(2)
+        wait_for_network_idle(driver, timeout=5, replaces=2)
 
         # מצא את הקישור לעמוד תוצאות הקבלה
         try:
@@ -1017,7 +1266,7 @@ class BenGurionUniversity:
 
         # גלילה ולחיצה על הקישור
         driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", final_results_link)
-        time.sleep(1)
+        wait_for_dom_quiet(driver, quiet=0.05, timeout=1, replaces=1)
 
         href = final_results_link.get_attribute('href')
         if href and href.startswith('#'):
@@ -1027,16 +1276,21 @@ class BenGurionUniversity:
             driver.execute_script("arguments[0].click();", final_results_link)
 
         # המתן לטעינה מחדש של העמוד
-        WebDriverWait(driver, 10).until(
+        EventWait(driver, 10).until(
             lambda d: d.execute_script("return document.readyState") == "complete"
         )
-        time.sleep(2)
+        wait_for_network_idle(driver, timeout=5, replaces=2)
 
         # שלוף את כל הטקסטים של שורות התארים בבת אחת (גישה יעילה!)
         acceptance_texts = driver.execute_script("""
             return Array.from(document.querySelectorAll('.accordion_item')).map(el => el.innerText);
         """)
 
+        return self._acceptance_results(acceptance_texts, degrees_to_check)
+
+    def _acceptance_results(self, acceptance_texts, degrees_to_check):
+        """Match the degrees to check against the texts of the acceptance list."""
+        results = {}
         degree_mapping = self._get_degree_mapping()
 
         # בדיקת קבלה לכל תואר
@@ -1077,7 +1331,7 @@ class BenGurionUniversity:
          #  print("✅ Clicked on 'Calculate admission chances' button")
             
             # Wait for page transition
-            WebDriverWait(driver, 3).until(
+            EventWait(driver, 3).until(
                 lambda d: d.execute_script("return document.readyState") == "complete"
             )
         else:
@@ -1093,7 +1347,7 @@ class BenGurionUniversity:
          #   print("✅ Clicked on calculate admission chances button.")
             
             # Wait for calculation to complete
-            WebDriverWait(driver, 3).until(
+            EventWait(driver, 3).until(
                 lambda d: d.execute_script("return document.readyState") == "complete"
             )
         except Exception as e:
@@ -1136,7 +1390,7 @@ class BenGurionUniversity:
                     
                     # Wait for dropdown to appear
                     try:
-                        WebDriverWait(driver, 2).until(
+                        EventWait(driver, 2).until(
                             lambda d: len(d.find_elements(By.CSS_SELECTOR, ".react-select__menu")) > 0
                         )
                     except TimeoutException:
@@ -1146,7 +1400,7 @@ class BenGurionUniversity:
                  #   print(f"📝 Entered degree name: '{bgu_degree_name}' (for {degree})")
                     
                     # Wait for results to appear
-                    WebDriverWait(driver, 3).until(
+                    EventWait(driver, 3).until(
                         lambda d: len(d.find_elements(By.CSS_SELECTOR, ".result-content, .degree-result, .acceptance-result")) > 0
                         or len(d.find_elements(By.CSS_SELECTOR, "div.content, div.result")) > 0
                     )
@@ -1173,7 +1427,7 @@ class BenGurionUniversity:
                             self._safe_click(driver, clear_button, "clear search button")
                             
                             # Wait for search to clear
-                            WebDriverWait(driver, 2).until(
+                            EventWait(driver, 2).until(
                                 lambda d: len(d.find_elements(By.CSS_SELECTOR, ".result-content")) == 0
                                 or not degree_search.get_attribute("value")
                             )
@@ -1252,7 +1506,7 @@ class BenGurionUniversity:
         
         Args:
             driver: WebDriver instance
-            wait: WebDriverWait instance
+            wait: EventWait instance
             selectors: List of (By, selector) tuples to try
             max_attempts: Maximum number of attempts for each selector
             
@@ -1278,7 +1532,7 @@ class BenGurionUniversity:
         
         Args:
             driver: WebDriver instance
-            wait: WebDriverWait instance
+            wait: EventWait instance
             by_method: By method to use (e.g., By.ID, By.CSS_SELECTOR)
             selector: Selector string
             timeout: Timeout in seconds
@@ -1287,7 +1541,7 @@ class BenGurionUniversity:
             The found element if clickable, or None if not found/clickable
         """
         try:
-            element = WebDriverWait(driver, timeout).until(
+            element = EventWait(driver, timeout).until(
                 EC.element_to_be_clickable((by_method, selector))
             )
             return element
@@ -1327,7 +1581,7 @@ class BenGurionUniversity:
          #   print(f"✅ Clicked on {description}")
             
             # Wait for any click effects to register
-            WebDriverWait(driver, 2).until(
+            EventWait(driver, 2).until(
                 lambda d: d.execute_script("return document.readyState") == "complete"
             )
             
@@ -1349,3 +1603,12 @@ class BenGurionUniversity:
         for subject in highschool_scores.copy():
             if subject in highschool_subject_name_dict:
                 highschool_scores[highschool_subject_name_dict[subject]] = highschool_scores.pop(subject)
+
+
+    # Async version of run for the async engine. The BGU calculator is a chain of react-select widgets that
+    # only respond to real browser input, so the Selenium flow runs in the loop's executor on a pooled driver
+    # while the loop keeps serving the other requests
+    async def run_async(self, request_data, browser=None):
+        # the executor thread gets the request's context, so its waits land in the request's wait report
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(None, context.run, self.run, request_data)
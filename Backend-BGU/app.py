@@ -1,27 +1,62 @@
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 import os
-from selenium.webdriver.chrome.service import Service
+import sys
+import atexit
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from BenGurionUniversity import BenGurionUniversity
 import json
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend_common"))
+from driver_sources import create_driver_source, create_chrome_reaper, create_async_engine
+from driver_resolver import get_chromedriver_path, create_chrome_service
+from page_waits import wait_report, wait_stats
+from engine_validation import engine_stats
+from tier_resolver import tier_stats
+
 app = Flask(__name__, static_folder=os.path.dirname(os.path.abspath(__file__)))
 CORS(app)  # Enable CORS for all routes in the application
 
 ### general variables ###
 chrome_options = Options()
 chrome_options.add_argument("--headless")
-service = Service(ChromeDriverManager().install())
+
+# resolve chromedriver once at boot, every driver of this process reuses the resolved path
+get_chromedriver_path()
+
+# warm drivers shared by all the requests of this backend (a local pool, or the machine-wide broker)
+driver_pool = create_driver_source("bgu", chrome_options)
+atexit.register(driver_pool.shutdown)
+
+# background reaper of chrome/chromedriver processes leaked by crashed sessions
+chrome_reaper = create_chrome_reaper()
+
+# asyncio engine driving the requests' pages from one event loop, when enabled in config.json
+async_engine = create_async_engine("bgu")
+
+# Route exposing the driver pool and reaper counters, including the memory reclaimed from leaked processes
+@app.route('/driver-stats', methods=['GET'])
+def driver_stats_handler():
+    return jsonify({
+        "pool": driver_pool.stats(),
+        "reaper": chrome_reaper.stats() if chrome_reaper else None,
+        "async_engine": async_engine.stats() if async_engine else None,
+        "waits": wait_stats(),
+        "engines": engine_stats(),
+        "tiers": tier_stats()
+    })
     
 # Route for Ben Gurion University analysis
 @app.route('/BenGurion', methods=['POST'])
 def ben_gurion_handler():
-    ben_gurion_university = BenGurionUniversity(service, chrome_options)
+    ben_gurion_university = BenGurionUniversity(create_chrome_service(), chrome_options, driver_pool)
     try:
         request_data = request.get_json()
-        result = ben_gurion_university.run(request_data)
+        with wait_report("bgu"):
+            if async_engine:
+                result = async_engine.run(lambda browser: ben_gurion_university.run_async(request_data, browser))
+            else:
+                result = ben_gurion_university.run(request_data)
         return jsonify(result)
 
     except Exception as e:
@@ -29,6 +64,12 @@ def ben_gurion_handler():
 
 ### main function ###
 if __name__ == '__main__':
+    driver_pool.start()
+    if chrome_reaper:
+        chrome_reaper.start()
+    if async_engine:
+        async_engine.start()
+        atexit.register(async_engine.shutdown)
     try:
         with open('../config.json', 'r') as f:
             config = json.load(f)
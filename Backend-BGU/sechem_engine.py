@@ -0,0 +1,171 @@
+import json
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend_common"))
+from gotin_config import get_section
+
+BGU_SECHEM_DEFAULTS = {
+    # bonus points added to a grade by units level when averaging. No published source, they are checked
+    # directly: the engine's average is compared with the calculator's by the bgu_average validator
+    "bonus": {"4": 10, "5": 20},
+    "math_bonus": {"4": 10, "5": 30},
+    "min_bonus_grade": 60,
+    # elective subjects that lower the average are left out of it, the mandatory ones always count
+    "drop_lowering_electives": True,
+    "decimals": 2,
+    # sechem points of math, physics and the other science subjects by units level, up to science_bonus_cap
+    "science_bonus": {"4": 2, "5": 4},
+    "science_bonus_cap": 8,
+    # sechem = bagrut * average + psychometric * the psychometric section + science_bonus * the science bonus
+    # + offset, per degree, "default" for every degree without a formula of its own. The default and the
+    # science bonus tables above aren't BGU's, which doesn't publish its sechem: they are an unsourced proxy
+    # that grows with the average, the psychometric score and the science bonus the way a sechem does. The
+    # learned bounds are in the proxy's units and only hold while it orders applicants like BGU's sechem,
+    # which the bgu_verdicts validator checks before the engine answers
+    "formulas": {
+        "default": {"bagrut": 0.5, "psychometric": 0.075, "section": "total", "science_bonus": 1, "offset": 0}
+    },
+    # published minimum sechem per degree, in the units of the formulas above
+    "thresholds": {},
+    # the sechem bounds learned from the browser's acceptance lists, per degree
+    "threshold_file": None,
+}
+
+
+class SechemEngine:
+    """
+    The BGU calculator computed in-process: the bagrut average with the bonus of each units level, the
+    science bonus of math, physics and the other science subjects, and the sechem of every degree from the
+    average, the science bonus and the psychometric scores. The tables live in the bgu_sechem section of
+    config.json.
+    """
+
+    MANDATORY_SUBJECTS = ("אנגלית", "מתמטיקה", "הבעה עברית", "היסטוריה", "אזרחות", "ספרות", "תנ\"ך")
+
+    def __init__(self, science_subjects, config=None):
+        self.science_subjects = science_subjects
+        self.config = config if config is not None else get_section("bgu_sechem", BGU_SECHEM_DEFAULTS)
+
+    def bonus(self, subject, units, grade):
+        if grade < self.config["min_bonus_grade"]:
+            return 0
+        table = self.config["math_bonus"] if subject == "מתמטיקה" else self.config["bonus"]
+        return table.get(str(units), 0)
+
+    # This method returns the bagrut average of the scores, after adapt_highschool_scores
+    def average(self, highschool_scores):
+        kept = []
+        electives = []
+        for subject, (grade, units) in highschool_scores.items():
+            grade = float(grade)
+            entry = (grade + self.bonus(subject, int(units), grade), int(units))
+            (kept if subject in self.MANDATORY_SUBJECTS else electives).append(entry)
+
+        # the best electives first, each one kept while it doesn't lower the average
+        for entry in sorted(electives, reverse=True):
+            if kept and self.config["drop_lowering_electives"] and entry[0] < self._average(kept):
+                break
+            kept.append(entry)
+        if not kept:
+            raise ValueError("no bagrut subjects")
+        return round(self._average(kept), self.config["decimals"])
+
+    def _average(self, entries):
+        return sum(grade * units for grade, units in entries) / sum(units for _, units in entries)
+
+    # This method returns the science bonus of math, physics and the other science subjects
+    def science_bonus(self, highschool_scores):
+        points = 0
+        for subject, (grade, units) in highschool_scores.items():
+            if subject == "מתמטיקה" or subject in self.science_subjects:
+                if float(grade) >= self.config["min_bonus_grade"]:
+                    points += self.config["science_bonus"].get(str(int(units)), 0)
+        return min(points, self.config["science_bonus_cap"])
+
+    # This method returns (average, {degree: sechem}) for the degrees to check
+    def sechems(self, highschool_scores, psychometric, degrees):
+        average = self.average(highschool_scores)
+        science_bonus = self.science_bonus(highschool_scores)
+        results = {}
+        for degree in degrees:
+            formula = self.config["formulas"].get(degree, self.config["formulas"]["default"])
+            sechem = (formula["bagrut"] * average
+                      + formula["psychometric"] * float(psychometric.get(formula["section"], 0) or 0)
+                      + formula["science_bonus"] * science_bonus
+                      + formula["offset"])
+            results[degree] = round(sechem, 3)
+        return average, results
+
+
+class ThresholdTable:
+    """
+    The per-degree sechem thresholds the engine's verdicts are read from. A published threshold from the
+    config decides on its own. Otherwise the browser runs narrow the threshold of each degree they checked,
+    once the engine's formula is validated: an accepted sechem is an upper bound, a rejected one a lower
+    bound. A sechem outside the bounds has a known verdict, one between them still needs the browser.
+    Bounds are kept in threshold_file.
+    """
+
+    def __init__(self, path, published=None):
+        self.path = path
+        self.published = published or {}
+        self._lock = threading.Lock()
+        self._bounds = None
+
+    def _load(self):
+        if self._bounds is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._bounds = json.load(f)
+            except Exception:
+                self._bounds = {}
+        return self._bounds
+
+    # This method returns True/False for accepted/rejected, or None when the sechem is between the bounds
+    def verdict(self, degree, sechem):
+        if degree in self.published:
+            return sechem >= self.published[degree]
+        with self._lock:
+            bounds = self._load().get(degree, {})
+        if bounds.get("accepted") is not None and sechem >= bounds["accepted"]:
+            return True
+        if bounds.get("rejected") is not None and sechem <= bounds["rejected"]:
+            return False
+        return None
+
+    # This method narrows the bounds of the degrees with the verdicts of a browser run, {degree: (sechem, accepted)}
+    def learn(self, observations):
+        with self._lock:
+            bounds = self._load()
+            for degree, (sechem, accepted) in observations.items():
+                entry = bounds.setdefault(degree, {"accepted": None, "rejected": None})
+                key = "accepted" if accepted else "rejected"
+                if entry[key] is None or (sechem < entry[key] if accepted else sechem > entry[key]):
+                    entry[key] = sechem
+                # bounds that cross mean the formula or the threshold changed, start over from this run
+                if entry["accepted"] is not None and entry["rejected"] is not None and entry["accepted"] <= entry["rejected"]:
+                    print(f"⚠️ sechem bounds of {degree} crossed, resetting them")
+                    bounds[degree] = {"accepted": sechem if accepted else None, "rejected": None if accepted else sechem}
+            try:
+                with open(self.path, "w", encoding="utf-8") as f:
+                    json.dump(bounds, f, ensure_ascii=False, indent=2)
+            except Exception as e:
+                print(f"⚠️ Could not save the sechem thresholds: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {"published": len(self.published), "learned": len(self._load())}
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+# This function returns the threshold table of a file, shared by every request of the process
+def threshold_table(path, published=None):
+    with _tables_lock:
+        if path not in _tables:
+            _tables[path] = ThresholdTable(path, published)
+        return _tables[path]
@@ -1,14 +1,27 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from contextlib import contextmanager
+import os
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 import json
 import time
+import asyncio
+import urllib.parse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend_common"))
+from driver_resolver import create_chrome_service
+from profile_template import is_prepared
+from calculator_page import CalculatorPage
+from async_cdp import SET_VALUE_SCRIPT
+from page_waits import EventWait
+from http_session import HttpSession, http_enabled
+from html_forms import parse_forms, parse_rows, submit_action, ElementTextParser
+from engine_validation import engine_validator
+from bagrut_engine import BagrutEngine
+from tier_resolver import TierResolver, threshold_cache
 
 class TelAvivUniversity():
 
@@ -111,11 +124,66 @@ class TelAvivUniversity():
         "תלמוד"
     }
 
+    # calculator pages kept loaded between requests, their forms are cleared in place instead of reloading
+    bagrut_page = CalculatorPage(
+        "https://www.ims.tau.ac.il/md/calc/Bagrut.aspx",
+        (By.CLASS_NAME, "trtblscont"),
+        reset_script="""
+            var table = document.querySelector('.trtblscont');
+            if (!table) { return false; }
+            var inputs = table.querySelectorAll('input[type=text], input:not([type])');
+            for (var i = 0; i < inputs.length; i++) { inputs[i].value = ''; }
+            return true;
+        """,
+        post_to_frame=True
+    )
+
+    match_calculator_page = CalculatorPage(
+        "https://go.tau.ac.il/he/calculator",
+        (By.TAG_NAME, "form"),
+        reset_script="""
+            var form = document.querySelector('form');
+            if (!form) { return false; }
+            var inputs = form.querySelectorAll('input');
+            for (var i = 0; i < inputs.length; i++) {
+                if (inputs[i].type === 'checkbox' || inputs[i].type === 'radio') {
+                    if (inputs[i].checked) { inputs[i].click(); }
+                } else {
+                    inputs[i].value = '';
+                    inputs[i].dispatchEvent(new Event('input', { bubbles: true }));
+                }
+            }
+            // hide the previous results so the next calculation is waited for
+            var results = document.querySelectorAll('div.suitability-calc.faculty-filter-shown');
+            for (var j = 0; j < results.length; j++) { results[j].classList.remove('faculty-filter-shown'); }
+            return true;
+        """
+    )
+
     ### methods ###
 
-    def __init__(self, options):
-        self.service = Service(ChromeDriverManager().install())
+    def __init__(self, service, options, pool=None):
+        self.service = service
         self.options = options
+        self.pool = pool
+        self.bagrut_engine = BagrutEngine()
+        self.bagrut_validator = engine_validator("tau_bagrut")
+        # the tiers that answered this request's steps, reported in the response
+        self.tiers = TierResolver("tel_aviv")
+        self.thresholds = threshold_cache("tau_subject_thresholds")
+
+    # This method lends a driver from the backend's pool, or starts a private one when running without a pool
+    @contextmanager
+    def lease_driver(self, step=None, page=None):
+        if self.pool is not None:
+            with self.pool.lease(step=step, page=page) as driver:
+                yield driver
+        else:
+            driver = webdriver.Chrome(service=self.service, options=self.options)
+            try:
+                yield driver
+            finally:
+                driver.quit()
 
     # This method will be executed when the thread starts
     def run(self, data):
@@ -133,7 +201,7 @@ class TelAvivUniversity():
 
         # handle edge case where the required subject is medicine or physiotherapy
         if data["subject"] == "רפואה" or data["subject"] == "פיזיותרפיה":
-            result = self.calculate_medicine_threshold(data)
+            result = self.tiers.resolve("medicine", [("engine", lambda: self.calculate_medicine_threshold(data))])
             msg = "עבור רפואה ופיזיותרפיה קבלה משמעותה מעבר תנאי סף על מנת להתחיל בתהליך המיונים ולא בקבלה ללימודים"
         
 
@@ -147,11 +215,98 @@ class TelAvivUniversity():
             match_scores = self.get_tlv_match_scores(data)
             result = self.is_accepted_per_subject(data, match_scores)
         
-        return {"isAccepted": result, "url": url, "message": msg}
+        return self.tiers.report({"isAccepted": result, "url": url, "message": msg})
 
-    # This function scrapes the TLV high school score from the website
+    # This function returns the TLV high school score from the cheapest tier that answers: the local bagrut
+    # engine, Bagrut.aspx posted over HTTP, and the browser last. The engine is skipped while it hasn't
+    # matched Bagrut.aspx yet and every so often to check it still does
     def get_tlv_highschool_score(self, highschool_scores):
 
+        scores, special_subjects = self.prepare_bagrut_scores(highschool_scores)
+        engine_score = self.compute_engine_average(scores, special_subjects)
+        output = self.tiers.resolve("bagrut", [
+            ("engine", self.tiers.engine_tier(engine_score, self.bagrut_validator)),
+            ("http", (lambda: self.get_tlv_highschool_score_http(scores.copy(), list(special_subjects)).replace(" ", ""))
+                if http_enabled() else None),
+            ("browser", lambda: self.fetch_tlv_highschool_score(scores, special_subjects)),
+        ])
+        self.tiers.validate("bagrut", self.bagrut_validator, engine_score, output)
+        return output
+
+    # This function returns the engine's average, or None when it can't compute it
+    def compute_engine_average(self, scores, special_subjects):
+        try:
+            return self.bagrut_engine.average(scores, special_subjects)
+        except Exception as e:
+            print(f"⚠️ Bagrut engine failed: {e}")
+            return None
+
+    # This function scrapes the TLV high school score from the website
+    def fetch_tlv_highschool_score(self, scores, special_subjects):
+
+        # lease a driver that keeps the calculator page loaded when possible
+        with self.lease_driver("bagrut calculator", self.bagrut_page.url) as driver:
+            reused = self.bagrut_page.open(driver)
+            try:
+                output = self.fill_bagrut_calculator(driver, scores.copy(), list(special_subjects))
+            except Exception as e:
+                # a reused page that misbehaves is reloaded once before giving up
+                if not reused:
+                    raise
+                print(f"Reused Bagrut page failed, reloading it: {e}")
+                self.bagrut_page.open(driver, reload=True)
+                output = self.fill_bagrut_calculator(driver, scores.copy(), list(special_subjects))
+
+        return output.replace(" ", "")
+
+    # This function computes the TLV high school score without a browser: it GETs Bagrut.aspx, fills the
+    # subject lines of its form next to the __VIEWSTATE and __EVENTVALIDATION fields, posts it the way the
+    # submit button does and reads the average from the rowalter row of Bagrut_T.aspx
+    def get_tlv_highschool_score_http(self, scores, special_subjects):
+        session = HttpSession()
+        page = session.get(self.bagrut_page.url)
+
+        forms = parse_forms(page.text)
+        form = forms[0] if forms else None
+        if form is None or "__VIEWSTATE" not in dict(form["fields"]):
+            raise ValueError("Bagrut.aspx has no ASP.NET form")
+
+        # the grade and units input names and the subject name of every line of the form
+        row_names = []
+        row_inputs = []
+        for cells in parse_rows(page.text, container_class="trtblscont"):
+            if len(cells) > 2 and cells[0]["inputs"] and cells[1]["inputs"]:
+                row_names.append(cells[2]["text"])
+                row_inputs.append((cells[0]["inputs"][0], cells[1]["inputs"][0]))
+            else:
+                row_names.append(None)
+                row_inputs.append(None)
+        if not any(row_names):
+            raise ValueError("Bagrut.aspx has no subject lines")
+
+        values = {}
+        for index, grade, units in self.match_bagrut_rows(row_names, scores, special_subjects):
+            grade_name, units_name = row_inputs[index]
+            values[grade_name] = grade
+            values[units_name] = units
+
+        # post every field of the form with the filled lines, and the submit button as the one clicked
+        fields = [(name, values.get(name, value)) for name, value in form["fields"]]
+        submit = form["submits"][0] if form["submits"] else None
+        if submit is not None:
+            fields.append((submit["name"], submit["value"]))
+        action = urllib.parse.urljoin(page.url, submit_action(form, submit) or page.url)
+        result = session.post(action, data=fields, headers={"Referer": page.url})
+
+        rows = parse_rows(result.text, row_class="rowalter")
+        if not rows or len(rows[0]) < 3 or not rows[0][2]["text"]:
+            raise ValueError("Bagrut_T.aspx has no rowalter row")
+        return rows[0][2]["text"]
+
+    # This function maps the high school scores to the Bagrut.aspx naming, and splits out the subjects
+    # that have no line of their own in the form
+    def prepare_bagrut_scores(self, highschool_scores):
+
         # create a copy of the dictionary to avoid modifying the original
         scores = highschool_scores.copy()
 
@@ -166,59 +321,88 @@ class TelAvivUniversity():
             if subject not in self.highschool_subject_in_form:
                 special_subjects.append(scores.pop(subject))
 
-        # Provide the correct path to your ChromeDriver executable
-        driver = webdriver.Chrome(service=self.service, options=self.options)
-        driver.get("https://www.ims.tau.ac.il/md/calc/Bagrut.aspx")
+        return scores, special_subjects
 
-        # extract the form element
-        form = driver.find_element(By.TAG_NAME, "form")
+    # This function decides which form line gets which subject. row_names holds the subject name of every
+    # line of the form (None for lines without inputs), the result is a list of (line index, grade, units)
+    def match_bagrut_rows(self, row_names, scores, special_subjects):
+        assignments = []
+        for index, subject_name in enumerate(row_names):
 
-        # extract the subject lines from the form
-        free_tables = form.find_element(By.CLASS_NAME, "trtblscont")
-        lines = free_tables.find_elements(By.TAG_NAME, "tr")
-
-        # iterate over the lines and fill in the scores
-        for line in lines:
-
-            # check if the line contains input elements
-            if (line.find_elements(By.TAG_NAME, "input")):
-
-                # get the subject name from the line
-                tds = line.find_elements(By.TAG_NAME, "td")
-                subject_name = tds[2].text
-
-                # make sure the subject name matches that in the scores dictionary
-                for name in scores.keys():
-                    if name in subject_name:
-                        subject_name = name
-                        break
-                
-                # handle case where subject isn't in the dictionary
-                if subject_name not in scores.keys() and subject_name != "אחר ללא בונוס":
-                    continue
-                
-                # handle case where we're at special subject line but there are no special subjects left
-                if subject_name == "אחר ללא בונוס" and len(special_subjects) <= 0:
-                    continue
-
-                # get the subject data from the appropriate source
-                if subject_name == "אחר ללא בונוס":
-                    subject_data = special_subjects.pop(0)
-                else:
-                    subject_data = scores.pop(subject_name)
-                
-                # get the grade and units for the subject
-                grade = subject_data[0]
-                units = subject_data[1]
-
-                # Enter grade and units for the subject
-                input_grade = tds[0].find_element(By.TAG_NAME, "input")
-                input_units = tds[1].find_element(By.TAG_NAME, "input")
-                input_grade.send_keys(grade)
-                input_units.send_keys(units)
+            # skip lines without input elements
+            if subject_name is None:
+                continue
+
+            # make sure the subject name matches that in the scores dictionary
+            for name in scores.keys():
+                if name in subject_name:
+                    subject_name = name
+                    break
+        
+            # handle case where subject isn't in the dictionary
+            if subject_name not in scores.keys() and subject_name != "אחר ללא בונוס":
+                continue
+        
+            # handle case where we're at special subject line but there are no special subjects left
+            if subject_name == "אחר ללא בונוס" and len(special_subjects) <= 0:
+                continue
+
+            # get the subject data from the appropriate source
+            if subject_name == "אחר ללא בונוס":
+                subject_data = special_subjects.pop(0)
+            else:
+                subject_data = scores.pop(subject_name)
+
+            # keep the grade and units for the subject
+            assignments.append((index, subject_data[0], subject_data[1]))
+
+        return assignments
+
+    # This function turns the scores into [name, grade, units] entries, the order the form script matches them in
+    def bagrut_score_list(self, scores):
+        return [[name, values[0], values[1]] for name, values in scores.items()]
+
+    # Script that finds the subject lines of the Bagrut.aspx form, matches them to the scores the way
+    # match_bagrut_rows does and fills their grade and units. It returns [line, subject, grade, units] for
+    # every filled line, or null when the form has no subject lines
+    BAGRUT_FILL_SCRIPT = SET_VALUE_SCRIPT + """
+        var table = document.querySelector('form .trtblscont');
+        if (!table) { return null; }
+        var scores = arguments[0].slice();
+        var special = arguments[1].slice();
+        var lines = table.querySelectorAll('tr');
+        var filled = [];
+        for (var i = 0; i < lines.length; i++) {
+            var tds = lines[i].querySelectorAll('td');
+            if (!lines[i].querySelector('input') || tds.length < 3) { continue; }
+            var name = tds[2].innerText.trim();
+            var data = null;
+            var match = scores.findIndex(function(entry) { return name.indexOf(entry[0]) !== -1; });
+            if (match !== -1) {
+                var entry = scores.splice(match, 1)[0];
+                name = entry[0];
+                data = entry.slice(1);
+            } else if (name === 'אחר ללא בונוס' && special.length > 0) {
+                data = special.shift();
+            }
+            if (!data) { continue; }
+            setValue(tds[0].querySelector('input'), data[0]);
+            setValue(tds[1].querySelector('input'), data[1]);
+            filled.push([i, name, data[0], data[1]]);
+        }
+        return filled;
+    """
+
+    # This function fills the Bagrut.aspx form of a loaded page and returns the average it calculates
+    def fill_bagrut_calculator(self, driver, scores, special_subjects):
+
+        # find, match and fill the subject lines in one script call
+        filled = driver.execute_script(self.BAGRUT_FILL_SCRIPT, self.bagrut_score_list(scores), special_subjects)
+        if filled is None:
+            raise Exception("Bagrut form lines not found")
 
         # Find and click the submit button safely
-        submit_button = WebDriverWait(driver, 10).until(
+        submit_button = EventWait(driver, 10).until(
             EC.element_to_be_clickable((By.XPATH, "//input[@type='submit']"))
         )
 
@@ -226,45 +410,61 @@ class TelAvivUniversity():
         driver.execute_script("arguments[0].scrollIntoView();", submit_button)
         driver.execute_script("arguments[0].click();", submit_button)
 
-        # Wait for the results page to load
-        WebDriverWait(driver, 10).until(EC.url_contains("Bagrut_T.aspx"))
-
-        # Extract results
-        result_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-
-        result_line = result_element.find_element(By.CLASS_NAME, "rowalter")
+        # Wait for the Bagrut_T.aspx results, posted to a hidden frame when the page is kept loaded
+        result_line = self.bagrut_page.wait_for_result(driver, (By.CLASS_NAME, "rowalter"))
         output = result_line.find_elements(By.TAG_NAME, "td")[2].text
+        self.bagrut_page.leave_result(driver)
 
-        driver.quit()
-
-        return output.replace(" ", "")
+        return output
 
-    # This function scrapes the TLV match score from the website
+    # This function returns the TLV match scores from the calculator in the browser. TAU doesn't publish the
+    # sectional formulas, so there is no engine for them
     def get_tlv_match_scores(self, inputJson):
 
         # extract scores from inputJson
         psycho_score = inputJson["psycho_score"]
         hs_dict = inputJson["highschool_scores"]
         highschool_score = self.get_tlv_highschool_score(hs_dict)
-        
-        # Provide the correct path to your ChromeDriver executable
-        driver = webdriver.Chrome(service=self.service, options=self.options)
-        driver.get("https://go.tau.ac.il/he/calculator")
-        
+
+        return self.tiers.resolve("match_scores", [
+            ("browser", lambda: self.fetch_tlv_match_scores(hs_dict, highschool_score, psycho_score)),
+        ])
+
+    # This function tells whether the calculator's 5 units in math and physics box applies
+    def has_five_units(self, hs_dict):
+        return hs_dict["מתמטיקה"][1] == "5" and "פיזיקה" in hs_dict.keys() and hs_dict["פיזיקה"][1] == "5"
+
+    # This function scrapes the TLV match score from the website
+    def fetch_tlv_match_scores(self, hs_dict, highschool_score, psycho_score):
+
+        # lease a driver that keeps the calculator page loaded when possible
+        with self.lease_driver("match score calculator", self.match_calculator_page.url) as driver:
+            reused = self.match_calculator_page.open(driver)
+            try:
+                return self.fill_match_calculator(driver, hs_dict, highschool_score, psycho_score)
+            except Exception as e:
+                # a reused page that misbehaves is reloaded once before giving up
+                if not reused:
+                    raise
+                print(f"Reused calculator page failed, reloading it: {e}")
+                self.match_calculator_page.open(driver, reload=True)
+                return self.fill_match_calculator(driver, hs_dict, highschool_score, psycho_score)
+
+    # This function fills the match score calculator of a loaded page and returns the sectional scores
+    def fill_match_calculator(self, driver, hs_dict, highschool_score, psycho_score):
+
         # extract the input elements from the form
         form = driver.find_element(By.TAG_NAME, "form")
         [highschool_input, psycho_input, units_5_button] = form.find_elements(By.TAG_NAME, "input")
-        
+    
         # enter inputs into the form
         highschool_input.send_keys(highschool_score)
         psycho_input.send_keys(psycho_score)
-        if (hs_dict["מתמטיקה"][1] == "5" and "פיזיקה" in hs_dict.keys() and hs_dict["פיזיקה"][1] == "5"):
+        if self.has_five_units(hs_dict):
             units_5_button.click()
 
         # Find and click the submit button
-        submit_button = WebDriverWait(driver, 10).until(
+        submit_button = EventWait(driver, 10).until(
             EC.element_to_be_clickable((By.CSS_SELECTOR, "button.calc-btn.btn.btn-dark"))
         )
 
@@ -272,7 +472,7 @@ class TelAvivUniversity():
         driver.execute_script("arguments[0].scrollIntoView();", submit_button)
         driver.execute_script("arguments[0].click();", submit_button)
 
-        continue_element = WebDriverWait(driver, 10).until(
+        continue_element = EventWait(driver, 10).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "div.suitability-calc.faculty-filter-shown.container-fluid"))
         )
 
@@ -282,8 +482,6 @@ class TelAvivUniversity():
         # get sectional scores
         sectional_results = continue_element.find_element(By.TAG_NAME, "table").find_element(By.CLASS_NAME, "tr-r").find_elements(By.TAG_NAME, "td")
         [engineering_score, exact_score, nomor_score, management_score] = [sectional_results[i].text for i in range(len(sectional_results))]
-        
-        driver.quit()
 
         return {
             "הנדסה": engineering_score,
@@ -298,30 +496,71 @@ class TelAvivUniversity():
 
         # find which url to go to according to the subject
         url = self.subject_url_dict[inputJson["subject"]]
-
-        # Provide the correct path to your ChromeDriver executable
-        driver = webdriver.Chrome(service=self.service, options=self.options)
-        driver.get(url)
-
-        # Wait for the popup close button to appear and click it
-        try:
-            close_button = WebDriverWait(driver, 2).until(
-                EC.element_to_be_clickable((By.CLASS_NAME, "ui-dialog-titlebar-close"))
-            )
-            close_button.click()
-        except:
-            pass
-
-        main_content = driver.find_element(By.ID, "main-content")
-        required_scores = main_content.find_element(By.ID, "acceptancechances").find_element(By.CLASS_NAME, "right-half").find_element(By.CLASS_NAME, "indexing")
-
-        # get the acceptance and rejection thresholds and my score
-        acceptance_threshold = int(required_scores.find_element(By.ID, "acceptanceThreshold").get_attribute("innerHTML"))
-        rejection_threshold = int(required_scores.find_element(By.ID, "rejectionThreshold").get_attribute("innerHTML"))
         my_score = int(match_scores[self.subject_sectional_dict[inputJson["subject"]]])
 
-        driver.quit()
-
+        # the thresholds change once a year, they are read from the site once and then answered from memory.
+        # they are two numbers of the page's HTML, the browser is only needed when fetching them fails
+        acceptance_threshold, rejection_threshold = self.tiers.resolve("thresholds", [
+            ("threshold", lambda: self.thresholds.get(url)),
+            ("http", (lambda: self.get_subject_thresholds_http(url)) if http_enabled() else None),
+            ("browser", lambda: self.fetch_subject_thresholds(url)),
+        ])
+        if self.tiers.steps["thresholds"] != "threshold":
+            self.thresholds.put(url, (acceptance_threshold, rejection_threshold))
+
+        return self.acceptance_decision(my_score, acceptance_threshold, rejection_threshold)
+
+    # This function scrapes the acceptance and rejection thresholds of a subject page in the browser
+    def fetch_subject_thresholds(self, url):
+
+        # lease a driver and open the subject page
+        with self.lease_driver("subject thresholds") as driver:
+            driver.get(url)
+
+            # Wait for the popup close button to appear and click it, a session prepared from the
+            # profile template has the popup already dismissed so it only closes it if it shows up anyway
+            try:
+                if is_prepared(driver):
+                    for close_button in driver.find_elements(By.CLASS_NAME, "ui-dialog-titlebar-close"):
+                        driver.execute_script("arguments[0].click();", close_button)
+                else:
+                    close_button = EventWait(driver, 2).until(
+                        EC.element_to_be_clickable((By.CLASS_NAME, "ui-dialog-titlebar-close"))
+                    )
+                    close_button.click()
+            except:
+                pass
+
+            # the thresholds are the readiness condition of the page
+            EventWait(driver, 10).until(
+                EC.presence_of_element_located((By.ID, "rejectionThreshold"))
+            )
+            main_content = driver.find_element(By.ID, "main-content")
+            required_scores = main_content.find_element(By.ID, "acceptancechances").find_element(By.CLASS_NAME, "right-half").find_element(By.CLASS_NAME, "indexing")
+
+            # get the acceptance and rejection thresholds and my score
+            acceptance_threshold = int(required_scores.find_element(By.ID, "acceptanceThreshold").get_attribute("innerHTML"))
+            rejection_threshold = int(required_scores.find_element(By.ID, "rejectionThreshold").get_attribute("innerHTML"))
+
+        return acceptance_threshold, rejection_threshold
+
+    # This function reads the acceptance and rejection thresholds of a subject page over HTTP. The page is
+    # parsed as it downloads and the read stops at the thresholds; when the elements are empty because a
+    # script fills them, the values are taken from the page's script data instead
+    def get_subject_thresholds_http(self, url):
+        parser = ElementTextParser(["acceptanceThreshold", "rejectionThreshold"])
+        HttpSession().stream(url, parser.consume)
+
+        thresholds = []
+        for element_id in parser.ids:
+            value = parser.texts.get(element_id) or parser.script_value(element_id)
+            if not value or not value.isdigit():
+                raise ValueError(f"{element_id} not found in {url}")
+            thresholds.append(int(value))
+        return thresholds[0], thresholds[1]
+
+    # This function compares the match score of the subject's section to the subject's thresholds
+    def acceptance_decision(self, my_score, acceptance_threshold, rejection_threshold):
         if (my_score >= acceptance_threshold):
             return "קבלה"
         elif (my_score >= rejection_threshold):
@@ -345,11 +584,155 @@ class TelAvivUniversity():
         else:
             return "דחייה"
 
+    ### async engine ###
+
+    # This method is the asyncio version of run, it drives the pages through the async CDP engine
+    async def run_async(self, data, browser):
+
+        # check if the subject is in the subject_alternative_name_dict and replace it if necessary
+        if data["subject"] in self.subject_alternative_name_dict.keys():
+            data["subject"] = self.subject_alternative_name_dict[data["subject"]]
+        print(data["subject"])
+
+        # get relevant url for the subject
+        url = self.subject_url_dict[data["subject"]]
+
+        # message to be returned
+        msg = ""
+
+        # handle edge case where the required subject is medicine or physiotherapy
+        if data["subject"] == "רפואה" or data["subject"] == "פיזיותרפיה":
+            result = self.tiers.resolve("medicine", [("engine", lambda: self.calculate_medicine_threshold(data))])
+            msg = "עבור רפואה ופיזיותרפיה קבלה משמעותה מעבר תנאי סף על מנת להתחיל בתהליך המיונים ולא בקבלה ללימודים"
+
+        # handle case where subject doesn't exist in TLV
+        elif data["subject"] == "הנדסה אזרחית":
+            result = None
+            msg = "הנדסה אזרחית לא קיימת במערכת הקבלה של אוניברסיטת תל אביב. יש לבדוק את המידע באתר האוניברסיטה."
+
+        # handle general case
+        else:
+            match_scores = await self.get_tlv_match_scores_async(data, browser)
+            result = await self.is_accepted_per_subject_async(data, match_scores, browser)
+
+        return self.tiers.report({"isAccepted": result, "url": url, "message": msg})
+
+    # This function is the async version of get_tlv_highschool_score
+    async def get_tlv_highschool_score_async(self, highschool_scores, browser):
+        scores, special_subjects = self.prepare_bagrut_scores(highschool_scores)
+        engine_score = self.compute_engine_average(scores, special_subjects)
+
+        # the HTTP client runs in the loop's executor so the blocking client doesn't stall the other pages
+        output = await self.tiers.resolve_async("bagrut", [
+            ("engine", self.tiers.engine_tier(engine_score, self.bagrut_validator)),
+            ("http", (lambda: self.get_tlv_highschool_score_http_async(scores, special_subjects)) if http_enabled() else None),
+            ("browser", lambda: self.fetch_tlv_highschool_score_async(scores, special_subjects, browser)),
+        ])
+        self.tiers.validate("bagrut", self.bagrut_validator, engine_score, output)
+        return output
+
+    async def get_tlv_highschool_score_http_async(self, scores, special_subjects):
+        output = await asyncio.get_running_loop().run_in_executor(
+            None, self.get_tlv_highschool_score_http, scores.copy(), list(special_subjects))
+        return output.replace(" ", "")
+
+    # This function is the async version of fetch_tlv_highschool_score
+    async def fetch_tlv_highschool_score_async(self, scores, special_subjects, browser):
+        async with browser.page() as page:
+            await page.goto(self.bagrut_page.url, ".trtblscont")
+
+            # find, match and fill the subject lines in one script
+            await page.evaluate(self.BAGRUT_FILL_SCRIPT, self.bagrut_score_list(scores), special_subjects)
+
+            # submit and read the average from the Bagrut_T.aspx results
+            await page.click("input[type='submit']")
+            await page.wait_for_selector(".rowalter")
+            output = await page.evaluate("return document.querySelector('.rowalter').querySelectorAll('td')[2].innerText;")
+
+        return output.replace(" ", "")
+
+    # This function is the async version of get_tlv_match_scores
+    async def get_tlv_match_scores_async(self, inputJson, browser):
+
+        # extract scores from inputJson
+        psycho_score = inputJson["psycho_score"]
+        hs_dict = inputJson["highschool_scores"]
+        highschool_score = await self.get_tlv_highschool_score_async(hs_dict, browser)
+
+        return await self.tiers.resolve_async("match_scores", [
+            ("browser", lambda: self.fetch_tlv_match_scores_async(hs_dict, highschool_score, psycho_score, browser)),
+        ])
+
+    # This function is the async version of fetch_tlv_match_scores
+    async def fetch_tlv_match_scores_async(self, hs_dict, highschool_score, psycho_score, browser):
+        five_units = self.has_five_units(hs_dict)
+
+        async with browser.page() as page:
+            await page.goto(self.match_calculator_page.url, "form")
+
+            # enter inputs into the form
+            await page.evaluate(SET_VALUE_SCRIPT + """
+                var inputs = document.querySelector('form').querySelectorAll('input');
+                setValue(inputs[0], arguments[0]);
+                setValue(inputs[1], arguments[1]);
+                if (arguments[2]) { inputs[2].click(); }
+            """, str(highschool_score), str(psycho_score), five_units)
+
+            # calculate and read the general and sectional scores
+            await page.click("button.calc-btn.btn.btn-dark")
+            container = "div.suitability-calc.faculty-filter-shown.container-fluid"
+            await page.wait_for_selector(container)
+            results = await page.evaluate("""
+                var container = document.querySelector(arguments[0]);
+                var tds = container.querySelector('table .tr-r').querySelectorAll('td');
+                return {
+                    general: container.querySelector('.result-score').innerText,
+                    sectional: Array.prototype.map.call(tds, function(td) { return td.innerText; })
+                };
+            """, container)
+
+        [engineering_score, exact_score, nomor_score, management_score] = results["sectional"]
+        return {
+            "הנדסה": engineering_score,
+            "מדעים מדויקים": exact_score,
+            "ללא מור": nomor_score,
+            "ניהול": management_score,
+            "כללי": results["general"]
+        }
+
+    # This function is the async version of is_accepted_per_subject. The thresholds are read from the
+    # DOM, so the popup on the subject page doesn't need to be closed first
+    async def is_accepted_per_subject_async(self, inputJson, match_scores, browser):
+        url = self.subject_url_dict[inputJson["subject"]]
+        my_score = int(match_scores[self.subject_sectional_dict[inputJson["subject"]]])
+
+        acceptance_threshold, rejection_threshold = await self.tiers.resolve_async("thresholds", [
+            ("threshold", lambda: self.thresholds.get(url)),
+            ("http", (lambda: asyncio.get_running_loop().run_in_executor(None, self.get_subject_thresholds_http, url))
+                if http_enabled() else None),
+            ("browser", lambda: self.fetch_subject_thresholds_async(url, browser)),
+        ])
+        if self.tiers.steps["thresholds"] != "threshold":
+            self.thresholds.put(url, (acceptance_threshold, rejection_threshold))
+
+        return self.acceptance_decision(my_score, acceptance_threshold, rejection_threshold)
+
+    async def fetch_subject_thresholds_async(self, url, browser):
+        async with browser.page() as page:
+            await page.goto(url, "#acceptancechances #rejectionThreshold")
+            thresholds = await page.evaluate("""
+                var scores = document.querySelector('#main-content #acceptancechances .right-half .indexing');
+                return [scores.querySelector('#acceptanceThreshold').innerHTML,
+                        scores.querySelector('#rejectionThreshold').innerHTML];
+            """)
+
+        return int(thresholds[0]), int(thresholds[1])
+
 
 if __name__ == '__main__':
     options = Options()
     options.add_argument("--headless")  # Run in headless mode (no GUI)
-    uni = TelAvivUniversity(options)
+    uni = TelAvivUniversity(create_chrome_service(), options)
 
     # Load the input JSON file
     with open("input.json", "r", encoding="utf-8") as file:
@@ -1,10 +1,20 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from TelAvivUniversity import TelAvivUniversity
 import argparse
+import atexit
 import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend_common"))
+from driver_sources import create_driver_source, create_chrome_reaper, create_async_engine
+from driver_resolver import get_chromedriver_path, create_chrome_service
+from page_waits import wait_report, wait_stats
+from http_session import http_stats
+from engine_validation import engine_stats
+from tier_resolver import tier_stats
 
 app = Flask(__name__)
 CORS(app)
@@ -13,13 +23,43 @@ CORS(app)
 chrome_options = Options()
 chrome_options.add_argument("--headless")
 
+# resolve chromedriver once at boot, every driver of this process reuses the resolved path
+get_chromedriver_path()
+
+# warm drivers shared by all the requests of this backend (a local pool, or the machine-wide broker)
+driver_pool = create_driver_source("tel_aviv", chrome_options)
+atexit.register(driver_pool.shutdown)
+
+# background reaper of chrome/chromedriver processes leaked by crashed sessions
+chrome_reaper = create_chrome_reaper()
+
+# asyncio engine driving the requests' pages from one event loop, when enabled in config.json
+async_engine = create_async_engine("tel_aviv")
+
+# Route exposing the driver pool and reaper counters, including the memory reclaimed from leaked processes
+@app.route('/driver-stats', methods=['GET'])
+def driver_stats_handler():
+    return jsonify({
+        "pool": driver_pool.stats(),
+        "reaper": chrome_reaper.stats() if chrome_reaper else None,
+        "async_engine": async_engine.stats() if async_engine else None,
+        "waits": wait_stats(),
+        "http": http_stats(),
+        "engines": engine_stats(),
+        "tiers": tier_stats()
+    })
+
 # Route for Tel Aviv University analysis
 @app.route('/TelAviv', methods=['POST'])
 def tel_aviv_handler():
-    tel_aviv_university = TelAvivUniversity(chrome_options)
+    tel_aviv_university = TelAvivUniversity(create_chrome_service(), chrome_options, driver_pool)
     try:
         request_data = request.get_json()
-        result = tel_aviv_university.run(request_data)
+        with wait_report("tel_aviv"):
+            if async_engine:
+                result = async_engine.run(lambda browser: tel_aviv_university.run_async(request_data, browser))
+            else:
+                result = tel_aviv_university.run(request_data)
         return jsonify(result)
 
     except Exception as e:
@@ -27,6 +67,12 @@ def tel_aviv_handler():
 
 ### main function ###
 if __name__ == '__main__':
+    driver_pool.start()
+    if chrome_reaper:
+        chrome_reaper.start()
+    if async_engine:
+        async_engine.start()
+        atexit.register(async_engine.shutdown)
     try:
         with open('../config.json', 'r') as f:
             config = json.load(f)
@@ -0,0 +1,72 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend_common"))
+from gotin_config import get_section
+
+TAU_BAGRUT_DEFAULTS = {
+    # bonus points added to a grade by units level, for the subjects that have a line of their own. These are
+    # the bonus points TAU's admission guidance is usually quoted with (12.5 at 4 units, 25 at 5 units, 35
+    # for 5 units of math, none under 60). They weren't transcribed from Bagrut.aspx
+    # (www.ims.tau.ac.il/md/calc/Bagrut.aspx), which couldn't be reached when they were set, so the engine
+    # only answers once tau_bagrut's validator matched the calculator trust_after times in a row
+    "bonus": {"4": 12.5, "5": 25},
+    "math_bonus": {"4": 12.5, "5": 35},
+    "min_bonus_grade": 60,
+    # elective subjects that lower the average are left out of it, the mandatory ones always count
+    "drop_lowering_electives": True,
+    "decimals": 2,
+}
+
+
+class BagrutEngine:
+    """
+    TAU's Bagrut.aspx average computed in-process. It takes the scores prepare_bagrut_scores returns: the
+    subjects with a line of their own in the form get the bonus of their units level, the subjects of the
+    "אחר ללא בונוס" bucket count at their plain grade. The grades are weighted by units, and electives that
+    would lower the average are left out. The result is formatted like the rowalter cell of Bagrut_T.aspx.
+    The bonus tables live in the tau_bagrut section of config.json, they are unverified (see
+    TAU_BAGRUT_DEFAULTS) and the scraper checks them against the calculator.
+    """
+
+    MANDATORY_SUBJECTS = ("אנגלית", "מתמטיקה", "הבעה עברית", "היסטוריה/תע\"י", "אזרחות", "ספרות", "תנ\"ך")
+
+    def __init__(self, config=None):
+        self.config = config if config is not None else get_section("tau_bagrut", TAU_BAGRUT_DEFAULTS)
+
+    # This method returns the bonus points of a subject with a line of its own in the form
+    def bonus(self, subject, units, grade):
+        if grade < self.config["min_bonus_grade"]:
+            return 0
+        table = self.config["math_bonus"] if subject == "מתמטיקה" else self.config["bonus"]
+        return table.get(str(units), 0)
+
+    # This method returns the (grade with bonus, units, mandatory) entries of the scores
+    def weighted_entries(self, scores, special_subjects):
+        entries = []
+        for subject, (grade, units) in scores.items():
+            grade = float(grade)
+            units = int(units)
+            entries.append((grade + self.bonus(subject, units, grade), units, subject in self.MANDATORY_SUBJECTS))
+        for grade, units in special_subjects:
+            entries.append((float(grade), int(units), False))
+        return entries
+
+    # This method returns the average of the scores as Bagrut_T.aspx shows it
+    def average(self, scores, special_subjects):
+        entries = self.weighted_entries(scores, special_subjects)
+        kept = [entry for entry in entries if entry[2]]
+        electives = sorted((entry for entry in entries if not entry[2]), key=lambda entry: entry[0], reverse=True)
+
+        # the best electives first, each one kept while it doesn't lower the average
+        for entry in electives:
+            if kept and self.config["drop_lowering_electives"] and entry[0] < self._average(kept):
+                break
+            kept.append(entry)
+        if not kept:
+            raise ValueError("no bagrut subjects")
+        return f"{self._average(kept):.{self.config['decimals']}f}"
+
+    def _average(self, entries):
+        total_units = sum(units for _, units, _ in entries)
+        return sum(grade * units for grade, units, _ in entries) / total_units
@@ -2,15 +2,23 @@
 
 import json
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
-import time
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys 
-from selenium.webdriver.support.ui import WebDriverWait, Select
+from contextlib import contextmanager
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend_common"))
+from async_cdp import SET_VALUE_SCRIPT, PageTimeout
+from page_waits import EventWait, wait_for_dom_quiet
+from gotin_config import get_section
+from xhr_recorder import CALL_RECORDER_SCRIPT, READ_CALLS_SCRIPT, RECORDING_DEFAULTS, CallRecorder
+from engine_validation import engine_validator
+from tier_resolver import TierResolver
+from huji_engine import HujiEngine
 
 class HebrewUniversity:
 
@@ -125,12 +133,37 @@ class HebrewUniversity:
 }
     
     NOT_EXISTING_SUBJECTS = ["חינוך פיננסי", "הנדסת מכונות", "קולנוע","היסטוריה של עם ישראל"]
+
+    ENGLISH_UNITS_MSG = HujiEngine.ENGLISH_UNITS_MSG
     
-    def __init__(self, service, options):
+    def __init__(self, service, options, pool=None):
             self.service = service
             self.options = options
+            self.pool = pool
             self.msg = None
+            # records the JSON calls of the two sites, their endpoints aren't documented
+            self.recorder = CallRecorder(get_section("huji_call_recording", RECORDING_DEFAULTS),
+                                         os.path.join(os.path.dirname(os.path.abspath(__file__)), "huji_calls.json"),
+                                         "huji")
+            # the calculator's average computed in-process, checked against the calculator from time to time
+            self.engine = HujiEngine(self.CORE_SUBJECTS, self.NOT_EXISTING_SUBJECTS)
+            self.average_validator = engine_validator("huji_bagrut")
+            # the tiers that answered this request's steps, reported in the response
+            self.tiers = TierResolver("hebrew_university")
     
+    # lend a driver from the backend's pool, or start a private one when running without a pool
+    @contextmanager
+    def lease_driver(self, step=None):
+        if self.pool is not None:
+            with self.pool.lease(step=step) as driver:
+                yield driver
+        else:
+            driver = webdriver.Chrome(service=self.service, options=self.options)
+            try:
+                yield driver
+            finally:
+                driver.quit()
+
 
     def get_site_degree_options(self,user_input):
 
@@ -142,110 +175,75 @@ class HebrewUniversity:
 
 
     def calculate_psychometric_emphases(self,total,verbal, quantitative, english):
-        emphases = {
-            "verbal_emphasis": {
-                "name": "דגש מילולי",
-                "weights": {"verbal": 0.6, "quant": 0.2, "english": 0.2}
-            },
-            "quant_emphasis": {
-                "name": "דגש כמותי",
-                "weights": {"verbal": 0.2, "quant": 0.6, "english": 0.2}
-            },
-            "multi_emphasis": {
-                "name": "דגש רב תחומי",
-                "weights": {"verbal": 0.4, "quant": 0.4, "english": 0.2}
-            }
-        }
+        return self.engine.emphases(total, verbal, quantitative, english)
 
-        results = {}
 
-        for key, data in emphases.items():
-            w = data["weights"]
-            score = round(
-                verbal * w["verbal"] +
-                quantitative * w["quant"] +
-                english * w["english"]
-            )
-            original_avg = (verbal + quantitative + english) / 3
-            delta = score - original_avg
-
-            # מקדם תיקון משוער – מעלה או מוריד מהציון הכללי לפי ההטיה
-            correction_factor = 5.33
-            emphasis_score = round(total + delta * correction_factor)
-
-            # הגבלה בין 200 ל־800
-            emphasis_score = max(200, min(800, emphasis_score))
-            results[key] = emphasis_score 
+    # This function returns the values of the three emphasis fields, in the order the page shows them
+    def psychometric_field_values(self, psycho_scores):
+        total, quant_score, verbal_score, english_score = psycho_scores
 
-        return results
+        emphases = self.calculate_psychometric_emphases(total,verbal_score, quant_score, english_score)
 
+        return [
+            str(int(emphases["quant_emphasis"])),
+            str(int(emphases["verbal_emphasis"])),
+            str(int(emphases["multi_emphasis"]))
+        ]
 
-    def fill_psychometric_fields(self, fields, psycho_scores):
-        try:
-        # unpack 3 scores
-            total, quant_score, verbal_score, english_score = psycho_scores
-
-            emphases = self.calculate_psychometric_emphases(total,verbal_score, quant_score, english_score)
-
-            emphasis_values = [
-                emphases["quant_emphasis"],
-                emphases["verbal_emphasis"],
-                emphases["multi_emphasis"]
-            ]
-
-            for i, field in enumerate(fields):
-                if i >= len(emphasis_values):
-                    print(f"Field #{i+1} skipped — no matching emphasis value")
-                    break
-
-                value = str(int(emphasis_values[i]))
-
-                # Use JavaScript to set the value instead of direct input
-                input_el = field.find_element(By.TAG_NAME, "input")
-                
-                # Scroll the element into view first
-                driver = input_el.parent
-                driver.execute_script("arguments[0].scrollIntoView(true);", input_el)
-                time.sleep(0.5)
-                
-                # Clear and set value using JavaScript
-                driver.execute_script("arguments[0].value = '';", input_el)
-                driver.execute_script(f"arguments[0].value = '{value}';", input_el)
-                
-                # Trigger change event to ensure the value is registered
-                driver.execute_script("arguments[0].dispatchEvent(new Event('change', { bubbles: true }));", input_el)
-                driver.execute_script("arguments[0].dispatchEvent(new Event('blur', { bubbles: true }));", input_el)
-                
-                time.sleep(0.5)
-
-                confirmed_value = input_el.get_attribute("value")
-                if confirmed_value.strip() != value:
-                    driver.execute_script(f"arguments[0].value = '{value}';", input_el)
-                    driver.execute_script("arguments[0].dispatchEvent(new Event('change', { bubbles: true }));", input_el)
-                    time.sleep(0.5)
-
-
-            time.sleep(2)
-
-        except Exception as e:
-            print(f"Error in fill_psychometric_fields: {e}")
+    # Script that chooses the track and enters the bagrut average and the emphasis fields of the check your
+    # chance page in one call, and reads them back. A field whose handlers rewrote the value gets it once more
+    CHANCE_FORM_SCRIPT = SET_VALUE_SCRIPT + """
+        var select = document.querySelector("select[name='courseTrack']");
+        var track = false;
+        for (var i = 0; select && i < select.options.length; i++) {
+            if (select.options[i].text.trim() === arguments[0]) { setValue(select, select.options[i].value); track = true; break; }
+        }
+        var bagrut = document.querySelector("[name='bagrut']");
+        setValue(bagrut, arguments[1]);
+        var values = arguments[2];
+        var inputs = Array.prototype.map.call(document.querySelectorAll('.pet-fields .field'), function(field) {
+            return field.querySelector('input');
+        }).slice(0, values.length);
+        function fill(input, value) {
+            if (setValue(input, value)) { input.dispatchEvent(new Event('blur', { bubbles: true })); }
+        }
+        inputs.forEach(function(input, i) { fill(input, values[i]); });
+        inputs.forEach(function(input, i) { if (input && input.value.trim() !== values[i]) { fill(input, values[i]); } });
+        return {
+            track: track,
+            bagrut: !!bagrut && bagrut.value.trim() === arguments[1],
+            fields: values.map(function(value, i) { return !!inputs[i] && inputs[i].value.trim() === value; })
+        };
+    """
+
+    # This function reports what the form script couldn't set, the page is submitted anyway as before
+    def check_chance_form(self, checks, site_option_2):
+        if not checks["track"]:
+            print(f"Track option '{site_option_2}' not found in dropdown.")
+        if not checks["bagrut"]:
+            print("Bagrut average was not accepted by the form")
+        for i, ok in enumerate(checks["fields"]):
+            if not ok:
+                print(f"Field #{i+1} skipped — its value did not hold")
 
 
     # === first website ===
-    def getDriver1(self):    
+    def getDriver1(self, driver):    
         
-        driver = webdriver.Chrome(service=self.service, options=self.options)
-
         driver.get("https://bagrut-calculator.huji.ac.il/calculator/#/grade-input")
 
-        time.sleep(3)
+        # the calculator is rendered by the page's scripts after the document loads
+        EventWait(driver, 10, replaces=3).until(EC.presence_of_element_located((By.CLASS_NAME, "btn-group")))
+        self.record_calls(driver)
 
         return driver
 
 
     def firstPageOfCalculator(self, driver):    
 
-        btn_group = driver.find_element(By.CLASS_NAME, "btn-group")
+        btn_group = EventWait(driver, 10).until(
+            EC.presence_of_element_located((By.CLASS_NAME, "btn-group"))
+        )
 
         # Find all buttons inside the group
         buttons = btn_group.find_elements(By.TAG_NAME, "button")
@@ -260,79 +258,40 @@ class HebrewUniversity:
         first_item.click()
 
         #click the "Next" button
-        btn_show = WebDriverWait(driver, 10).until(
+        btn_show = EventWait(driver, 10).until(
         EC.element_to_be_clickable((By.CLASS_NAME, "btn-show")))
 
         btn_show.click()
 
-        WebDriverWait(driver, 10).until(EC.url_contains("/grade-input"))
+        EventWait(driver, 10).until(EC.url_contains("/grade-input"))
 
     
     def secondPageOfCalculator(self, driver,scores):
 
 
-        WebDriverWait(driver, 10).until(
+        EventWait(driver, 10).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "div.subject-title span")))
         
-        #Find and print subject names
-        subject_rows = driver.find_elements(By.CSS_SELECTOR, 'div.input-data')
-        
-        for i, line in enumerate(subject_rows):
-            # Check if the line contains an input element (indicating it's a subject row)  
-            if (line.find_elements(By.TAG_NAME, "input")):
-
-                subject_name_el = line.find_element(By.CSS_SELECTOR, 'div.subject-title span')
-                subject_name = subject_name_el.text.strip()
-
-                normalized_name = self.SUBJECT_NAME_MAP.get(subject_name, subject_name)
-
-                if normalized_name not in scores:
-                    continue
-
-                #take from the json   
-                # here to change i need to make a map from subjectname to the json 
-
-                grade = scores[normalized_name][0]
-                inits= scores[normalized_name][1]
-
-                if normalized_name == "אנגלית" and int(inits) < 4:
-                    self.msg = "כמות היחידות באנגלית נמוכה מדי. נדרש מינימום של 4 יחידות."
-                    driver.quit()
-                    return
-
-
-                # Enter units  for the subject
-
-                #click in the dropdown
-                dropdown_toggle = line.find_element(By.CSS_SELECTOR, "div.subject-units button.dropdown-toggle-split")
-                dropdown_toggle.click()
-
-                #the options in the dropdown
-                options = line.find_elements(By.CSS_SELECTOR, "div.subject-units .dropdown-menu a.dropdown-item")
-                for option in options:
-                    if option.text.strip() == str(inits):
-                        option.click()
-                        break
-
-                #write the grade
-                input_grade = line.find_element(By.CSS_SELECTOR, 'div.subject-grade input')
-                input_grade.clear()
-                input_grade.send_keys(str(grade))
+        # Units and grades of all the listed subjects in one script call
+        rows, self.msg = self.plan_subject_rows(driver.execute_script(self.ROW_NAMES_SCRIPT), scores)
+        if self.msg is not None:
+            return
+        self.fill_subject_rows(driver, rows)
 
         #add more subjects
         for subject_name in scores.keys():
             print(f"Processing subject: {subject_name}")
             if subject_name not in self.CORE_SUBJECTS and subject_name not in self.NOT_EXISTING_SUBJECTS:
 
-                add_span = WebDriverWait(driver, 10).until(
+                add_span = EventWait(driver, 10).until(
                 EC.presence_of_element_located((By.XPATH, "//span[contains(text(), 'הוסף מקצוע')]"))
             )
                 add_button = add_span.find_element(By.XPATH, "..")
                 add_button.click()
-                time.sleep(1) 
+                wait_for_dom_quiet(driver, quiet=0.1, timeout=1, replaces=1)
 
                 # Find the new input field and write the subject name
-                new_subject_input = WebDriverWait(driver, 10).until(
+                new_subject_input = EventWait(driver, 10).until(
                     EC.presence_of_element_located((By.CSS_SELECTOR, "input[placeholder='הקלד מקצוע']"))
                 )
                 new_subject_input.clear()
@@ -342,69 +301,98 @@ class HebrewUniversity:
 
                 # new_subject_input.send_keys(subject_name)
 
-                time.sleep(2) 
-
-                subject_rows = driver.find_elements(By.CSS_SELECTOR, "div.input-data")
-
-                #the new line we added
-                new_subject_row = subject_rows[-1]
-
-                # open the dropdown of the uints
-                dropdown_toggle = new_subject_row.find_element(By.CSS_SELECTOR, "div.subject-units button.dropdown-toggle-split")
-                dropdown_toggle.click()
+                # wait for the typed subject to be matched and its row to render
+                wait_for_dom_quiet(driver, quiet=0.3, timeout=2, replaces=2)
 
-                # choose the correct units
-                units = scores[subject_name][1]
-                options = new_subject_row.find_elements(By.CSS_SELECTOR, "div.subject-units .dropdown-menu a.dropdown-item")
-                for option in options:
-                    if option.text.strip() == str(units):
-                        option.click()
-                        break
-
-                # write the grade
-                grade_input = new_subject_row.find_element(By.CSS_SELECTOR, "div.subject-grade input")
-                grade = scores[subject_name][0]
-                grade_input.clear()
-                grade_input.send_keys(str(grade))
+                # units and grade of the new line we added
+                self.fill_subject_rows(driver, [(-1, str(scores[subject_name][1]), str(scores[subject_name][0]))])
 
 
         # Click the "Calculate" button
     
-        btn_show = WebDriverWait(driver, 10).until(
+        btn_show = EventWait(driver, 10).until(
         EC.element_to_be_clickable((By.CLASS_NAME, "btn-calc")))
 
         btn_show.click()
 
-        WebDriverWait(driver, 20).until(EC.url_contains("/calc-average"))
+        EventWait(driver, 20).until(EC.url_contains("/calc-average"))
+
+
+    # Script that returns the subject name of every subject row, null for rows without an input
+    ROW_NAMES_SCRIPT = """
+        var rows = document.querySelectorAll('div.input-data');
+        var names = [];
+        for (var i = 0; i < rows.length; i++) {
+            var title = rows[i].querySelector('div.subject-title span');
+            names.push(rows[i].querySelector('input') && title ? title.innerText.trim() : null);
+        }
+        return names;
+    """
+
+    # This function matches the subject rows of the page to the scores, it returns the rows to fill as
+    # (row index, units, grade) and a rejection message when English has too few units
+    def plan_subject_rows(self, row_names, scores):
+        rows = []
+        for index, subject_name in enumerate(row_names):
+            normalized_name = self.SUBJECT_NAME_MAP.get(subject_name, subject_name)
+            if subject_name is None or normalized_name not in scores:
+                continue
+            grade, units = scores[normalized_name][0], scores[normalized_name][1]
+            if normalized_name == "אנגלית" and int(units) < 4:
+                return None, self.ENGLISH_UNITS_MSG
+            rows.append((index, str(units), str(grade)))
+        return rows, None
+
+    # This function fills subject rows with one script call, rows the script couldn't fill are typed
+    def fill_subject_rows(self, driver, rows):
+        checks = driver.execute_script(self.FILL_ROWS_SCRIPT, rows)
+        subject_rows = driver.find_elements(By.CSS_SELECTOR, "div.input-data")
+        for (index, units, grade), check in zip(rows, checks):
+            if not check["units"] or not check["grade"]:
+                self.type_subject_row(subject_rows[index], units, grade)
+
+    # This function picks the units and types the grade of one subject row through the page
+    def type_subject_row(self, line, units, grade):
+        #click in the dropdown
+        dropdown_toggle = line.find_element(By.CSS_SELECTOR, "div.subject-units button.dropdown-toggle-split")
+        dropdown_toggle.click()
+
+        #the options in the dropdown
+        options = line.find_elements(By.CSS_SELECTOR, "div.subject-units .dropdown-menu a.dropdown-item")
+        for option in options:
+            if option.text.strip() == str(units):
+                option.click()
+                break
+
+        #write the grade
+        input_grade = line.find_element(By.CSS_SELECTOR, 'div.subject-grade input')
+        input_grade.clear()
+        input_grade.send_keys(str(grade))
 
 
     def thirdPageOfCalculator(self,driver):  
 
-        average_el = WebDriverWait(driver, 10).until(
+        average_el = EventWait(driver, 10).until(
         EC.presence_of_element_located((By.ID, "grade")))
 
         #take the avrege that calcute 
         average = average_el.text.strip()
+        self.save_recorded_calls(driver)
 
-        time.sleep(10)
-
-        driver.quit()
-        
         return average
 
     # === second website ===
-    def getDriver2(self):
+    def getDriver2(self, driver):
 
-        driver = webdriver.Chrome(service=self.service, options=self.options)
         driver.get("https://go.huji.ac.il/?locale=he")
-        time.sleep(3)
+        EventWait(driver, 10, replaces=3).until(EC.presence_of_element_located((By.ID, "admission-nav")))
 
         return driver
 
 
     def firstPageOfCheckYourChance(self,degree,driver):
 
-        admission_nav = WebDriverWait(driver, 10).until(
+        admission_nav = EventWait(driver, 10).until(
             EC.presence_of_element_located((By.ID, "admission-nav"))
         )
         # Locate the search input field
@@ -415,7 +403,7 @@ class HebrewUniversity:
         search_input.clear()
         search_input.send_keys(site_option_1)
 
-        options = WebDriverWait(driver, 10).until(
+        options = EventWait(driver, 10).until(
             EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".search-results a"))
         )
 
@@ -431,46 +419,28 @@ class HebrewUniversity:
         res=False
         site_option_1, site_option_2 = self.get_site_degree_options(degree)
 
-        WebDriverWait(driver, 10).until(
+        EventWait(driver, 10).until(
         EC.url_contains("programAdmission_")
     )
-        WebDriverWait(driver, 10).until(
+        EventWait(driver, 10).until(
             EC.presence_of_element_located((By.CLASS_NAME, "course-fields"))
         )
+        self.record_calls(driver)
 
-        select_element = WebDriverWait(driver, 10).until(
+        EventWait(driver, 10).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "select[name='courseTrack']"))
         )
 
-        select = Select(select_element)
-        
-        found = False
-        for option in select.options:
-            text = option.text.strip()
-            if text == site_option_2:
-                select.select_by_visible_text(text)
-                found = True
-                break
-
-        if not found:
-            print(f"Track option '{site_option_2}' not found in dropdown.")
+        # Track, bagrut average and the three emphases in one script call
+        checks = driver.execute_script(self.CHANCE_FORM_SCRIPT, site_option_2, str(int(float(highschool_score))),
+                                       self.psychometric_field_values(psycho_scores))
+        self.check_chance_form(checks, site_option_2)
 
-    
-        bagrut_input = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.NAME, "bagrut"))
-    )
-        bagrut_input.clear()
-        bagrut_input.send_keys(str(int(float(highschool_score))))
-        time.sleep(0.2) 
-
-        grades_field = driver.find_element(By.CLASS_NAME, 'pet-fields')
-
-        fields = grades_field.find_elements(By.CLASS_NAME, "field")
-
-        self.fill_psychometric_fields(fields, psycho_scores)
+        # let the form recalculate before it is submitted
+        wait_for_dom_quiet(driver, quiet=0.2, timeout=2, replaces=2)
 
         # Click the "Calculate" button
-        submit_container = WebDriverWait(driver, 10).until(
+        submit_container = EventWait(driver, 10).until(
         EC.presence_of_element_located((By.CSS_SELECTOR, "div.submit.submit-SingleCourse-singleCourseResults"))
         )
 
@@ -480,37 +450,88 @@ class HebrewUniversity:
         try:
             # Try JavaScript click which can work better in headless mode
             driver.execute_script("arguments[0].scrollIntoView(true);", button)
-            time.sleep(1)  # Give time for scrolling
+            wait_for_dom_quiet(driver, quiet=0.05, timeout=1, replaces=1)  # Give time for scrolling
             driver.execute_script("arguments[0].click();", button)
         except Exception as e:
             print(f"Error clicking button: {e}")
             raise
 
 
-        WebDriverWait(driver, 5).until(
+        EventWait(driver, 5).until(
         EC.presence_of_element_located((By.CLASS_NAME, "result-msg"))
         )
 
-        result_el = WebDriverWait(driver, 10).until(
+        result_el = EventWait(driver, 10).until(
         EC.presence_of_element_located((By.CLASS_NAME, "result-msg"))
     )
         result_text = result_el.text.strip()
+        self.save_recorded_calls(driver)
 
         url = driver.current_url
 
-        driver.quit()
+        return self.admission_result(result_text, url)
 
+    # This function turns the result message of the check your chance page into the response
+    def admission_result(self, result_text, url):
         if "לא תתאפשר קבלה" in result_text:
             return {"isAccepted": "דחייה", "url": url, "message": None}
             #  return {"isAccepted": "דחייה", "score": 0, "threshold": 0}
         else:
             return {"isAccepted": "קבלה", "url": url, "message": None}
             # return {"isAccepted": "קבלה", "score": 0, "threshold": 0}
-        
-        time.sleep(3)
 
 
 
+    # record the JSON calls of the loaded app, when recording is on
+    def record_calls(self, driver):
+        if self.recorder.recording:
+            driver.execute_script(CALL_RECORDER_SCRIPT)
+
+    def save_recorded_calls(self, driver):
+        if self.recorder.recording:
+            self.recorder.save(driver.execute_script(READ_CALLS_SCRIPT))
+
+    # === local engine ===
+    # This function returns (average, rejection message) from the local engine, or from the calculator in the
+    # browser. The engine is skipped while it hasn't matched the calculator yet and every so often to check
+    # it still does
+    def compute_average(self, hs_dict):
+        engine_result = self.compute_engine_average(hs_dict)
+        site_result = self.tiers.resolve("bagrut", [
+            ("engine", self.tiers.engine_tier(engine_result, self.average_validator)),
+            ("browser", lambda: self.calculate_average(hs_dict)),
+        ])
+        self.tiers.validate("bagrut", self.average_validator, engine_result, site_result, key=lambda answer: answer[0])
+        return site_result
+
+    # This function returns (average, rejection message) from the calculator in the browser
+    def calculate_average(self, hs_dict):
+        with self.lease_driver("bagrut calculator") as driver1:
+            self.getDriver1(driver1)
+            self.firstPageOfCalculator(driver1)
+            self.secondPageOfCalculator(driver1,hs_dict)
+            if self.msg is not None:
+                return None, self.msg
+            return self.thirdPageOfCalculator(driver1), None
+
+    # This function scores a batch of applicants, see HujiEngine.score_batch. While the engine isn't trusted
+    # every applicant's average goes through compute_average, so it comes from the calculator in the browser
+    # and validates the engine on the way
+    def score_batch(self, applicants):
+        if self.average_validator.trusted:
+            return self.engine.score_batch(applicants)
+        print("⚠️ HUJI bagrut engine isn't validated yet, the batch's averages come from the calculator")
+        return self.engine.score_batch(applicants, average=self.compute_average)
+
+    # This function returns the engine's (average, message), or None when it can't compute them
+    def compute_engine_average(self, hs_dict):
+        try:
+            return self.engine.average(hs_dict)
+        except Exception as e:
+            print(f"⚠️ HUJI bagrut engine failed: {e}")
+            return None
+
+
     # === Main Code ==
     def run(self,data):
         hs_dict = data["highschool_scores"]
@@ -530,28 +551,173 @@ class HebrewUniversity:
             self.msg = f"התואר '{degree}' לא קיים במערכת הקבלה של האוניברסיטה העברית. יש לבדוק את המידע באתר האוניברסיטה."
             
         else:
-            
-            driver1=self.getDriver1()
-            self.firstPageOfCalculator(driver1)
-            self.secondPageOfCalculator(driver1,hs_dict)
+            highschool_score, self.msg = self.compute_average(hs_dict)
             if self.msg is not None:
-                driver1.quit()
-                return {"isAccepted": "דחייה", "url": "https://go.huji.ac.il/?locale=he", "message": self.msg}
-            
-            highschool_score = self.thirdPageOfCalculator(driver1)
+                return self.tiers.report({"isAccepted": "דחייה", "url": "https://go.huji.ac.il/?locale=he", "message": self.msg})
+
+            # the check your chance page has no endpoint known yet, the browser answers it
+            res = self.tiers.resolve("admission", [
+                ("browser", lambda: self.check_your_chance(degree, highschool_score, psycho_scores)),
+            ])
+            print(res)
 
-            driver2=self.getDriver2()
+        if res:
+            return self.tiers.report(res)
+
+        else:
+            return self.tiers.report({"isAccepted": None, "url":  "https://go.huji.ac.il/?locale=he" , "message": self.msg})
+
+    # This function returns the verdict of the track from the check your chance page in the browser
+    def check_your_chance(self, degree, highschool_score, psycho_scores):
+        with self.lease_driver("check your chance") as driver2:
             try:
+                self.getDriver2(driver2)
                 self.firstPageOfCheckYourChance(degree,driver2)
-                res=self.secondPageOfCheckYourChance(driver2,degree,highschool_score,psycho_scores)
-                print(res)
+                return self.secondPageOfCheckYourChance(driver2,degree,highschool_score,psycho_scores)
             except Exception as e:
                 print(f"Error in checking admission chances: {e}")
-                driver2.quit()
                 raise
 
-        if res:
-            return res
 
-        else:
-            return {"isAccepted": None, "url":  "https://go.huji.ac.il/?locale=he" , "message": self.msg}
\ No newline at end of file
+    # === async engine ===
+    # This method is the asyncio version of run, it drives both websites through the async CDP engine
+    async def run_async(self, data, browser):
+        hs_dict = data["highschool_scores"]
+        degree = data["subject"]
+        psycho_scores = [
+            data["psycho_score"],
+            data["psycho_math"],
+            data["psycho_hebrew"],
+            data["psycho_english"]
+        ]
+
+        if degree not in [d["user_input"] for d in self.DEGREES_DATA]:
+            msg = f"התואר '{degree}' לא קיים במערכת הקבלה של האוניברסיטה העברית. יש לבדוק את המידע באתר האוניברסיטה."
+            return self.tiers.report({"isAccepted": None, "url": "https://go.huji.ac.il/?locale=he", "message": msg})
+
+        engine_result = self.compute_engine_average(hs_dict)
+        average = await self.tiers.resolve_async("bagrut", [
+            ("engine", self.tiers.engine_tier(engine_result, self.average_validator)),
+            ("browser", lambda: self.calculate_average_in_page_async(browser, hs_dict)),
+        ])
+        self.tiers.validate("bagrut", self.average_validator, engine_result, average, key=lambda answer: answer[0])
+        highschool_score, msg = average
+        if msg is not None:
+            return self.tiers.report({"isAccepted": "דחייה", "url": "https://go.huji.ac.il/?locale=he", "message": msg})
+
+        res = await self.tiers.resolve_async("admission", [
+            ("browser", lambda: self.check_your_chance_in_page_async(browser, degree, highschool_score, psycho_scores)),
+        ])
+        print(res)
+        return self.tiers.report(res)
+
+    async def calculate_average_in_page_async(self, browser, hs_dict):
+        async with browser.page() as page:
+            return await self.calculate_average_async(page, hs_dict)
+
+    async def check_your_chance_in_page_async(self, browser, degree, highschool_score, psycho_scores):
+        async with browser.page() as page:
+            return await self.check_your_chance_async(page, degree, highschool_score, psycho_scores)
+
+    # This function is the async version of the three calculator pages, it returns (average, rejection message)
+    async def calculate_average_async(self, page, scores):
+        await page.goto("https://bagrut-calculator.huji.ac.il/calculator/#/grade-input", ".btn-group")
+
+        # choose the second button of the group and the first item of the dropdown, then move on
+        await page.evaluate("""
+            var buttons = document.querySelector('.btn-group').querySelectorAll('button');
+            if (buttons.length > 1) { buttons[1].click(); }
+        """)
+        await page.wait_for_selector(".dropdown-item")
+        await page.click(".dropdown-item")
+        await page.wait_for_selector(".btn-show")
+        await page.click(".btn-show")
+        await page.wait_for_selector("div.subject-title span")
+
+        # units and grades of all the listed subjects in one script call
+        rows, msg = self.plan_subject_rows(await page.evaluate(self.ROW_NAMES_SCRIPT), scores)
+        if msg is not None:
+            return None, msg
+        self.report_subject_rows(rows, await page.evaluate(self.FILL_ROWS_SCRIPT, rows))
+
+        # add more subjects, each one gets the row that shows up after its name is typed
+        for subject_name in scores.keys():
+            if subject_name in self.CORE_SUBJECTS or subject_name in self.NOT_EXISTING_SUBJECTS:
+                continue
+            row_count = await page.evaluate("""
+                var spans = document.querySelectorAll('span');
+                for (var i = 0; i < spans.length; i++) {
+                    if (spans[i].textContent.indexOf('הוסף מקצוע') !== -1) { spans[i].parentElement.click(); break; }
+                }
+                return document.querySelectorAll('div.input-data').length;
+            """)
+            await page.wait_for_selector("input[placeholder='הקלד מקצוע']")
+            await page.type_text("input[placeholder='הקלד מקצוע']", self.SUBJECT_NAME_MAPPING.get(subject_name, subject_name))
+            try:
+                await page.wait_for("return document.querySelectorAll('div.input-data').length > arguments[0];",
+                                    row_count, timeout=2)
+            except PageTimeout:
+                # the row may have been added by the click already
+                pass
+            row = (-1, str(scores[subject_name][1]), str(scores[subject_name][0]))
+            self.report_subject_rows([row], await page.evaluate(self.FILL_ROWS_SCRIPT, [row]))
+
+        # calculate and read the average
+        await page.click(".btn-calc")
+        await page.wait_for_url("/calc-average", timeout=20)
+        await page.wait_for_selector("#grade")
+        return await page.text("#grade"), None
+
+    # Script that picks the units and writes the grade of subject rows, given as (row index, units, grade);
+    # index -1 is the last row. It returns, for every row, whether the units option was found and the grade held
+    FILL_ROWS_SCRIPT = SET_VALUE_SCRIPT + """
+        var rows = document.querySelectorAll('div.input-data');
+        return arguments[0].map(function(entry) {
+            var row = rows[entry[0] < 0 ? rows.length + entry[0] : entry[0]];
+            var check = {units: false, grade: false};
+            if (!row) { return check; }
+            var toggle = row.querySelector('div.subject-units button.dropdown-toggle-split');
+            if (toggle) { toggle.click(); }
+            var options = row.querySelectorAll('div.subject-units .dropdown-menu a.dropdown-item');
+            for (var i = 0; i < options.length; i++) {
+                if (options[i].innerText.trim() === entry[1]) { options[i].click(); check.units = true; break; }
+            }
+            var grade = row.querySelector('div.subject-grade input');
+            check.grade = setValue(grade, entry[2]) && grade.value === entry[2];
+            return check;
+        });
+    """
+
+    # This function prints the rows the async fill couldn't set, there is no typing fallback on a CDP page
+    def report_subject_rows(self, rows, checks):
+        for (index, units, grade), check in zip(rows, checks):
+            if not check["units"] or not check["grade"]:
+                print(f"Subject row {index} was not filled (units {units}: {check['units']}, grade {grade}: {check['grade']})")
+
+    # This function is the async version of the two check your chance pages
+    async def check_your_chance_async(self, page, degree, highschool_score, psycho_scores):
+        site_option_1, site_option_2 = self.get_site_degree_options(degree)
+
+        # search for the degree and open its page
+        await page.goto("https://go.huji.ac.il/?locale=he", "#admission-nav .search-bar")
+        await page.type_text("#admission-nav .search-bar", site_option_1)
+        await page.wait_for("""
+            var options = document.querySelectorAll('.search-results a');
+            for (var i = 0; i < options.length; i++) {
+                if (options[i].innerText.trim() === arguments[0]) { options[i].click(); return true; }
+            }
+            return false;
+        """, site_option_1)
+        await page.wait_for_url("programAdmission_")
+        await page.wait_for_selector(".course-fields select[name='courseTrack']")
+
+        # choose the track, and enter the bagrut average and the psychometric emphases
+        checks = await page.evaluate(self.CHANCE_FORM_SCRIPT, site_option_2, str(int(float(highschool_score))),
+                                     self.psychometric_field_values(psycho_scores))
+        self.check_chance_form(checks, site_option_2)
+
+        # calculate and read the result
+        await page.click("div.submit.submit-SingleCourse-singleCourseResults button")
+        await page.wait_for_selector(".result-msg")
+        result_text = await page.text(".result-msg")
+        return self.admission_result(result_text, await page.url())
@@ -1,14 +1,20 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from HebrewUniversity import HebrewUniversity
 import atexit
 import os
 import shutil
+import sys
 import json
 import traceback
-from webdriver_manager.chrome import ChromeDriverManager
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend_common"))
+from driver_sources import create_driver_source, create_chrome_reaper, create_async_engine
+from driver_resolver import get_chromedriver_path, create_chrome_service
+from page_waits import wait_report, wait_stats
+from engine_validation import engine_stats
+from tier_resolver import tier_stats
 
 app = Flask(__name__)
 CORS(app)
@@ -17,13 +23,35 @@ CORS(app)
 chrome_options = Options()
 chrome_options.add_argument("--headless")
 
-#service = Service(r"C:\Users\Raz Zana\Desktop\chromedriver-win64\chromedriver.exe")
-service = Service(ChromeDriverManager().install())
+# resolve chromedriver once at boot, every driver of this process reuses the resolved path
+get_chromedriver_path()
+
+# warm drivers shared by all the requests of this backend (a local pool, or the machine-wide broker)
+driver_pool = create_driver_source("hebrew_university", chrome_options)
+atexit.register(driver_pool.shutdown)
+
+# background reaper of chrome/chromedriver processes leaked by crashed sessions
+chrome_reaper = create_chrome_reaper()
+
+# asyncio engine driving the requests' pages from one event loop, when enabled in config.json
+async_engine = create_async_engine("hebrew_university")
+
+# Route exposing the driver pool and reaper counters, including the memory reclaimed from leaked processes
+@app.route('/driver-stats', methods=['GET'])
+def driver_stats_handler():
+    return jsonify({
+        "pool": driver_pool.stats(),
+        "reaper": chrome_reaper.stats() if chrome_reaper else None,
+        "async_engine": async_engine.stats() if async_engine else None,
+        "waits": wait_stats(),
+        "engines": engine_stats(),
+        "tiers": tier_stats()
+    })
 
 # Route for hebrew University analysis
 @app.route('/HebrewUniversity', methods=['POST'])
 def hebrew_handler():
-    hebrew_university = HebrewUniversity(service, chrome_options)
+    hebrew_university = HebrewUniversity(create_chrome_service(), chrome_options, driver_pool)
     try:
         request_data = request.get_json()
 
@@ -31,7 +59,11 @@ def hebrew_handler():
         print(json.dumps(request_data, indent=2, ensure_ascii=False))  # תומך בעברית
         
 
-        result = hebrew_university.run(request_data)
+        with wait_report("hebrew_university"):
+            if async_engine:
+                result = async_engine.run(lambda browser: hebrew_university.run_async(request_data, browser))
+            else:
+                result = hebrew_university.run(request_data)
         return jsonify(result)
 
     except Exception as e:
@@ -40,8 +72,33 @@ def hebrew_handler():
         return jsonify({'error': str(e)}), 500
     
 
+# Route scoring many applicants in one call: the bagrut average and the psychometric emphases of each one,
+# in the order of the posted list. The local engine scores the whole batch once it is validated against the
+# calculator, until then every applicant's average is computed by the calculator in the browser
+@app.route('/HebrewUniversity/batch', methods=['POST'])
+def hebrew_batch_handler():
+    try:
+        applicants = request.get_json()
+        if not isinstance(applicants, list):
+            return jsonify({'error': 'expected a list of applicants'}), 400
+        hebrew_university = HebrewUniversity(create_chrome_service(), chrome_options, driver_pool)
+        with wait_report("hebrew_university batch"):
+            return jsonify(hebrew_university.score_batch(applicants))
+
+    except Exception as e:
+        print("❌ Error during batch request:")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
 ### main function ###
 if __name__ == '__main__':
+    driver_pool.start()
+    if chrome_reaper:
+        chrome_reaper.start()
+    if async_engine:
+        async_engine.start()
+        atexit.register(async_engine.shutdown)
     try:
         with open('../config.json', 'r') as f:
             config = json.load(f)
@@ -0,0 +1,142 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend_common"))
+from gotin_config import get_section
+
+# numpy is only needed by the batch mode, without it the batch is scored applicant by applicant
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HUJI_BAGRUT_DEFAULTS = {
+    # bonus points added to a grade by units level. These are the common Israeli bonus tables, not ones
+    # HUJI is known to publish for its calculator: the engine only answers once huji_bagrut's validator
+    # matched the calculator trust_after times in a row
+    "bonus": {"4": 12.5, "5": 25},
+    "math_bonus": {"4": 12.5, "5": 35},
+    "min_bonus_grade": 60,
+    # elective subjects that lower the average are left out of it, the core subjects always count
+    "drop_lowering_electives": True,
+    "decimals": 2,
+}
+
+# The psychometric emphases the check your chance page asks for, as weights of the three sections
+EMPHASES = {
+    "verbal_emphasis": {
+        "name": "דגש מילולי",
+        "weights": {"verbal": 0.6, "quant": 0.2, "english": 0.2}
+    },
+    "quant_emphasis": {
+        "name": "דגש כמותי",
+        "weights": {"verbal": 0.2, "quant": 0.6, "english": 0.2}
+    },
+    "multi_emphasis": {
+        "name": "דגש רב תחומי",
+        "weights": {"verbal": 0.4, "quant": 0.4, "english": 0.2}
+    }
+}
+
+# מקדם תיקון משוער – מעלה או מוריד מהציון הכללי לפי ההטיה
+EMPHASIS_CORRECTION = 5.33
+
+
+class HujiEngine:
+    """
+    The bagrut-calculator.huji.ac.il average computed in-process, and the psychometric emphases of the
+    check your chance page. The core subjects always count, the other subjects are the ones the calculator
+    lets the user add, and electives that would lower the average are left out. The bonus tables live in
+    the huji_bagrut section of config.json.
+    """
+
+    ENGLISH_UNITS_MSG = "כמות היחידות באנגלית נמוכה מדי. נדרש מינימום של 4 יחידות."
+
+    def __init__(self, core_subjects, skipped_subjects, config=None):
+        self.core_subjects = core_subjects
+        self.skipped_subjects = skipped_subjects
+        self.config = config if config is not None else get_section("huji_bagrut", HUJI_BAGRUT_DEFAULTS)
+
+    def bonus(self, subject, units, grade):
+        if grade < self.config["min_bonus_grade"]:
+            return 0
+        table = self.config["math_bonus"] if subject == "מתמטיקה" else self.config["bonus"]
+        return table.get(str(units), 0)
+
+    # This method returns (average, None) like the calculator's #grade, or (None, message) when English has
+    # too few units
+    def average(self, hs_dict):
+        english = hs_dict.get("אנגלית")
+        if english is not None and int(english[1]) < 4:
+            return None, self.ENGLISH_UNITS_MSG
+
+        kept = []
+        electives = []
+        for subject, (grade, units) in hs_dict.items():
+            if subject in self.skipped_subjects:
+                continue
+            grade = float(grade)
+            entry = (grade + self.bonus(subject, int(units), grade), int(units))
+            (kept if subject in self.core_subjects else electives).append(entry)
+
+        # the best electives first, each one kept while it doesn't lower the average
+        for entry in sorted(electives, reverse=True):
+            if kept and self.config["drop_lowering_electives"] and entry[0] < self._average(kept):
+                break
+            kept.append(entry)
+        if not kept:
+            raise ValueError("no bagrut subjects")
+        return f"{self._average(kept):.{self.config['decimals']}f}", None
+
+    def _average(self, entries):
+        return sum(grade * units for grade, units in entries) / sum(units for _, units in entries)
+
+    # This method returns the emphasis scores of one applicant
+    def emphases(self, total, verbal, quantitative, english):
+        results = {}
+        for key, data in EMPHASES.items():
+            w = data["weights"]
+            score = round(verbal * w["verbal"] + quantitative * w["quant"] + english * w["english"])
+            delta = score - (verbal + quantitative + english) / 3
+            results[key] = max(200, min(800, round(total + delta * EMPHASIS_CORRECTION)))
+        return results
+
+    # This method returns the emphasis scores of many applicants at once, as {key: list of scores}. The
+    # arguments are sequences of the same length, one entry per applicant
+    def emphases_batch(self, totals, verbals, quantitatives, englishes):
+        if np is None:
+            rows = [self.emphases(*scores) for scores in zip(totals, verbals, quantitatives, englishes)]
+            return {key: [row[key] for row in rows] for key in EMPHASES}
+
+        totals, verbals, quantitatives, englishes = (
+            np.asarray(values, dtype=float) for values in (totals, verbals, quantitatives, englishes))
+        original_avg = (verbals + quantitatives + englishes) / 3
+        results = {}
+        for key, data in EMPHASES.items():
+            w = data["weights"]
+            # np.round rounds halves to even, like round() in emphases
+            score = np.round(verbals * w["verbal"] + quantitatives * w["quant"] + englishes * w["english"])
+            emphasis = np.round(totals + (score - original_avg) * EMPHASIS_CORRECTION)
+            results[key] = np.clip(emphasis, 200, 800).astype(int).tolist()
+        return results
+
+    # This method scores a batch of applicants, each one the JSON of a request: the bagrut average (or
+    # the rejection message) and the three emphases of every applicant, in order. average replaces the
+    # engine's average, with a function of the same (average, message) answer
+    def score_batch(self, applicants, average=None):
+        average = average or self.average
+        emphases = self.emphases_batch(
+            [float(applicant["psycho_score"]) for applicant in applicants],
+            [float(applicant["psycho_hebrew"]) for applicant in applicants],
+            [float(applicant["psycho_math"]) for applicant in applicants],
+            [float(applicant["psycho_english"]) for applicant in applicants])
+
+        results = []
+        for index, applicant in enumerate(applicants):
+            applicant_average, message = average(applicant["highschool_scores"])
+            results.append({
+                "average": applicant_average,
+                "message": message,
+                "emphases": {key: emphases[key][index] for key in EMPHASES},
+            })
+        return results
@@ -0,0 +1,411 @@
+from cdp_client import CDPError, open_websocket
+from chrome_process import ChromeProcess, DEFAULT_CHROME_ARGS, find_chrome_binary
+from page_waits import OBSERVE_SCRIPT, record_wait, replaced_time
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import threading
+import time
+
+ASYNC_ENGINE_DEFAULTS = {"enabled": False, "max_pages": 24, "timeout": 180, "chrome_binary": None}
+
+# What Chrome answers a script with when a navigation replaces the document it runs in
+NAVIGATION_ERRORS = (
+    "Execution context was destroyed",
+    "Cannot find context with specified id",
+    "Inspected target navigated or closed",
+    "Promise was collected",
+)
+
+
+# This function tells whether a failed script only failed because the page navigated under it
+def is_navigation_error(error):
+    return any(marker in str(error) for marker in NAVIGATION_ERRORS)
+
+
+class PageTimeout(Exception):
+    pass
+
+
+class AsyncCDPConnection:
+    """
+    asyncio client for the browser's DevTools websocket. One connection carries every page of the
+    browser: commands are matched to their responses by id, and events are dispatched to the
+    listeners registered for their (sessionId, method). The websocket is websocket-client's, a reader
+    thread hands every message it receives to the loop.
+    """
+
+    def __init__(self, ws_url):
+        self.ws_url = ws_url
+        self._socket = None
+        self._loop = None
+        self._reader_thread = None
+        self._next_id = 0
+        self._pending = {}
+        self._listeners = {}
+
+    async def connect(self):
+        self._loop = asyncio.get_running_loop()
+        self._socket = await self._loop.run_in_executor(None, open_websocket, self.ws_url)
+        self._reader_thread = threading.Thread(target=self._read_loop, name="cdp-reader", daemon=True)
+        self._reader_thread.start()
+        return self
+
+    # This method runs in the reader thread until the websocket closes, then fails the pending commands
+    def _read_loop(self):
+        try:
+            while True:
+                message = json.loads(self._socket.recv())
+                self._loop.call_soon_threadsafe(self._dispatch, message)
+        except Exception as e:
+            error = CDPError(f"DevTools websocket closed: {e}")
+        try:
+            self._loop.call_soon_threadsafe(self._fail_pending, error)
+        except RuntimeError:
+            # the loop itself is already closed
+            pass
+
+    def _dispatch(self, message):
+        if "id" in message:
+            future = self._pending.pop(message["id"], None)
+            if future is None or future.done():
+                return
+            if "error" in message:
+                future.set_exception(CDPError(message["error"].get("message")))
+            else:
+                future.set_result(message.get("result", {}))
+            return
+        for callback in list(self._listeners.get((message.get("sessionId"), message.get("method")), [])):
+            try:
+                callback(message.get("params", {}))
+            except Exception as e:
+                print(f"DevTools event handler failed: {e}")
+
+    def _fail_pending(self, error):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    async def send(self, method, params=None, session_id=None, timeout=30):
+        self._next_id += 1
+        command = {"id": self._next_id, "method": method, "params": params or {}}
+        if session_id:
+            command["sessionId"] = session_id
+        future = self._loop.create_future()
+        self._pending[command["id"]] = future
+        try:
+            self._socket.send(json.dumps(command))
+        except Exception as e:
+            self._pending.pop(command["id"], None)
+            raise CDPError(f"{method} could not be sent: {e}")
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._pending.pop(command["id"], None)
+            raise CDPError(f"{method} timed out after {timeout} seconds")
+
+    def on(self, method, callback, session_id=None):
+        self._listeners.setdefault((session_id, method), []).append(callback)
+
+    def remove_listeners(self, session_id):
+        for key in [key for key in self._listeners if key[0] == session_id]:
+            del self._listeners[key]
+
+    # closing waits for the browser's close frame, so it runs off the loop
+    async def close(self):
+        if self._socket is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._socket.close)
+
+
+class AsyncPage:
+    """
+    One tab driven over a flattened DevTools session. Scripts are written like Selenium's
+    execute_script bodies (they read arguments[i] and return a value), so the same snippets work
+    in both engines; they run inside an async function, so they may also await.
+    """
+
+    def __init__(self, connection, session_id, target_id):
+        self.connection = connection
+        self.session_id = session_id
+        self.target_id = target_id
+        self.dialogs = []
+        self._network_idle = asyncio.Event()
+
+    async def setup(self, blocked_urls=None):
+        await self.send("Page.enable")
+        await self.send("Page.setLifecycleEventsEnabled", {"enabled": True})
+        await self.send("Runtime.enable")
+        if blocked_urls:
+            await self.send("Network.enable")
+            await self.send("Network.setBlockedURLs", {"urls": blocked_urls})
+        # alerts are accepted right away and kept, so a flow can read what the site complained about
+        self.connection.on("Page.javascriptDialogOpening", self._on_dialog, self.session_id)
+        self.connection.on("Page.lifecycleEvent", self._on_lifecycle, self.session_id)
+
+    def _on_dialog(self, params):
+        self.dialogs.append(params.get("message", ""))
+        asyncio.ensure_future(self.send("Page.handleJavaScriptDialog", {"accept": True}))
+
+    # The main frame of a page target has the target's id, network idle is tracked for its current document
+    def _on_lifecycle(self, params):
+        if params.get("frameId") != self.target_id:
+            return
+        if params.get("name") == "init":
+            self._network_idle.clear()
+        elif params.get("name") == "networkIdle":
+            self._network_idle.set()
+
+    async def send(self, method, params=None, timeout=30):
+        return await self.connection.send(method, params, self.session_id, timeout)
+
+    # Without a ready selector, the navigation is done once the page's network goes idle
+    async def goto(self, url, ready_selector=None, timeout=15):
+        self._network_idle.clear()
+        result = await self.send("Page.navigate", {"url": url}, timeout)
+        if result.get("errorText"):
+            raise CDPError(f"Navigation to {url} failed: {result['errorText']}")
+        if ready_selector:
+            await self.wait_for_selector(ready_selector, timeout)
+        else:
+            await self.wait_for_network_idle(timeout)
+
+    # This method waits for Chrome's networkIdle lifecycle event of the current document
+    async def wait_for_network_idle(self, timeout=10):
+        start = time.monotonic()
+        initial = self._network_idle.is_set()
+        try:
+            await asyncio.wait_for(self._network_idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise PageTimeout(f"Network didn't go idle within {timeout} seconds")
+        waited = time.monotonic() - start
+        record_wait(waited, replaced_time(waited, initial))
+
+    async def evaluate(self, script, *args):
+        expression = f"(async function() {{ {script} }}).apply(null, {json.dumps(list(args))})"
+        result = await self.send("Runtime.evaluate", {
+            "expression": expression,
+            "awaitPromise": True,
+            "returnByValue": True,
+        })
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            text = details.get("exception", {}).get("description") or details.get("text")
+            raise CDPError(f"Script failed: {text}")
+        return result.get("result", {}).get("value")
+
+    # This method waits in the page, on a MutationObserver, until a script returns a truthy value, and
+    # observes the new document again when a navigation replaces the one it was watching
+    async def wait_for(self, script, *args, timeout=10):
+        start = time.monotonic()
+        deadline = start + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PageTimeout(f"Timed out after {timeout} seconds waiting for: {script.strip()[:80]}")
+            try:
+                result = await self.evaluate(OBSERVE_PROMISE_SCRIPT, script, list(args), remaining)
+            except CDPError as e:
+                # the execution context is destroyed while a navigation is in flight, anything else is a real failure
+                if not is_navigation_error(e):
+                    raise
+                await asyncio.sleep(0.05)
+                continue
+            if result and result["value"]:
+                waited = time.monotonic() - start
+                record_wait(waited, replaced_time(waited, result["initial"]))
+                return result["value"]
+
+    async def wait_for_selector(self, selector, timeout=10):
+        return await self.wait_for("return !!document.querySelector(arguments[0]);", selector, timeout=timeout)
+
+    async def wait_for_url(self, fragment, timeout=10):
+        return await self.wait_for("return location.href.indexOf(arguments[0]) !== -1;", fragment, timeout=timeout)
+
+    async def url(self):
+        return await self.evaluate("return location.href;")
+
+    async def text(self, selector):
+        return await self.evaluate("""
+            var element = document.querySelector(arguments[0]);
+            return element ? element.innerText.trim() : null;
+        """, selector)
+
+    async def click(self, selector):
+        clicked = await self.evaluate("""
+            var element = document.querySelector(arguments[0]);
+            if (!element) { return false; }
+            element.scrollIntoView({block: 'center'});
+            element.click();
+            return true;
+        """, selector)
+        if not clicked:
+            raise CDPError(f"Nothing to click at {selector}")
+
+    # This method sets an input through the native value setter, so React and Angular see the change
+    async def set_value(self, selector, value):
+        found = await self.evaluate(SET_VALUE_SCRIPT + "return setValue(document.querySelector(arguments[0]), arguments[1]);",
+                                    selector, str(value))
+        if not found:
+            raise CDPError(f"No input at {selector}")
+
+    # This method types text into an input as keyboard input, for widgets that only react to typing
+    async def type_text(self, selector, text):
+        await self.evaluate("""
+            var element = document.querySelector(arguments[0]);
+            element.focus();
+            if (element.select) { element.select(); }
+        """, selector)
+        await self.send("Input.insertText", {"text": str(text)})
+
+
+# The page_waits observer, resolved through a promise instead of an execute_async_script callback
+OBSERVE_PROMISE_SCRIPT = """
+    var params = Array.prototype.slice.call(arguments);
+    return await new Promise(function(resolve) {
+        params.push(resolve);
+        (function() {""" + OBSERVE_SCRIPT + """}).apply(null, params);
+    });
+"""
+
+
+# Shared snippet that sets an input's value the way a user would, firing input and change events
+SET_VALUE_SCRIPT = """
+    function setValue(element, value) {
+        if (!element) { return false; }
+        var prototype = element.tagName === 'SELECT' ? HTMLSelectElement.prototype
+            : element.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        Object.getOwnPropertyDescriptor(prototype, 'value').set.call(element, value);
+        element.dispatchEvent(new Event('input', { bubbles: true }));
+        element.dispatchEvent(new Event('change', { bubbles: true }));
+        return true;
+    }
+"""
+
+
+class AsyncBrowser:
+    """
+    One headless Chrome driven from an asyncio event loop. Every page() is a tab in its own browser
+    context, attached over the single browser websocket, so dozens of concurrent pages cost one
+    process and one connection instead of one chromedriver and one thread each.
+    """
+
+    def __init__(self, chrome_binary=None, args=None, max_pages=24, blocked_urls=None):
+        self.chrome_binary = chrome_binary
+        self.args = list(DEFAULT_CHROME_ARGS if args is None else args)
+        self.max_pages = max_pages
+        self.blocked_urls = blocked_urls
+        self._chrome = None
+        self._connection = None
+        self._semaphore = None
+        self._start_lock = None
+
+        # counters exposed through stats()
+        self._pages_opened = 0
+        self._open_pages = 0
+        self._browser_starts = 0
+
+    async def start(self):
+        self._semaphore = asyncio.Semaphore(self.max_pages)
+        self._start_lock = asyncio.Lock()
+        await self._ensure_started()
+        return self
+
+    async def _ensure_started(self):
+        async with self._start_lock:
+            if self._chrome is not None and self._chrome.process.poll() is None:
+                return
+            if self._connection is not None:
+                await self._connection.close()
+            if self._chrome is not None:
+                self._chrome.terminate()
+            loop = asyncio.get_running_loop()
+            chrome = ChromeProcess(find_chrome_binary(self.chrome_binary), self.args)
+            self._chrome = await loop.run_in_executor(None, chrome.start)
+            version = await loop.run_in_executor(None, chrome.version)
+            self._connection = await AsyncCDPConnection(version["webSocketDebuggerUrl"]).connect()
+            self._browser_starts += 1
+
+    # The page is a fresh tab in a fresh browser context, closed with its context when the block ends
+    @asynccontextmanager
+    async def page(self):
+        async with self._semaphore:
+            await self._ensure_started()
+            connection = self._connection
+            context_id = (await connection.send("Target.createBrowserContext"))["browserContextId"]
+            page = None
+            try:
+                target_id = (await connection.send("Target.createTarget", {
+                    "url": "about:blank",
+                    "browserContextId": context_id,
+                }))["targetId"]
+                session_id = (await connection.send("Target.attachToTarget", {
+                    "targetId": target_id,
+                    "flatten": True,
+                }))["sessionId"]
+                page = AsyncPage(connection, session_id, target_id)
+                await page.setup(self.blocked_urls)
+                self._pages_opened += 1
+                self._open_pages += 1
+                yield page
+            finally:
+                if page is not None:
+                    self._open_pages -= 1
+                    connection.remove_listeners(page.session_id)
+                try:
+                    await connection.send("Target.disposeBrowserContext", {"browserContextId": context_id})
+                except CDPError:
+                    pass
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+        if self._chrome is not None:
+            self._chrome.terminate()
+
+    def stats(self):
+        return {
+            "max_pages": self.max_pages,
+            "open_pages": self._open_pages,
+            "pages_opened": self._pages_opened,
+            "browser_starts": self._browser_starts,
+            "browser_pid": self._chrome.pid if self._chrome else None,
+        }
+
+
+class AsyncEngine:
+    """
+    Runs an AsyncBrowser on an event loop in a background thread of the Flask process. Request
+    threads hand it a coroutine and wait for the result, while every page of every request is
+    driven by the one loop.
+    """
+
+    def __init__(self, browser, timeout=180):
+        self.browser = browser
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.loop.run_forever, name="async-cdp-engine", daemon=True)
+        self._thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(self.browser.start(), self.loop).result(60)
+        except Exception as e:
+            # the browser is started again by the first page that needs it
+            print(f"Async engine could not start Chrome: {e}")
+
+    # This method runs make_coroutine(browser) on the engine's loop and blocks the calling thread until it ends
+    def run(self, make_coroutine):
+        future = asyncio.run_coroutine_threadsafe(make_coroutine(self.browser), self.loop)
+        return future.result(self.timeout)
+
+    def shutdown(self):
+        try:
+            asyncio.run_coroutine_threadsafe(self.browser.close(), self.loop).result(10)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def stats(self):
+        return self.browser.stats()
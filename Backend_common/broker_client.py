@@ -0,0 +1,108 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from driver_pool import is_driver_healthy, reset_driver, quit_driver
+from contextlib import contextmanager
+import json
+import socket
+import threading
+
+
+class BrokerClient:
+    """
+    Drop-in replacement for DriverPool that leases Chrome sessions from the machine-wide browser
+    broker instead of starting them in this backend. The broker owns the Chrome process; this
+    client only attaches a chromedriver session to it through its DevTools address.
+    """
+
+    def __init__(self, service_factory, host, port, client_name, acquire_timeout=120, blocker=None, profile=None):
+        self.service_factory = service_factory
+        self.host = host
+        self.port = port
+        self.client_name = client_name
+        self.acquire_timeout = acquire_timeout
+        self.blocker = blocker
+        self.profile = profile
+
+        # leased driver -> (broker connection, lease id)
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        # the broker warms its own sessions, only the consent cookies of the profile template are used here
+        if self.profile is not None:
+            threading.Thread(target=self.profile.ensure, name="profile-template", daemon=True).start()
+
+    def _call(self, connection, message):
+        connection.sendall((json.dumps(message) + "\n").encode("utf-8"))
+        reader = connection.makefile("r", encoding="utf-8")
+        response = json.loads(reader.readline() or "null")
+        if not response or not response.get("ok"):
+            raise RuntimeError(f"Browser broker error: {response.get('error') if response else 'connection closed'}")
+        return response
+
+    # page is accepted for compatibility with the pools, broker sessions are detached after every lease
+    def acquire(self, timeout=None, step=None, page=None):
+        timeout = self.acquire_timeout if timeout is None else timeout
+
+        # the connection stays open for the whole lease, the broker reclaims the session if it drops
+        connection = socket.create_connection((self.host, self.port), timeout=timeout + 10)
+        try:
+            response = self._call(connection, {"op": "lease", "client": self.client_name, "timeout": timeout})
+            options = Options()
+            options.debugger_address = response["debugger_address"]
+            if self.blocker is not None:
+                self.blocker.prepare_options(options)
+            driver = webdriver.Chrome(service=self.service_factory(), options=options)
+        except Exception:
+            connection.close()
+            raise
+
+        with self._lock:
+            self._leases[driver] = (connection, response["lease_id"])
+        if self.blocker is not None:
+            self.blocker.attach(driver, step)
+        if self.profile is not None:
+            self.profile.prepare(driver)
+        return driver
+
+    def release(self, driver, discard=False):
+        if self.blocker is not None:
+            self.blocker.detach(driver)
+        with self._lock:
+            connection, lease_id = self._leases.pop(driver)
+        healthy = not discard and is_driver_healthy(driver) and reset_driver(driver)
+        # detaches chromedriver only, the browser keeps running inside the broker
+        quit_driver(driver)
+        try:
+            self._call(connection, {"op": "release", "lease_id": lease_id, "healthy": healthy})
+        except Exception as e:
+            print(f"Browser broker release failed: {e}")
+        finally:
+            connection.close()
+
+    @contextmanager
+    def lease(self, timeout=None, step=None, page=None):
+        driver = self.acquire(timeout, step, page)
+        try:
+            yield driver
+        except BaseException:
+            self.release(driver, discard=True)
+            raise
+        else:
+            self.release(driver)
+
+    def shutdown(self):
+        with self._lock:
+            drivers = list(self._leases)
+        for driver in drivers:
+            self.release(driver)
+
+    def stats(self):
+        try:
+            with socket.create_connection((self.host, self.port), timeout=5) as connection:
+                stats = self._call(connection, {"op": "stats"})["stats"]
+        except Exception as e:
+            stats = {"error": str(e)}
+        stats["blocking"] = self.blocker.stats() if self.blocker else None
+        stats["profile"] = self.profile.stats() if self.profile else None
+        return stats
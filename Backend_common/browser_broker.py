@@ -0,0 +1,286 @@
+from chrome_process import ChromeProcess, find_chrome_binary
+from chrome_reaper import ChromeReaper, REAPER_DEFAULTS
+from gotin_config import get_section
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+import uuid
+
+BROKER_DEFAULTS = {
+    "enabled": False,
+    "host": "127.0.0.1",
+    "port": 3010,
+    "max_sessions": 6,
+    "warm_sessions": 2,
+    "memory_per_session_mb": 350,
+    "min_free_memory_mb": 512,
+    "idle_ttl": 600,
+    "max_uses": 50,
+    "chrome_binary": None,
+    "chrome_args": None,
+}
+
+
+class BrokerError(Exception):
+    pass
+
+
+# This function returns the memory available on the machine in MB, or None when it can't be measured
+def available_memory_mb():
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class BrowserBroker:
+    """
+    Owns the single, machine-wide pool of headless Chrome sessions used by all the backends.
+    A new Chrome is started only while the session count is under max_sessions and the machine
+    keeps min_free_memory_mb free after paying memory_per_session_mb for it; otherwise a lease
+    waits for another backend to hand a session back.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.binary = find_chrome_binary(config["chrome_binary"])
+
+        self._idle = []
+        self._leased = {}
+        self._starting = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # counters exposed through stats()
+        self._started = 0
+        self._terminated = 0
+        self._leases = 0
+        self._denied_for_memory = 0
+
+    def start(self):
+        for _ in range(self.config["warm_sessions"]):
+            with self._cond:
+                if self._can_start() is not None:
+                    break
+                self._starting += 1
+            self._launch_idle()
+        threading.Thread(target=self._expire_idle, name="broker-idle-expiry", daemon=True).start()
+
+    def _launch_idle(self):
+        try:
+            chrome = self._start_chrome()
+            with self._cond:
+                self._idle.append(chrome)
+        except Exception as e:
+            print(f"Broker could not start Chrome: {e}")
+        finally:
+            with self._cond:
+                self._starting -= 1
+                self._cond.notify_all()
+
+    def _start_chrome(self):
+        chrome = ChromeProcess(self.binary, self.config["chrome_args"]).start()
+        with self._cond:
+            self._started += 1
+        return chrome
+
+    def _session_count(self):
+        return len(self._idle) + len(self._leased) + self._starting
+
+    # This method decides whether the machine has room for one more Chrome (called with the lock held).
+    # It returns None when it may start, otherwise the reason it may not ("max_sessions" or "memory")
+    def _can_start(self):
+        count = self._session_count()
+        if count >= self.config["max_sessions"]:
+            return "max_sessions"
+        # always allow a first session, otherwise nobody could ever be served on a loaded machine
+        if count == 0:
+            return None
+        available = available_memory_mb()
+        if available is not None and available - self.config["memory_per_session_mb"] < self.config["min_free_memory_mb"]:
+            return "memory"
+        return None
+
+    def lease(self, client, timeout):
+        deadline = time.time() + timeout
+        chrome = None
+        # a lease that waited for memory is counted once, however many times it wakes up
+        denied_for_memory = False
+        with self._cond:
+            while chrome is None:
+                if self._closed:
+                    raise BrokerError("Broker is shutting down")
+                if self._idle:
+                    candidate = self._idle.pop()
+                    if candidate.is_alive():
+                        chrome = candidate
+                    else:
+                        self._terminate(candidate)
+                    continue
+                denied = self._can_start()
+                if denied is None:
+                    self._starting += 1
+                    break
+                if denied == "memory" and not denied_for_memory:
+                    denied_for_memory = True
+                    self._denied_for_memory += 1
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise BrokerError(f"No browser session became available within {timeout} seconds")
+                self._cond.wait(remaining)
+
+        if chrome is None:
+            try:
+                chrome = self._start_chrome()
+            finally:
+                with self._cond:
+                    self._starting -= 1
+                    self._cond.notify_all()
+
+        lease_id = uuid.uuid4().hex
+        with self._cond:
+            chrome.uses += 1
+            self._leases += 1
+            self._leased[lease_id] = (client, chrome)
+        return lease_id, chrome
+
+    def release(self, lease_id, healthy=True):
+        with self._cond:
+            entry = self._leased.pop(lease_id, None)
+        if entry is None:
+            return
+        _, chrome = entry
+        chrome.last_used = time.time()
+        # sessions are recycled after max_uses leases so slow leaks inside Chrome don't build up
+        worn_out = chrome.uses >= self.config["max_uses"]
+        if healthy and not worn_out and not self._closed and chrome.is_alive() and chrome.reset_targets():
+            with self._cond:
+                self._idle.append(chrome)
+                self._cond.notify_all()
+        else:
+            self._terminate(chrome)
+
+    def _terminate(self, chrome):
+        chrome.terminate()
+        with self._cond:
+            self._terminated += 1
+            self._cond.notify_all()
+
+    # This method stops sessions that sat idle for longer than idle_ttl, keeping the warm ones
+    def _expire_idle(self):
+        while not self._closed:
+            time.sleep(30)
+            now = time.time()
+            with self._cond:
+                keep = self.config["warm_sessions"]
+                expired = [c for c in self._idle[keep:] if now - c.last_used > self.config["idle_ttl"]]
+                self._idle = [c for c in self._idle if c not in expired]
+            for chrome in expired:
+                self._terminate(chrome)
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            sessions = self._idle + [chrome for _, chrome in self._leased.values()]
+            self._idle, self._leased = [], {}
+        for chrome in sessions:
+            self._terminate(chrome)
+
+    def stats(self):
+        with self._cond:
+            clients = {}
+            for client, _ in self._leased.values():
+                clients[client] = clients.get(client, 0) + 1
+            return {
+                "max_sessions": self.config["max_sessions"],
+                "idle": len(self._idle),
+                "leased": len(self._leased),
+                "starting": self._starting,
+                "leased_by_client": clients,
+                "started": self._started,
+                "terminated": self._terminated,
+                "leases": self._leases,
+                "denied_for_memory": self._denied_for_memory,
+                "available_memory_mb": available_memory_mb(),
+            }
+
+
+class BrokerRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Speaks newline-delimited JSON. A lease lives as long as the connection that took it:
+    if a backend dies mid-request, its sessions are reclaimed when the socket closes.
+    """
+
+    def handle(self):
+        broker = self.server.broker
+        leases = set()
+        try:
+            for line in self.rfile:
+                try:
+                    message = json.loads(line)
+                    op = message.get("op")
+                    if op == "lease":
+                        lease_id, chrome = broker.lease(message.get("client", "unknown"), message.get("timeout", 120))
+                        leases.add(lease_id)
+                        response = {"ok": True, "lease_id": lease_id, "debugger_address": chrome.debugger_address}
+                    elif op == "release":
+                        leases.discard(message["lease_id"])
+                        broker.release(message["lease_id"], message.get("healthy", True))
+                        response = {"ok": True}
+                    elif op == "stats":
+                        response = {"ok": True, "stats": broker.stats()}
+                    else:
+                        response = {"ok": False, "error": f"Unknown op {op}"}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+                self.wfile.flush()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            # the browser state is unknown after a dropped connection, so don't reuse it
+            for lease_id in leases:
+                broker.release(lease_id, healthy=False)
+
+
+class BrokerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, broker):
+        super().__init__(address, BrokerRequestHandler)
+        self.broker = broker
+
+
+### main function ###
+if __name__ == '__main__':
+    config = get_section("browser_broker", BROKER_DEFAULTS)
+    broker = BrowserBroker(config)
+    broker.start()
+    reaper_config = get_section("chrome_reaper", REAPER_DEFAULTS)
+    if reaper_config["enabled"]:
+        ChromeReaper(reaper_config["interval"], reaper_config["min_age"]).start()
+    server = BrokerServer((config["host"], config["port"]), broker)
+    # stopWebsite.sh sends SIGTERM, turn it into a clean exit so the Chrome sessions are terminated
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Browser broker listening on {config['host']}:{config['port']} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        broker.shutdown()
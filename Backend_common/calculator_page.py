@@ -0,0 +1,96 @@
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from gotin_config import get_section
+from page_waits import EventWait
+import time
+
+AFFINITY_DEFAULTS = {"enabled": True, "max_age": 600}
+
+RESULT_FRAME = "gotin_result"
+
+
+# This function returns the url of the calculator page a pooled driver keeps loaded, or None
+def loaded_page(driver):
+    page = getattr(driver, "gotin_page", None)
+    return page["url"] if page else None
+
+
+def forget_page(driver):
+    driver.gotin_page = None
+
+
+class CalculatorPage:
+    """
+    A calculator page kept loaded in a pooled session between requests. open() reuses the page
+    already loaded in the leased driver by resetting its form in place, and only navigates when the
+    driver holds another page, the page is older than max_age seconds or the reset script reports
+    that the page is not in a clean state. Pages whose form posts to a results page get their form
+    targeted at a hidden frame, so the form itself never navigates away.
+    """
+
+    def __init__(self, url, ready_locator, reset_script=None, post_to_frame=False):
+        config = get_section("page_affinity", AFFINITY_DEFAULTS)
+        self.url = url
+        self.ready_locator = ready_locator
+        self.reset_script = reset_script
+        self.enabled = config["enabled"] and reset_script is not None
+        # without affinity the form page is thrown away anyway, so it may post the normal way
+        self.post_to_frame = post_to_frame and self.enabled
+        self.max_age = config["max_age"]
+
+    def _is_reusable(self, driver):
+        page = getattr(driver, "gotin_page", None)
+        if not page or page["url"] != self.url or time.time() - page["loaded_at"] > self.max_age:
+            return False
+        try:
+            if not driver.current_url.startswith(self.url) or not driver.find_elements(*self.ready_locator):
+                return False
+            return bool(driver.execute_script(self.reset_script))
+        except Exception:
+            return False
+
+    # This method makes the leased driver show a clean calculator form, and returns whether it was reused.
+    # reload=True forces a navigation, used when a reused page misbehaved.
+    def open(self, driver, timeout=10, reload=False):
+        if self.enabled and not reload and self._is_reusable(driver):
+            return True
+
+        forget_page(driver)
+        driver.get(self.url)
+        EventWait(driver, timeout).until(EC.presence_of_element_located(self.ready_locator))
+        if self.post_to_frame:
+            self._target_frame(driver)
+        if self.enabled:
+            driver.gotin_page = {"url": self.url, "loaded_at": time.time()}
+        return False
+
+    def _target_frame(self, driver):
+        driver.execute_script("""
+            var frame = document.getElementsByName(arguments[0])[0];
+            if (!frame) {
+                frame = document.createElement('iframe');
+                frame.name = arguments[0];
+                frame.style.display = 'none';
+                document.body.appendChild(frame);
+            }
+            frame.src = 'about:blank';
+            for (var i = 0; i < document.forms.length; i++) {
+                document.forms[i].target = arguments[0];
+            }
+        """, RESULT_FRAME)
+
+    # This method waits for the posted results, in the hidden frame when the form posts there, and
+    # returns the located element with the driver switched into the frame that holds it
+    def wait_for_result(self, driver, locator, timeout=10):
+        if self.post_to_frame:
+            EventWait(driver, timeout).until(EC.frame_to_be_available_and_switch_to_it((By.NAME, RESULT_FRAME)))
+        return EventWait(driver, timeout).until(EC.presence_of_element_located(locator))
+
+    # This method leaves the results frame and blanks it, so the next request can't read an old result
+    def leave_result(self, driver):
+        driver.switch_to.default_content()
+        if self.post_to_frame:
+            driver.execute_script("""
+                var frame = document.getElementsByName(arguments[0])[0];
+                if (frame) { frame.src = 'about:blank'; }
+            """, RESULT_FRAME)
@@ -0,0 +1,97 @@
+from collections import deque
+import json
+import threading
+import time
+import websocket
+
+
+class CDPError(Exception):
+    pass
+
+
+# This function opens a websocket to a DevTools endpoint with websocket-client, which selenium already
+# depends on. Chrome refuses DevTools websockets that send an Origin header it doesn't allow, so none is sent
+def open_websocket(ws_url, timeout=None):
+    try:
+        return websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True, enable_multithread=True)
+    except (websocket.WebSocketException, OSError) as e:
+        raise CDPError(f"DevTools websocket to {ws_url} failed: {e}")
+
+
+class CDPConnection:
+    """
+    Minimal blocking client for a Chrome DevTools websocket (browser or page endpoint). Commands are
+    serialized, each call sends one command and reads messages until its response arrives; events are
+    dropped, unless keep_events is set, then they are queued for wait_for_event.
+    """
+
+    def __init__(self, ws_url, timeout=30, keep_events=False):
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self.keep_events = keep_events
+        self._socket = None
+        self._next_id = 0
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def connect(self):
+        self._socket = open_websocket(self.ws_url, self.timeout)
+        return self
+
+    def _read_message(self):
+        try:
+            return json.loads(self._socket.recv())
+        except (websocket.WebSocketException, OSError) as e:
+            raise CDPError(f"DevTools websocket closed: {e}")
+
+    def send(self, method, params=None, session_id=None):
+        with self._lock:
+            if self._socket is None:
+                self.connect()
+            self._next_id += 1
+            command = {"id": self._next_id, "method": method, "params": params or {}}
+            if session_id:
+                command["sessionId"] = session_id
+            self._socket.send(json.dumps(command))
+            while True:
+                message = self._read_message()
+                if message.get("id") != command["id"]:
+                    if self.keep_events and "method" in message:
+                        self._events.append(message)
+                    continue
+                if "error" in message:
+                    raise CDPError(f"{method} failed: {message['error'].get('message')}")
+                return message.get("result", {})
+
+    # This method returns the params of the first event of method that matches, queued or still to come,
+    # or None after timeout seconds
+    def wait_for_event(self, method, match=None, timeout=10):
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                if self._events:
+                    message = self._events.popleft()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self._socket.settimeout(remaining)
+                    try:
+                        message = self._read_message()
+                    except CDPError:
+                        if time.monotonic() >= deadline:
+                            return None
+                        raise
+                    finally:
+                        self._socket.settimeout(self.timeout)
+                if message.get("method") == method and (match is None or match(message.get("params", {}))):
+                    return message.get("params", {})
+
+    def close(self):
+        with self._lock:
+            if self._socket is not None:
+                try:
+                    self._socket.close()
+                except (websocket.WebSocketException, OSError):
+                    pass
+                self._socket = None
@@ -0,0 +1,169 @@
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from cdp_client import CDPConnection
+
+# Executable names and install locations that are tried when no Chrome binary is configured
+CHROME_CANDIDATES = [
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "chrome",
+]
+CHROME_INSTALL_PATHS = [
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+]
+
+DEFAULT_CHROME_ARGS = [
+    "--headless=new",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-dev-shm-usage",
+    "--autoplay-policy=user-gesture-required",
+    "--mute-audio",
+]
+
+
+def find_chrome_binary(configured=None):
+    if configured:
+        return configured
+    for name in CHROME_CANDIDATES:
+        path = shutil.which(name)
+        if path:
+            return path
+    for path in CHROME_INSTALL_PATHS:
+        if os.path.isfile(path):
+            return path
+    raise RuntimeError("Chrome could not be found, set chrome_binary in config.json")
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ChromeProcess:
+    """
+    A headless Chrome started with a DevTools port, so chromedriver sessions (through the
+    debuggerAddress option) and plain CDP clients can attach to it without owning it.
+    """
+
+    def __init__(self, binary, args=None):
+        self.binary = binary
+        self.args = list(DEFAULT_CHROME_ARGS if args is None else args)
+        self.port = None
+        self.process = None
+        self.user_data_dir = None
+        self.started_at = None
+        self.last_used = None
+        self.uses = 0
+
+    @property
+    def debugger_address(self):
+        return f"127.0.0.1:{self.port}"
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    def start(self, timeout=20, user_data_dir=None):
+        self.port = free_port()
+        self.user_data_dir = user_data_dir or tempfile.mkdtemp(prefix="gotin-chrome-")
+        command = [
+            self.binary,
+            f"--remote-debugging-port={self.port}",
+            f"--user-data-dir={self.user_data_dir}",
+            *self.args,
+            "about:blank",
+        ]
+        # start Chrome in its own process group so it can be killed with all of its children
+        kwargs = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+        self.process = subprocess.Popen(command, **kwargs)
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                self.version()
+                self.started_at = self.last_used = time.time()
+                return self
+            except Exception:
+                time.sleep(0.1)
+        self.terminate()
+        raise RuntimeError("Chrome did not open its DevTools port in time")
+
+    # The methods below use the DevTools HTTP endpoints, so they need no websocket connection
+    def _request(self, path, method="GET", timeout=5):
+        request = urllib.request.Request(f"http://{self.debugger_address}{path}", method=method)
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8") or "null")
+
+    def version(self):
+        return self._request("/json/version", timeout=1)
+
+    # This method opens a websocket to the browser endpoint, used for commands no single page can send
+    def connect_browser(self):
+        return CDPConnection(self.version()["webSocketDebuggerUrl"]).connect()
+
+    def list_targets(self):
+        return self._request("/json/list")
+
+    def new_target(self, url="about:blank"):
+        return self._request(f"/json/new?{url}", method="PUT")
+
+    def close_target(self, target_id):
+        try:
+            self._request(f"/json/close/{target_id}")
+        except Exception:
+            pass
+
+    def is_alive(self):
+        if self.process is None or self.process.poll() is not None:
+            return False
+        try:
+            self.version()
+            return True
+        except Exception:
+            return False
+
+    # This method leaves a single blank tab open, dropping whatever the previous user navigated to
+    def reset_targets(self):
+        try:
+            blank = self.new_target()
+            for target in self.list_targets():
+                if target.get("type") == "page" and target.get("id") != blank.get("id"):
+                    self.close_target(target["id"])
+            return True
+        except Exception as e:
+            print(f"Chrome reset failed: {e}")
+            return False
+
+    def terminate(self):
+        if self.process is not None and self.process.poll() is None:
+            try:
+                if sys.platform == "win32":
+                    self.process.kill()
+                else:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait(timeout=5)
+            except Exception:
+                pass
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            self.user_data_dir = None
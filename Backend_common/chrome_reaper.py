@@ -0,0 +1,173 @@
+import os
+import signal
+import sys
+import threading
+import time
+
+REAPER_DEFAULTS = {"enabled": True, "interval": 60, "min_age": 120}
+
+# Command line markers of browsers started by chromedriver or by this project, a personal Chrome never has them
+AUTOMATION_MARKERS = ("--enable-automation", "--test-type=webdriver", "gotin-chrome-", "scoped_dir")
+
+
+class ProcessInfo:
+    def __init__(self, pid, ppid, name, cmdline, uid, rss, age):
+        self.pid = pid
+        self.ppid = ppid
+        self.name = name
+        self.cmdline = cmdline
+        self.uid = uid
+        self.rss = rss
+        self.age = age
+
+
+def _list_processes_psutil(psutil):
+    now = time.time()
+    processes = []
+    for p in psutil.process_iter(["pid", "ppid", "name", "cmdline", "uids", "memory_info", "create_time"]):
+        info = p.info
+        try:
+            processes.append(ProcessInfo(
+                info["pid"], info["ppid"], info["name"] or "", " ".join(info["cmdline"] or []),
+                info["uids"].real if info.get("uids") else None,
+                info["memory_info"].rss if info.get("memory_info") else 0,
+                now - (info["create_time"] or now),
+            ))
+        except Exception:
+            continue
+    return processes
+
+
+def _list_processes_proc():
+    clock_ticks = os.sysconf("SC_CLK_TCK")
+    with open("/proc/uptime", "r") as f:
+        uptime = float(f.read().split()[0])
+
+    processes = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+            # the name is wrapped in parentheses and may contain spaces
+            name = stat[stat.index("(") + 1:stat.rindex(")")]
+            fields = stat[stat.rindex(")") + 2:].split()
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode("utf-8", "replace").strip()
+            rss = 0
+            uid = None
+            with open(f"/proc/{entry}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss = int(line.split()[1]) * 1024
+                    elif line.startswith("Uid:"):
+                        uid = int(line.split()[1])
+            age = uptime - int(fields[19]) / clock_ticks
+            processes.append(ProcessInfo(int(entry), int(fields[1]), name, cmdline, uid, rss, age))
+        except (OSError, ValueError, IndexError):
+            continue
+    return processes
+
+
+# This function lists the processes of the machine, using psutil when it is installed
+def list_processes():
+    try:
+        import psutil
+        return _list_processes_psutil(psutil)
+    except ImportError:
+        pass
+    if os.path.isdir("/proc"):
+        return _list_processes_proc()
+    return None
+
+
+class ChromeReaper:
+    """
+    Background thread that kills chrome and chromedriver processes left behind by crashed or
+    leaked sessions. A process is reaped only when it is owned by this user, carries the
+    automation markers, is older than min_age and its parent is gone (re-parented to init).
+    """
+
+    def __init__(self, interval=60, min_age=120):
+        self.interval = interval
+        self.min_age = min_age
+        self._uid = os.getuid() if hasattr(os, "getuid") else None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        # counters exposed through stats()
+        self._runs = 0
+        self._killed = 0
+        self._reclaimed_bytes = 0
+
+    def start(self):
+        if list_processes() is None:
+            print("Chrome reaper disabled: install psutil to list processes on this platform")
+            return
+        threading.Thread(target=self._loop, name="chrome-reaper", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"Chrome reaper failed: {e}")
+
+    def _is_browser_process(self, process):
+        name = process.name.lower()
+        # crashpad handlers are re-parented to init by design, even while their browser is alive
+        if "crashpad" in name:
+            return False
+        return "chromedriver" in name or "chrome" in name or "chromium" in name
+
+    def _is_orphan(self, process, pids):
+        return process.ppid in (0, 1) or process.ppid not in pids
+
+    def find_orphans(self):
+        processes = list_processes() or []
+        pids = {p.pid for p in processes}
+        orphans = []
+        for process in processes:
+            if process.pid == os.getpid() or not self._is_browser_process(process):
+                continue
+            if self._uid is not None and process.uid is not None and process.uid != self._uid:
+                continue
+            if process.age < self.min_age or not self._is_orphan(process, pids):
+                continue
+            # renderer and gpu children have no markers, but an orphaned one means its browser is gone
+            if "chromedriver" in process.name.lower() or "--type=" in process.cmdline or \
+                    any(marker in process.cmdline for marker in AUTOMATION_MARKERS):
+                orphans.append(process)
+        return orphans
+
+    # This method kills the orphaned processes once and returns how many bytes of RSS were reclaimed
+    def reap(self):
+        reclaimed = 0
+        killed = 0
+        for process in self.find_orphans():
+            try:
+                os.kill(process.pid, signal.SIGKILL if sys.platform != "win32" else signal.SIGTERM)
+                reclaimed += process.rss
+                killed += 1
+            except (ProcessLookupError, PermissionError):
+                continue
+        with self._lock:
+            self._runs += 1
+            self._killed += killed
+            self._reclaimed_bytes += reclaimed
+        if killed:
+            print(f"Chrome reaper killed {killed} orphaned processes, reclaimed {reclaimed / (1024 * 1024):.1f} MB")
+        return reclaimed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "runs": self._runs,
+                "killed": self._killed,
+                "reclaimed_bytes": self._reclaimed_bytes,
+                "reclaimed_mb": round(self._reclaimed_bytes / (1024 * 1024), 1),
+            }
@@ -0,0 +1,231 @@
+from selenium import webdriver
+from contextlib import contextmanager
+from calculator_page import loaded_page, forget_page
+import copy
+import shutil
+import threading
+
+
+class DriverPoolTimeout(Exception):
+    pass
+
+
+def is_driver_healthy(driver):
+    try:
+        return driver.execute_script("return 1;") == 1 and len(driver.window_handles) > 0
+    except Exception:
+        return False
+
+
+# This function quits a driver, killing its chromedriver process if quit itself fails
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        try:
+            driver.service.process.kill()
+        except Exception:
+            pass
+
+
+# This function brings a driver back to a blank state so the next request doesn't see the previous one.
+# It closes every window but the first, so it is only for a driver that owns its Chrome (not TabPool's tabs).
+# A driver that keeps a calculator page loaded (see calculator_page.py) keeps it, and its cookies:
+# the page resets its own form when it is reused.
+def reset_driver(driver):
+    try:
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.switch_to.default_content()
+        if loaded_page(driver):
+            return True
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.get("about:blank")
+        return True
+    except Exception as e:
+        print(f"Driver reset failed, discarding driver: {e}")
+        return False
+
+
+class DriverPool:
+    """
+    Bounded pool of pre-warmed Chrome WebDriver sessions shared by all the requests of one backend.
+    Requests lease a driver, use it and hand it back; a driver is health checked and reset before
+    it is reused, and replaced by a fresh one if the check fails, if the request using it failed,
+    or after max_uses leases so that slow leaks inside Chrome don't build up.
+    """
+
+    def __init__(self, service_factory, options, size=2, acquire_timeout=120, max_uses=20, blocker=None, profile=None):
+        # every driver gets its own Service, since a Service owns one chromedriver process
+        self.service_factory = service_factory
+        self.options = options
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.max_uses = max_uses
+        self.blocker = blocker
+        self.profile = profile
+
+        # idle drivers ready to be leased, and a semaphore bounding the number of live drivers
+        self._idle = []
+        self._uses = {}
+        self._user_data_dirs = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+        # counters exposed through stats()
+        self._created = 0
+        self._discarded = 0
+        self._recycled = 0
+        self._leases = 0
+        self._in_use = 0
+
+    # This method pre-warms the pool in the background so the server can start accepting requests immediately
+    def start(self):
+        threading.Thread(target=self._warm_up, name="driver-pool-warmup", daemon=True).start()
+
+    def _warm_up(self):
+        if self.profile is not None:
+            self.profile.ensure()
+        for _ in range(self.size):
+            with self._lock:
+                if len(self._idle) + self._in_use >= self.size:
+                    break
+            if not self._slots.acquire(blocking=False):
+                break
+            try:
+                driver = self._create_driver()
+                with self._lock:
+                    self._idle.append(driver)
+            except Exception as e:
+                print(f"Driver pool warm-up failed: {e}")
+                break
+            finally:
+                self._slots.release()
+
+    def _create_driver(self):
+        # with a profile template every driver starts from its own clone of it
+        options = self.options
+        user_data_dir = self.profile.clone() if self.profile is not None else None
+        if user_data_dir:
+            options = copy.deepcopy(self.options)
+            options.add_argument(f"--user-data-dir={user_data_dir}")
+        try:
+            driver = webdriver.Chrome(service=self.service_factory(), options=options)
+        except Exception:
+            if user_data_dir:
+                shutil.rmtree(user_data_dir, ignore_errors=True)
+            raise
+        with self._lock:
+            self._created += 1
+            self._uses[driver] = 0
+            self._user_data_dirs[driver] = user_data_dir
+        return driver
+
+    # This method takes an idle driver, preferring one that keeps the given calculator page loaded (lock held)
+    def _take_idle(self, page):
+        if page is not None:
+            for index in range(len(self._idle) - 1, -1, -1):
+                if loaded_page(self._idle[index]) == page:
+                    return self._idle.pop(index)
+        return self._idle.pop() if self._idle else None
+
+    # This method takes a driver out of the pool, starting a new one if no warm driver is idle
+    def acquire(self, timeout=None, step=None, page=None):
+        if self._closed:
+            raise DriverPoolTimeout("Driver pool is shut down")
+
+        timeout = self.acquire_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise DriverPoolTimeout(f"No driver became available within {timeout} seconds")
+
+        try:
+            with self._lock:
+                driver = self._take_idle(page)
+                self._leases += 1
+                self._in_use += 1
+            if driver is None:
+                driver = self._create_driver()
+            with self._lock:
+                self._uses[driver] = self._uses.get(driver, 0) + 1
+            # a driver reused for another page starts from a clean state
+            if loaded_page(driver) not in (None, page):
+                forget_page(driver)
+                reset_driver(driver)
+            if self.blocker is not None:
+                self.blocker.attach(driver, step)
+            if self.profile is not None:
+                self.profile.prepare(driver)
+            return driver
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+            raise
+
+    # This method returns a leased driver to the pool if it is still healthy, otherwise it is quit.
+    # discard=True is used when the request failed, since the browser state is unknown then.
+    def release(self, driver, discard=False):
+        if self.blocker is not None:
+            self.blocker.detach(driver)
+        with self._lock:
+            self._in_use -= 1
+            worn_out = self._uses.get(driver, 0) >= self.max_uses
+            if worn_out and not discard:
+                self._recycled += 1
+        try:
+            if not (discard or worn_out or self._closed) and is_driver_healthy(driver) and reset_driver(driver):
+                with self._lock:
+                    self._idle.append(driver)
+                return
+            self._quit(driver)
+        finally:
+            self._slots.release()
+
+    # The lease is the lifetime of a driver for a request: it is always handed back, even when the request raises
+    @contextmanager
+    def lease(self, timeout=None, step=None, page=None):
+        driver = self.acquire(timeout, step, page)
+        try:
+            yield driver
+        except BaseException:
+            self.release(driver, discard=True)
+            raise
+        else:
+            self.release(driver)
+
+    def _quit(self, driver):
+        with self._lock:
+            self._discarded += 1
+            self._uses.pop(driver, None)
+            user_data_dir = self._user_data_dirs.pop(driver, None)
+        quit_driver(driver)
+        if user_data_dir:
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+
+    # This method quits all the idle drivers and stops handing out new ones
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._quit(driver)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": "drivers",
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "created": self._created,
+                "discarded": self._discarded,
+                "recycled": self._recycled,
+                "max_uses": self.max_uses,
+                "leases": self._leases,
+                "blocking": self.blocker.stats() if self.blocker else None,
+                "profile": self.profile.stats() if self.profile else None,
+            }
@@ -0,0 +1,106 @@
+from selenium.webdriver.chrome.service import Service
+from gotin_config import get_section
+from chrome_process import find_chrome_binary
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+# On-disk cache holding the last chromedriver path that was resolved on this machine
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "gotin", "chromedriver.json")
+
+_driver_path = None
+_lock = threading.Lock()
+
+
+def _is_executable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+# This function returns the major version of the installed Chrome, None when it can't be read
+def chrome_major_version(binary=None):
+    try:
+        output = subprocess.run([find_chrome_binary(binary), "--version"], capture_output=True,
+                                text=True, timeout=10).stdout
+    except Exception:
+        return None
+    match = re.search(r"(\d+)\.\d+", output)
+    return int(match.group(1)) if match else None
+
+
+# The cached path is only used while Chrome is still the major version it was resolved for, a Chrome
+# update needs a matching chromedriver. When Chrome's version can't be read the cached path is kept
+def _read_cache(cache_file, chrome_major):
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except Exception:
+        return None
+    if chrome_major is not None and entry.get("chrome_major") != chrome_major:
+        print(f"Cached chromedriver was resolved for Chrome {entry.get('chrome_major')}, Chrome is {chrome_major}, resolving it again")
+        return None
+    return entry.get("path")
+
+
+def _write_cache(cache_file, path, chrome_major):
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump({"path": path, "chrome_major": chrome_major}, f)
+    except Exception as e:
+        print(f"Could not write chromedriver cache: {e}")
+
+
+# This function finds the chromedriver executable without touching the network whenever a known path exists.
+# Lookup order: GOTIN_CHROMEDRIVER env variable, the path pinned in config.json, the on-disk cache,
+# webdriver-manager (may probe versions online), and finally a chromedriver found on the PATH.
+def resolve_chromedriver_path():
+    config = get_section("chromedriver", {"path": None, "cache_file": None, "chrome_binary": None})
+    cache_file = config["cache_file"] or DEFAULT_CACHE_FILE
+
+    for path in (os.environ.get("GOTIN_CHROMEDRIVER"), config["path"]):
+        if _is_executable(path):
+            return path
+
+    chrome_major = chrome_major_version(config["chrome_binary"])
+    path = _read_cache(cache_file, chrome_major)
+    if _is_executable(path):
+        return path
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+        if _is_executable(path):
+            _write_cache(cache_file, path, chrome_major)
+            return path
+    except Exception as e:
+        print(f"webdriver-manager could not resolve chromedriver: {e}")
+
+    path = shutil.which("chromedriver")
+    if path:
+        _write_cache(cache_file, path, chrome_major)
+        return path
+
+    raise RuntimeError("chromedriver could not be resolved, set chromedriver.path in config.json")
+
+
+# This function returns the chromedriver path of this process, resolving it on first use only
+def get_chromedriver_path():
+    global _driver_path
+    with _lock:
+        if _driver_path is None:
+            _driver_path = resolve_chromedriver_path()
+        return _driver_path
+
+
+# This function builds a Service for the resolved driver. A Service owns a single chromedriver
+# process, so every live driver needs its own instance, but none of them resolves the driver again.
+def create_chrome_service():
+    return Service(get_chromedriver_path())
+
+
+if __name__ == '__main__':
+    # resolve once ahead of the backends so they all start from the cache
+    print(resolve_chromedriver_path())
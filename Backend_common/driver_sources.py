@@ -0,0 +1,61 @@
+from gotin_config import get_section
+from driver_pool import DriverPool
+from tab_pool import TabPool
+from driver_resolver import create_chrome_service
+from browser_broker import BROKER_DEFAULTS
+from broker_client import BrokerClient
+from resource_blocking import ResourceBlocker, BLOCKING_DEFAULTS
+from profile_template import ProfileTemplate, PROFILE_DEFAULTS
+from chrome_reaper import ChromeReaper, REAPER_DEFAULTS
+from async_cdp import AsyncBrowser, AsyncEngine, ASYNC_ENGINE_DEFAULTS
+
+POOL_DEFAULTS = {"mode": "drivers", "size": 2, "acquire_timeout": 120, "max_uses": 20, "max_tabs": 6,
+                 "chrome_binary": None}
+
+
+# This function builds the object the scrapers lease drivers from: the machine-wide browser broker
+# when it is enabled in config.json, otherwise a pool owned by this backend: warm drivers, or tabs of one
+# shared Chrome when the pool mode is "tabs"
+def create_driver_source(client_name, options):
+    pool_config = get_section("driver_pool", POOL_DEFAULTS)
+    broker_config = get_section("browser_broker", BROKER_DEFAULTS)
+
+    # request blocking and page load strategy apply to every session of the backend, whatever serves it
+    blocker = ResourceBlocker(client_name, get_section("resource_blocking", BLOCKING_DEFAULTS))
+    blocker.prepare_options(options)
+
+    # sessions start from a warm profile template with the sites' consent cookies already set
+    profile_config = get_section("browser_profile", PROFILE_DEFAULTS)
+    profile = ProfileTemplate(client_name, profile_config, create_chrome_service, options) \
+        if profile_config["enabled"] else None
+
+    if broker_config["enabled"]:
+        return BrokerClient(create_chrome_service, broker_config["host"], broker_config["port"],
+                            client_name, pool_config["acquire_timeout"], blocker, profile)
+
+    if pool_config["mode"] == "tabs":
+        return TabPool(create_chrome_service, options, pool_config["max_tabs"], pool_config["acquire_timeout"],
+                       pool_config["max_uses"], pool_config["size"], pool_config["chrome_binary"], blocker, profile)
+
+    return DriverPool(create_chrome_service, options, pool_config["size"], pool_config["acquire_timeout"],
+                      pool_config["max_uses"], blocker, profile)
+
+
+# This function builds the background reaper of orphaned chrome/chromedriver processes, or None if it is disabled
+def create_chrome_reaper():
+    reaper_config = get_section("chrome_reaper", REAPER_DEFAULTS)
+    if not reaper_config["enabled"]:
+        return None
+    return ChromeReaper(reaper_config["interval"], reaper_config["min_age"])
+
+
+# This function builds the asyncio engine that serves the requests of the backend from one event loop,
+# or None if it is disabled; its pages get the same request blocking as the backend's sessions
+def create_async_engine(client_name):
+    engine_config = get_section("async_engine", ASYNC_ENGINE_DEFAULTS)
+    if not engine_config["enabled"]:
+        return None
+    blocker = ResourceBlocker(client_name, get_section("resource_blocking", BLOCKING_DEFAULTS))
+    browser = AsyncBrowser(engine_config["chrome_binary"], max_pages=engine_config["max_pages"],
+                           blocked_urls=blocker.patterns if blocker.enabled else None)
+    return AsyncEngine(browser, engine_config["timeout"])
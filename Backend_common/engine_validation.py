@@ -0,0 +1,108 @@
+import threading
+from gotin_config import get_section
+
+FORMULA_ENGINE_DEFAULTS = {
+    "enabled": True,
+    # consecutive matches with the site an engine needs before it answers on its own
+    "trust_after": 5,
+    # every validate_every-th request an engine answers is also sent to the site, and the answers compared
+    "validate_every": 25,
+    # the largest difference between a computed number and the site's that still counts as a match
+    "tolerance": 0.01,
+}
+
+
+class EngineValidator:
+    """
+    Keeps a local formula engine honest against the site it replicates. An engine isn't trusted until
+    trust_after answers in a row matched the site's, since a wrong formula can still agree at one point, and
+    stops being trusted as soon as one doesn't: while untrusted every request goes to the site and is
+    compared, while trusted only every validate_every-th request is.
+    """
+
+    def __init__(self, name, config=None):
+        self.name = name
+        self.config = config if config is not None else get_section("formula_engine", FORMULA_ENGINE_DEFAULTS)
+        self.trusted = False
+        self._lock = threading.Lock()
+        self._answered = 0
+        self._validated = 0
+        self._mismatches = 0
+        self._streak = 0
+        self._last_mismatch = None
+
+    # This method tells whether the request should (also) go to the site, and counts the engine's answers
+    def should_validate(self):
+        if not self.config["enabled"]:
+            return True
+        with self._lock:
+            if not self.trusted:
+                return True
+            self._answered += 1
+            return self._answered % max(1, int(self.config["validate_every"])) == 0
+
+    # This method compares the engine's answer with the site's and updates the trust in the engine. A
+    # request without a number on either side (a rejection message, for one) has nothing to compare and
+    # leaves the trust as it is
+    def record(self, engine_value, site_value):
+        if engine_value is None or site_value is None:
+            return False
+        matched = self.matches(engine_value, site_value)
+        with self._lock:
+            self._validated += 1
+            if matched:
+                self._streak += 1
+            else:
+                self._streak = 0
+                self._mismatches += 1
+                self._last_mismatch = {"engine": engine_value, "site": site_value}
+            self.trusted = self._streak >= max(1, int(self.config["trust_after"]))
+            streak = self._streak
+        if matched:
+            print(f"🧮 {self.name} engine matches the site ({site_value}), {streak} in a row")
+        else:
+            print(f"⚠️ {self.name} engine computed {engine_value}, the site {site_value}, using the site until they match")
+        return matched
+
+    # numbers match within the tolerance, dicts when every value does. Anything that isn't a number never
+    # matches, so only a compared number can make an engine trusted
+    def matches(self, engine_value, site_value):
+        if isinstance(engine_value, dict) and isinstance(site_value, dict):
+            return bool(engine_value) and engine_value.keys() == site_value.keys() and all(
+                self.matches(engine_value[key], site_value[key]) for key in engine_value)
+        try:
+            return abs(float(engine_value) - float(site_value)) <= self.config["tolerance"]
+        except (TypeError, ValueError):
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "trusted": self.trusted,
+                "answered": self._answered,
+                "validated": self._validated,
+                "streak": self._streak,
+                "mismatches": self._mismatches,
+                "last_mismatch": self._last_mismatch,
+            }
+
+
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+# This function returns the validator of an engine, shared by every request of the process. tolerance
+# replaces the configured one, for engines whose site rounds its numbers coarser
+def engine_validator(name, tolerance=None):
+    with _validators_lock:
+        if name not in _validators:
+            config = get_section("formula_engine", FORMULA_ENGINE_DEFAULTS)
+            if tolerance is not None:
+                config["tolerance"] = tolerance
+            _validators[name] = EngineValidator(name, config)
+        return _validators[name]
+
+
+def engine_stats():
+    with _validators_lock:
+        return {name: validator.stats() for name, validator in _validators.items()}
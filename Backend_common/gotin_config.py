@@ -0,0 +1,27 @@
+import json
+import os
+
+# Path of the central config.json shared by all the backends
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+
+_config = None
+
+
+# This function loads config.json once per process and returns the parsed dictionary
+def load_config():
+    global _config
+    if _config is None:
+        try:
+            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+                _config = json.load(f)
+        except Exception as e:
+            print(f"Error loading config: {str(e)}")
+            _config = {}
+    return _config
+
+
+# This function returns a section of the config, falling back to the given defaults for missing keys
+def get_section(name, defaults=None):
+    section = dict(defaults or {})
+    section.update(load_config().get(name, {}))
+    return section
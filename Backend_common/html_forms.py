@@ -0,0 +1,276 @@
+from html.parser import HTMLParser
+import re
+
+# Inputs that are never posted, or only when they were the button that submitted the form
+NOT_POSTED_INPUTS = ("submit", "button", "image", "reset", "file")
+
+# ASP.NET cross-page postbacks move the form to another page from the button's onclick:
+# WebForm_DoPostBackWithOptions(new WebForm_PostBackOptions(target, argument, validation, group, actionUrl, ...))
+POSTBACK_OPTIONS = re.compile(r'WebForm_PostBackOptions\(\s*"[^"]*"\s*,\s*"[^"]*"\s*,\s*\w+\s*,\s*"[^"]*"\s*,\s*"([^"]*)"')
+
+
+def clean_text(text):
+    return " ".join(text.split())
+
+
+class FormParser(HTMLParser):
+    """
+    Reads the forms of a page the way a browser would post them: the action and method of each form,
+    its successful fields as (name, value) pairs in document order (checked boxes only, the selected
+    option of a select) and its submit buttons, which are posted only when they are the one clicked.
+    Each form also keeps its inputs by id, as (name, type, value), and the (value, text) options of its
+    selects by name, for pages whose script fills the form in before posting it.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms = []
+        self._form = None
+        self._select = None
+        self._option = None
+        self._textarea = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: (value if value is not None else "") for name, value in attrs}
+        if tag == "form":
+            self._form = {"action": attrs.get("action", ""), "method": attrs.get("method", "get").lower(),
+                          "id": attrs.get("id"), "name": attrs.get("name"), "fields": [], "submits": [],
+                          "ids": {}, "options": {}}
+            self.forms.append(self._form)
+        elif self._form is None:
+            return
+        elif tag == "input":
+            self._input(attrs)
+        elif tag == "button" and attrs.get("type", "submit").lower() == "submit" and attrs.get("name"):
+            self._form["submits"].append({"name": attrs["name"], "value": attrs.get("value", ""),
+                                          "onclick": attrs.get("onclick", "")})
+        elif tag == "select" and attrs.get("name"):
+            self._select = {"name": attrs["name"], "selected": None, "first": None}
+            self._form["options"][attrs["name"]] = []
+            if attrs.get("id"):
+                self._form["ids"][attrs["id"]] = (attrs["name"], "select", None)
+        elif tag == "option" and self._select is not None:
+            self._end_option()
+            self._option = {"value": attrs.get("value"), "text": "", "selected": "selected" in attrs}
+        elif tag == "textarea" and attrs.get("name"):
+            self._textarea = {"name": attrs["name"], "text": ""}
+
+    def _input(self, attrs):
+        name = attrs.get("name")
+        kind = attrs.get("type", "text").lower()
+        if not name or "disabled" in attrs:
+            return
+        if attrs.get("id"):
+            self._form["ids"][attrs["id"]] = (name, kind, attrs.get("value", "on" if kind in ("checkbox", "radio") else ""))
+        if kind in ("submit", "image"):
+            self._form["submits"].append({"name": name, "value": attrs.get("value", ""),
+                                          "onclick": attrs.get("onclick", "")})
+        elif kind in NOT_POSTED_INPUTS:
+            return
+        elif kind in ("checkbox", "radio"):
+            if "checked" in attrs:
+                self._form["fields"].append((name, attrs.get("value", "on")))
+        else:
+            self._form["fields"].append((name, attrs.get("value", "")))
+
+    def handle_data(self, data):
+        if self._option is not None:
+            self._option["text"] += data
+        elif self._textarea is not None:
+            self._textarea["text"] += data
+
+    def _end_option(self):
+        if self._option is None:
+            return
+        option, self._option = self._option, None
+        value = option["value"] if option["value"] is not None else clean_text(option["text"])
+        if self._form is not None:
+            self._form["options"][self._select["name"]].append((value, clean_text(option["text"])))
+        if self._select["first"] is None:
+            self._select["first"] = value
+        if option["selected"]:
+            self._select["selected"] = value
+
+    def handle_endtag(self, tag):
+        if tag == "option" and self._select is not None:
+            self._end_option()
+        elif tag == "select" and self._select is not None:
+            self._end_option()
+            value = self._select["selected"] if self._select["selected"] is not None else self._select["first"]
+            if value is not None and self._form is not None:
+                self._form["fields"].append((self._select["name"], value))
+            self._select = None
+        elif tag == "textarea" and self._textarea is not None:
+            self._form["fields"].append((self._textarea["name"], self._textarea["text"]))
+            self._textarea = None
+        elif tag == "form":
+            self._form = None
+
+
+# This function returns the forms of an HTML page, see FormParser
+def parse_forms(html):
+    parser = FormParser()
+    parser.feed(html)
+    parser.close()
+    return parser.forms
+
+
+# This function returns the url a submit button posts its form to: the actionUrl of an ASP.NET
+# cross-page postback when it has one, the form's action otherwise
+def submit_action(form, submit=None):
+    match = POSTBACK_OPTIONS.search(submit["onclick"]) if submit else None
+    if match and match.group(1):
+        return match.group(1)
+    return form["action"]
+
+
+class RowParser(HTMLParser):
+    """
+    Reads table rows as lists of cells, each cell with its whitespace-collapsed text and the names of the
+    inputs in it. Only the rows inside an element with container_class, or the rows with row_class, are
+    kept. Cells of a nested table belong to the nested rows, not to the outer cell.
+    """
+
+    def __init__(self, container_class=None, row_class=None):
+        super().__init__(convert_charrefs=True)
+        self.container_class = container_class
+        self.row_class = row_class
+        self.rows = []
+        # stack of open elements, each (tag, whether it opened the container)
+        self._stack = []
+        self._containers = 0
+        # stack of the rows being read, one per open table level
+        self._open_rows = []
+
+    def _has_class(self, attrs, name):
+        return name is not None and name in (attrs.get("class") or "").split()
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        is_container = self._has_class(attrs, self.container_class)
+        if tag not in ("input", "br", "img", "hr", "meta", "link"):
+            self._stack.append((tag, is_container))
+        if is_container:
+            self._containers += 1
+
+        if tag == "tr":
+            kept = (self.container_class is not None and self._containers > 0) or self._has_class(attrs, self.row_class)
+            row = {"kept": kept, "cells": [], "cell": None}
+            self._open_rows.append(row)
+            # rows are listed in document order, an outer row before the rows nested in it
+            if kept:
+                self.rows.append(row["cells"])
+        elif tag in ("td", "th") and self._open_rows:
+            row = self._open_rows[-1]
+            row["cell"] = {"text": "", "inputs": []}
+            row["cells"].append(row["cell"])
+        elif tag in ("input", "select", "textarea") and self._open_rows and self._open_rows[-1]["cell"] is not None:
+            if attrs.get("name"):
+                self._open_rows[-1]["cell"]["inputs"].append(attrs["name"])
+
+    def handle_data(self, data):
+        if self._open_rows and self._open_rows[-1]["cell"] is not None:
+            self._open_rows[-1]["cell"]["text"] += data
+
+    def handle_endtag(self, tag):
+        # close everything up to the matching open tag, browsers forgive missing end tags the same way
+        if not any(open_tag == tag for open_tag, _ in self._stack):
+            return
+        while self._stack:
+            open_tag, was_container = self._stack.pop()
+            if was_container:
+                self._containers -= 1
+            if open_tag == "tr" and self._open_rows:
+                self._end_row()
+            elif open_tag in ("td", "th") and self._open_rows:
+                self._open_rows[-1]["cell"] = None
+            if open_tag == tag:
+                break
+
+    def _end_row(self):
+        row = self._open_rows.pop()
+        for cell in row["cells"]:
+            cell["text"] = clean_text(cell["text"])
+
+
+# This function returns the rows of the tables in an element with container_class, or the rows with
+# row_class, as lists of {"text", "inputs"} cells
+def parse_rows(html, container_class=None, row_class=None):
+    parser = RowParser(container_class, row_class)
+    parser.feed(html)
+    parser.close()
+    while parser._open_rows:
+        parser._end_row()
+    return parser.rows
+
+
+class ElementTextParser(HTMLParser):
+    """
+    Streaming reader of the text of the elements with the given ids. It is fed the page as it downloads
+    and is complete as soon as every id has text, so the rest of the page isn't parsed. Inline scripts that
+    mention one of the ids are kept, for values a page fills in from its own script data.
+    """
+
+    # elements without an end tag, they never hold text
+    VOID_TAGS = ("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr")
+
+    def __init__(self, ids):
+        super().__init__(convert_charrefs=True)
+        self.ids = list(ids)
+        self.texts = {}
+        self.scripts = []
+        # open elements inside a wanted element, each (tag, id it collects for or None)
+        self._open = []
+        self._script = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "script":
+            self._script = ""
+            return
+        if tag in self.VOID_TAGS:
+            return
+        element_id = dict(attrs).get("id")
+        if element_id in self.ids and element_id not in self.texts:
+            self._open.append((tag, element_id))
+            self.texts[element_id] = ""
+        elif self._open:
+            self._open.append((tag, None))
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._script is not None:
+            if any(element_id in self._script for element_id in self.ids):
+                self.scripts.append(self._script)
+            self._script = None
+            return
+        while self._open:
+            open_tag, element_id = self._open.pop()
+            if element_id is not None:
+                self.texts[element_id] = clean_text(self.texts[element_id])
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self._script is not None:
+            self._script += data
+            return
+        for _, element_id in self._open:
+            if element_id is not None:
+                self.texts[element_id] += data
+
+    # This method feeds the next piece of the page, and returns True once every id has its text
+    def consume(self, text):
+        self.feed(text)
+        return self.complete()
+
+    def complete(self):
+        closed = [element_id for _, element_id in self._open]
+        return all(self.texts.get(element_id) and element_id not in closed for element_id in self.ids)
+
+    # This method looks for a value in the kept scripts, as "key": value or key = value
+    def script_value(self, key):
+        pattern = re.compile(r'["\']?' + re.escape(key) + r'["\']?\s*[:=]\s*["\']?([^"\',;}\s]+)')
+        for script in self.scripts:
+            match = pattern.search(script)
+            if match:
+                return match.group(1)
+        return None
@@ -0,0 +1,97 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from gotin_config import get_section
+
+HTTP_DEFAULTS = {
+    "enabled": True,
+    "timeout": 10,
+    "pool_connections": 4,
+    "pool_maxsize": 8,
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/124.0 Safari/537.36",
+}
+
+_shared_adapter = None
+_shared_lock = threading.Lock()
+
+
+# This function returns the HTTPAdapter shared by every session of the process. Its urllib3 pool keeps
+# pool_maxsize keep-alive connections for each of pool_connections hosts, so the requests of a flow, and
+# of consecutive flows, skip the TCP and TLS handshakes. A connection the server dropped while it idled
+# is replaced, and the request sent again once
+def shared_adapter():
+    global _shared_adapter
+    with _shared_lock:
+        if _shared_adapter is None:
+            config = get_section("http_client", HTTP_DEFAULTS)
+            _shared_adapter = HTTPAdapter(pool_connections=config["pool_connections"],
+                                          pool_maxsize=config["pool_maxsize"], max_retries=1)
+        return _shared_adapter
+
+
+def http_enabled():
+    return get_section("http_client", HTTP_DEFAULTS)["enabled"]
+
+
+# This function returns the shared pool's counters: requests sent, connections opened and reused
+def http_stats():
+    if _shared_adapter is None:
+        return None
+    pools = _shared_adapter.poolmanager.pools
+    requests_sent = 0
+    opened = 0
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is not None:
+            requests_sent += pool.num_requests
+            opened += pool.num_connections
+    return {"requests": requests_sent, "opened": opened, "reused": requests_sent - opened, "hosts": len(pools)}
+
+
+# This function decodes pages that don't name their charset as UTF-8, requests would read text/html as latin-1
+def default_charset(response, *args, **kwargs):
+    if "charset" not in response.headers.get("Content-Type", "").lower():
+        response.encoding = "utf-8"
+    return response
+
+
+class HttpSession(requests.Session):
+    """
+    The cookies of one scraping flow on top of the shared connection pool. ASP.NET and similar pages keep
+    their session in a cookie between the GET of a form and its POST, so a flow uses one session, and
+    each request of the backend gets a session of its own. Requests time out after the configured timeout
+    and responses of 400 and above raise requests.HTTPError.
+    """
+
+    def __init__(self):
+        super().__init__()
+        config = get_section("http_client", HTTP_DEFAULTS)
+        self.timeout = config["timeout"]
+        self.headers.update({
+            "User-Agent": config["user_agent"],
+            "Accept": "text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.8",
+            "Accept-Language": "he-IL,he;q=0.9,en;q=0.8",
+        })
+        adapter = shared_adapter()
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.hooks["response"].append(default_charset)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        response = super().request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    # This method GETs a page and feeds its decoded text to consume piece by piece, as it arrives, instead of
+    # keeping the body. Once consume returns True the download stops
+    def stream(self, url, consume, chunk_size=16384):
+        with self.get(url, stream=True) as response:
+            for text in response.iter_content(chunk_size, decode_unicode=True):
+                if consume(text):
+                    break
+
+    # The adapter is shared with the other sessions, closing a session must not close its connections
+    def close(self):
+        pass
@@ -0,0 +1,293 @@
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, JavascriptException, \
+    UnexpectedAlertPresentException
+from selenium.webdriver.remote.webelement import WebElement
+from cdp_client import CDPConnection, CDPError
+from contextlib import contextmanager
+import contextvars
+import math
+import threading
+import time
+
+# WebDriverWait checks its condition every 500 ms, the report estimates what that polling would have cost
+WEBDRIVER_POLL = 0.5
+
+# Events that can change what a wait condition sees without touching the DOM tree
+PAGE_EVENTS = "['hashchange', 'popstate', 'scroll', 'load', 'transitionend', 'animationend']"
+
+# Resolves with the condition's value as soon as it holds, re-checking it on every DOM mutation and page
+# event. The condition is a function body reading arguments[i], like an execute_script body. A slow
+# recheck catches changes no event reports (layout only), and the value is null when the timeout ends.
+# initial tells whether the condition already held when the wait started.
+OBSERVE_SCRIPT = """
+    var done = arguments[arguments.length - 1];
+    var condition = new Function(arguments[0]);
+    var args = arguments[1];
+    var finished = false;
+    var initial = true;
+    var events = """ + PAGE_EVENTS + """;
+    function check() {
+        if (finished) { return; }
+        var value = null;
+        try { value = condition.apply(null, args); } catch (e) { value = null; }
+        if (value) { finish(value); }
+    }
+    function finish(value) {
+        finished = true;
+        observer.disconnect();
+        clearTimeout(timer);
+        clearInterval(recheck);
+        events.forEach(function(name) { window.removeEventListener(name, check, true); });
+        document.removeEventListener('readystatechange', check);
+        done({value: value, initial: initial});
+    }
+    var observer = new MutationObserver(check);
+    observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    events.forEach(function(name) { window.addEventListener(name, check, true); });
+    document.addEventListener('readystatechange', check);
+    var timer = setTimeout(function() { finish(null); }, arguments[2] * 1000);
+    var recheck = setInterval(check, 250);
+    check();
+    initial = false;
+"""
+
+# Resolves after the next DOM mutation or page event, or after arguments[0] seconds without one
+NEXT_CHANGE_SCRIPT = """
+    var done = arguments[arguments.length - 1];
+    var events = """ + PAGE_EVENTS + """;
+    var finished = false;
+    function finish() {
+        if (finished) { return; }
+        finished = true;
+        observer.disconnect();
+        clearTimeout(timer);
+        events.forEach(function(name) { window.removeEventListener(name, finish, true); });
+        document.removeEventListener('readystatechange', finish);
+        done(true);
+    }
+    var observer = new MutationObserver(finish);
+    observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    events.forEach(function(name) { window.addEventListener(name, finish, true); });
+    document.addEventListener('readystatechange', finish);
+    var timer = setTimeout(finish, arguments[0] * 1000);
+"""
+
+# Resolves once the DOM went arguments[0] seconds without a mutation, returns false if it never did
+QUIET_SCRIPT = """
+    var done = arguments[arguments.length - 1];
+    var quiet = arguments[0] * 1000;
+    var idle = setTimeout(settled, quiet);
+    var timer = setTimeout(function() { finish(false); }, arguments[1] * 1000);
+    var observer = new MutationObserver(function() {
+        clearTimeout(idle);
+        idle = setTimeout(settled, quiet);
+    });
+    observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    function settled() { finish(true); }
+    function finish(value) {
+        observer.disconnect();
+        clearTimeout(idle);
+        clearTimeout(timer);
+        done(value);
+    }
+"""
+
+
+class WaitReport:
+    """
+    What the event-driven waits of one request cost, against the fixed sleeps and WebDriverWait
+    polling they replaced. For a replaced sleep the saving is the sleep minus the wait; for a replaced
+    WebDriverWait it is the time until the poll that would have seen the condition.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.waits = 0
+        self.waited = 0.0
+        self.replaced = 0.0
+        self.started = time.monotonic()
+
+    def record(self, waited, replaced):
+        self.waits += 1
+        self.waited += waited
+        self.replaced += replaced
+
+    def summary(self):
+        return {
+            "waits": self.waits,
+            "waited": round(self.waited, 3),
+            "replaced": round(self.replaced, 3),
+            "removed": round(self.replaced - self.waited, 3),
+            "request_time": round(time.monotonic() - self.started, 3),
+        }
+
+
+_current_report = contextvars.ContextVar("gotin_wait_report", default=None)
+_totals = {"requests": 0, "waits": 0, "waited": 0.0, "replaced": 0.0, "removed": 0.0}
+_totals_lock = threading.Lock()
+
+
+# This function collects the waits of one request into a report, printed when the request ends. It is
+# scoped with a context variable, so requests served by threads and by asyncio tasks don't mix
+@contextmanager
+def wait_report(name):
+    report = WaitReport(name)
+    token = _current_report.set(report)
+    try:
+        yield report
+    finally:
+        _current_report.reset(token)
+        summary = report.summary()
+        with _totals_lock:
+            _totals["requests"] += 1
+            for key in ("waits", "waited", "replaced", "removed"):
+                _totals[key] += summary[key]
+        print(f"⏱️ Waits of {name}: {summary['waits']} waits took {summary['waited']:.2f}s instead of "
+              f"{summary['replaced']:.2f}s, {summary['removed']:.2f}s removed from a {summary['request_time']:.2f}s request")
+
+
+def record_wait(waited, replaced):
+    report = _current_report.get()
+    if report is not None:
+        report.record(waited, replaced)
+
+
+def wait_stats():
+    with _totals_lock:
+        totals = dict(_totals)
+    for key in ("waited", "replaced", "removed"):
+        totals[key] = round(totals[key], 3)
+    return totals
+
+
+# This function returns what a wait stood in for: the fixed sleep it replaced, or the time WebDriverWait
+# would have taken to see the condition (it checks at once, then every 500 ms)
+def replaced_time(waited, initial, replaces=None):
+    if replaces is not None:
+        return replaces
+    if initial:
+        return waited
+    return max(waited, math.ceil(waited / WEBDRIVER_POLL) * WEBDRIVER_POLL)
+
+
+def _driver_of(target):
+    return target.parent if isinstance(target, WebElement) else target
+
+
+def _run_async_script(driver, script, timeout, *args):
+    driver.set_script_timeout(timeout + 5)
+    return driver.execute_async_script(script, *args)
+
+
+class EventWait:
+    """
+    Drop-in replacement for WebDriverWait. until() evaluates the same Selenium conditions, but between
+    two checks it blocks in the page on a MutationObserver instead of sleeping, so it returns as soon as
+    the DOM changes into the awaited state rather than on the next 500 ms poll.
+    replaces=seconds marks a wait that stands in for a fixed sleep, for the report.
+    """
+
+    def __init__(self, driver, timeout, replaces=None, ignored_exceptions=None):
+        self._target = driver
+        self._driver = _driver_of(driver)
+        self._timeout = timeout
+        self._replaces = replaces
+        self._ignored = (NoSuchElementException,) + tuple(ignored_exceptions or ())
+
+    def until(self, method, message=""):
+        start = time.monotonic()
+        deadline = start + self._timeout
+        checks = 0
+        while True:
+            checks += 1
+            try:
+                value = method(self._target)
+                if value:
+                    self._record(time.monotonic() - start, checks == 1)
+                    return value
+            except self._ignored:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutException(message)
+            self._next_change(remaining)
+
+    def until_not(self, method, message=""):
+        return self.until(lambda target: not method(target), message)
+
+    def _next_change(self, remaining):
+        try:
+            # a short cap keeps conditions that no DOM event announces (alerts, window handles) responsive
+            _run_async_script(self._driver, NEXT_CHANGE_SCRIPT, remaining, min(remaining, 1))
+        except UnexpectedAlertPresentException:
+            # the alert is checked, or surfaced, by the condition itself
+            pass
+        except (JavascriptException, TimeoutException):
+            # the document was unloaded by a navigation, check again in the new one
+            pass
+
+    def _record(self, waited, initial):
+        record_wait(waited, replaced_time(waited, initial, self._replaces))
+
+
+# This function waits in the page until a script condition returns a truthy value and returns it, or
+# raises TimeoutException. It takes a single round trip, however many changes the page goes through
+def wait_until(driver, condition, *args, timeout=10, replaces=None, message=""):
+    driver = _driver_of(driver)
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutException(message or f"Timed out waiting for: {condition.strip()[:80]}")
+        try:
+            result = _run_async_script(driver, OBSERVE_SCRIPT, remaining, condition, list(args), remaining)
+        except JavascriptException:
+            # the document was unloaded by a navigation, observe the new one
+            continue
+        if result["value"]:
+            waited = time.monotonic() - start
+            record_wait(waited, replaced_time(waited, result["initial"], replaces))
+            return result["value"]
+
+
+# This function waits until the DOM went quiet seconds without a mutation, the event-driven replacement
+# for a sleep that let a widget finish rendering. It returns False instead of raising on timeout.
+def wait_for_dom_quiet(driver, quiet=0.2, timeout=3, replaces=None):
+    driver = _driver_of(driver)
+    start = time.monotonic()
+    try:
+        settled = _run_async_script(driver, QUIET_SCRIPT, timeout, quiet, timeout)
+    except (JavascriptException, TimeoutException):
+        settled = False
+    if replaces is not None:
+        record_wait(time.monotonic() - start, replaces)
+    return settled
+
+
+# This function waits for Chrome's networkIdle lifecycle event of the driver's current page: no request
+# in flight for 500 ms. Chromedriver keeps CDP events from Selenium, so it attaches its own DevTools
+# client to the page target through the session's debuggerAddress (chromedriver's window handles are the
+# target ids). Chrome replays the lifecycle events a document already went through when they are enabled,
+# so an idle page answers at once. Without a debugger address it falls back to a DOM-quiet wait.
+def wait_for_network_idle(driver, timeout=10, replaces=None):
+    driver = _driver_of(driver)
+    address = driver.capabilities.get("goog:chromeOptions", {}).get("debuggerAddress")
+    if not address:
+        return wait_for_dom_quiet(driver, quiet=0.3, timeout=min(timeout, 3), replaces=replaces)
+    target_id = driver.current_window_handle
+    start = time.monotonic()
+    connection = CDPConnection(f"ws://{address}/devtools/page/{target_id}", timeout=timeout, keep_events=True)
+    try:
+        connection.send("Page.enable")
+        connection.send("Page.setLifecycleEventsEnabled", {"enabled": True})
+        idle = connection.wait_for_event(
+            "Page.lifecycleEvent", lambda params: params.get("frameId") == target_id and params.get("name") == "networkIdle",
+            timeout)
+    except CDPError as e:
+        print(f"Waiting for network idle failed: {e}")
+        idle = None
+    finally:
+        connection.close()
+    waited = time.monotonic() - start
+    record_wait(waited, replaced_time(waited, False, replaces))
+    return idle is not None
@@ -0,0 +1,244 @@
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from driver_pool import quit_driver
+import copy
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PROFILE_DEFAULTS = {"enabled": True, "dir": None, "max_age_hours": 24}
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "gotin", "profiles")
+
+# Pages every backend visits while its template is built, with the popups and banners dismissed on them,
+# so their cache entries, consent cookies and local storage end up in the template
+WARM_UP_PAGES = {
+    "tel_aviv": [
+        ("https://www.ims.tau.ac.il/md/calc/Bagrut.aspx", []),
+        ("https://go.tau.ac.il/he/calculator", []),
+        ("https://go.tau.ac.il/he/exact/ba/computer", [(By.CLASS_NAME, "ui-dialog-titlebar-close")]),
+    ],
+    "technion": [
+        ("https://admissions.technion.ac.il/calculator/", []),
+    ],
+    "hebrew_university": [
+        ("https://bagrut-calculator.huji.ac.il/calculator/#/grade-input", []),
+        ("https://go.huji.ac.il/?locale=he", []),
+    ],
+    "bgu": [
+        ("https://www.bgu.ac.il/welcome/ba/calculator/", [(By.ID, "closeXButton"), (By.ID, "ct-ultimate-gdpr-cookie-accept")]),
+    ],
+}
+
+# Files Chrome uses to lock a profile to one process, they must not be copied into a clone
+PROFILE_LOCK_FILES = ("SingletonLock", "SingletonSocket", "SingletonCookie", "lockfile")
+
+# Cookie fields accepted back by Network.setCookies
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
+
+class ProfileTemplate:
+    """
+    A Chrome profile built once per backend by visiting its sites and dismissing their popups.
+    New sessions start from a clone of it (copy-on-write where the filesystem supports reflinks),
+    so static assets come from a warm disk cache, and the consent cookies saved with it are set on
+    every leased session, so the scrapers can skip the popup waits. The template is rebuilt when it
+    is older than max_age_hours.
+    """
+
+    def __init__(self, client_name, config, service_factory, options):
+        self.client_name = client_name
+        self.service_factory = service_factory
+        self.options = options
+        self.max_age = config["max_age_hours"] * 3600
+        self.path = os.path.join(config["dir"] or DEFAULT_PROFILE_DIR, client_name)
+        self.profile_dir = os.path.join(self.path, "profile")
+        self.cookies_file = os.path.join(self.path, "cookies.json")
+
+        self._cookies = None
+        self._consent = None
+        self._lock = threading.Lock()
+
+        # counters exposed through stats()
+        self._builds = 0
+        self._clones = 0
+        self._prepared = 0
+
+    def is_fresh(self):
+        try:
+            return time.time() - os.path.getmtime(self.cookies_file) < self.max_age and os.path.isdir(self.profile_dir)
+        except OSError:
+            return False
+
+    # This method builds the template if it is missing or stale, and returns whether a template is usable
+    def ensure(self):
+        with self._lock:
+            if self.is_fresh():
+                return True
+            try:
+                self._build()
+                return True
+            except Exception as e:
+                print(f"Building the browser profile template failed: {e}")
+                return False
+
+    def _build(self):
+        print(f"Building the browser profile template for {self.client_name}")
+        building = f"{self.path}.building-{os.getpid()}"
+        shutil.rmtree(building, ignore_errors=True)
+        os.makedirs(building)
+
+        # warm up with a normal page load so every subresource lands in the cache
+        options = copy.deepcopy(self.options)
+        options.page_load_strategy = "normal"
+        options.add_argument(f"--user-data-dir={os.path.join(building, 'profile')}")
+        driver = webdriver.Chrome(service=self.service_factory(), options=options)
+        # the cookies dismissing the popups set, None once a popup couldn't be dismissed
+        consent = []
+        try:
+            for url, popups in WARM_UP_PAGES.get(self.client_name, []):
+                try:
+                    driver.get(url)
+                except Exception as e:
+                    print(f"Warm-up of {url} failed: {e}")
+                    if popups:
+                        consent = None
+                    continue
+                if not popups:
+                    continue
+                before = self._cookie_names(driver)
+                for locator in popups:
+                    try:
+                        button = WebDriverWait(driver, 10).until(EC.element_to_be_clickable(locator))
+                        driver.execute_script("arguments[0].click();", button)
+                    except Exception:
+                        print(f"Warm-up of {url} couldn't dismiss {locator[1]}")
+                        consent = None
+                added = self._cookie_names(driver) - before
+                if not added:
+                    print(f"Dismissing the popups of {url} set no cookie, its sessions keep the popup waits")
+                    consent = None
+                if consent is not None:
+                    consent.extend(sorted(added))
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        finally:
+            quit_driver(driver)
+
+        with open(os.path.join(building, "cookies.json"), "w", encoding="utf-8") as f:
+            json.dump({"cookies": cookies, "consent": consent}, f)
+
+        # swap the new template in, the old one may still be read by a running clone so it goes afterwards
+        old = f"{self.path}.old-{os.getpid()}"
+        if os.path.isdir(self.path):
+            os.rename(self.path, old)
+        os.rename(building, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+        self._cookies = None
+        self._consent = None
+        self._builds += 1
+
+    def _cookie_names(self, driver):
+        return {cookie["name"] for cookie in driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]}
+
+    # This method copies the template into a new user data dir and returns it, or None without a template
+    def clone(self):
+        if not self.is_fresh():
+            return None
+        destination = tempfile.mkdtemp(prefix="gotin-chrome-")
+        try:
+            if sys.platform.startswith("linux") and shutil.which("cp"):
+                # --reflink=auto shares the blocks until Chrome writes to them, and copies where unsupported
+                subprocess.run(["cp", "-a", "--reflink=auto", f"{self.profile_dir}/.", destination], check=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            else:
+                shutil.copytree(self.profile_dir, destination, dirs_exist_ok=True,
+                                ignore=shutil.ignore_patterns(*PROFILE_LOCK_FILES))
+            for name in PROFILE_LOCK_FILES:
+                lock = os.path.join(destination, name)
+                if os.path.lexists(lock):
+                    os.remove(lock)
+        except Exception as e:
+            print(f"Cloning the browser profile template failed: {e}")
+            shutil.rmtree(destination, ignore_errors=True)
+            return None
+        with self._lock:
+            self._clones += 1
+        return destination
+
+    def cookies(self):
+        if self._cookies is None:
+            try:
+                with open(self.cookies_file, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                return []
+            # templates built before the consent cookies were recorded are a plain list, they prepare nothing
+            if isinstance(saved, list):
+                saved = {"cookies": saved, "consent": None}
+            self._consent = saved.get("consent")
+            cookies = []
+            for cookie in saved["cookies"]:
+                cookie_param = {key: cookie[key] for key in COOKIE_FIELDS if key in cookie}
+                # session cookies are saved with expires -1, Network.setCookies wants no expiry for them
+                if cookie.get("session") or cookie_param.get("expires", 0) < 0:
+                    cookie_param.pop("expires", None)
+                cookies.append(cookie_param)
+            self._cookies = cookies
+        return self._cookies
+
+    # This method sets the template's cookies on a leased session. The session is only marked prepared,
+    # which tells the scrapers they don't need to wait for the popups, when the cookies include every
+    # consent cookie the popups were dismissed with while the template was built, and none has expired
+    def prepare(self, driver):
+        driver.gotin_prepared = False
+        cookies = self.cookies()
+        if not cookies:
+            return False
+        try:
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        except Exception as e:
+            print(f"Setting the template cookies failed: {e}")
+            return False
+        if not self.has_consent(cookies):
+            return False
+        driver.gotin_prepared = True
+        with self._lock:
+            self._prepared += 1
+        return True
+
+    # This method tells whether the cookies carry every consent cookie of the template, unexpired
+    def has_consent(self, cookies):
+        if not self._consent:
+            return False
+        now = time.time()
+        present = {cookie["name"] for cookie in cookies if cookie.get("expires", now + 1) > now}
+        return all(name in present for name in self._consent)
+
+    def stats(self):
+        try:
+            built_at = os.path.getmtime(self.cookies_file)
+        except OSError:
+            built_at = None
+        with self._lock:
+            return {
+                "path": self.path,
+                "fresh": self.is_fresh(),
+                "built_at": built_at,
+                "builds": self._builds,
+                "clones": self._clones,
+                "prepared_sessions": self._prepared,
+                "cookies": len(self._cookies or []),
+                "consent_cookies": self._consent,
+            }
+
+
+# This function tells a scraper whether its leased session already carries the template's consent cookies
+def is_prepared(driver):
+    return getattr(driver, "gotin_prepared", False)
@@ -0,0 +1,131 @@
+import json
+import threading
+
+BLOCKING_DEFAULTS = {
+    "enabled": True,
+    "page_load_strategy": "eager",
+    "report": True,
+    # Network.setBlockedURLs patterns, "*" matches any run of characters
+    "block": [
+        "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.ico*",
+        "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+        "*.mp4*", "*.webm*", "*.mp3*",
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googleadservices.com*",
+        "*facebook.net*", "*connect.facebook.*", "*hotjar.com*", "*clarity.ms*", "*linkedin.com/px*",
+        "*youtube.com*", "*ytimg.com*", "*vimeo.com*",
+        "*userway.org*", "*nagish*", "*equalweb*", "*glassix*", "*tawk.to*", "*zopim*", "*livechat*",
+    ],
+    # extra patterns per backend, keyed like the ports section
+    "sites": {
+        "tel_aviv": [],
+        "technion": [],
+        "hebrew_university": [],
+        "bgu": [],
+    },
+    # blocked requests never download, so what they would have cost is estimated per resource type
+    "estimated_bytes": {
+        "Image": 40000,
+        "Font": 50000,
+        "Media": 500000,
+        "Script": 60000,
+        "Stylesheet": 20000,
+        "XHR": 5000,
+        "Fetch": 5000,
+        "Other": 10000,
+    },
+}
+
+
+class ResourceBlocker:
+    """
+    Stops the scraper sessions of one backend from downloading what the scrapers never look at
+    (images, fonts, video, analytics, chat and accessibility widgets) through the CDP
+    Network.setBlockedURLs command, and sets the page load strategy so driver.get returns once the
+    DOM is ready instead of waiting for every subresource. When reporting is enabled, every
+    leased step prints the requests it loaded and blocked, read from chromedriver's performance log.
+    """
+
+    def __init__(self, client_name, config):
+        self.client_name = client_name
+        self.enabled = config["enabled"]
+        self.page_load_strategy = config["page_load_strategy"]
+        self.report_steps = config["report"]
+        self.patterns = list(config["block"]) + list(config["sites"].get(client_name, []))
+        self.estimated_bytes = config["estimated_bytes"]
+
+        # driver -> name of the step it is leased for
+        self._steps = {}
+        self._lock = threading.Lock()
+
+        # totals exposed through stats()
+        self._totals = {"steps": 0, "requests_loaded": 0, "bytes_loaded": 0, "requests_blocked": 0,
+                        "estimated_bytes_saved": 0}
+
+    # This method sets the page load strategy and performance logging on the options sessions are started with
+    def prepare_options(self, options):
+        if self.page_load_strategy:
+            options.page_load_strategy = self.page_load_strategy
+        if self.enabled and self.report_steps:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        return options
+
+    # This method turns blocking on for a freshly leased driver (tabs and resets lose it) and starts its step
+    def attach(self, driver, step=None):
+        if not self.enabled:
+            return
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.patterns})
+            if self.report_steps:
+                # drop whatever the previous lease left in the log
+                driver.get_log("performance")
+        except Exception as e:
+            print(f"Resource blocking could not be enabled: {e}")
+            return
+        with self._lock:
+            self._steps[driver] = step or "step"
+
+    # This method ends the step of a driver that is being handed back and reports what blocking saved
+    def detach(self, driver):
+        with self._lock:
+            step = self._steps.pop(driver, None)
+        if step is None or not self.report_steps:
+            return None
+        try:
+            entries = driver.get_log("performance")
+        except Exception:
+            return None
+
+        report = self._summarize(entries)
+        with self._lock:
+            self._totals["steps"] += 1
+            for key, value in report.items():
+                self._totals[key] += value
+        print(f"[{self.client_name}] {step}: loaded {report['requests_loaded']} requests "
+              f"({report['bytes_loaded'] / 1024:.0f} KB), blocked {report['requests_blocked']} requests "
+              f"(~{report['estimated_bytes_saved'] / 1024:.0f} KB saved)")
+        return report
+
+    def _summarize(self, entries):
+        report = {"requests_loaded": 0, "bytes_loaded": 0, "requests_blocked": 0, "estimated_bytes_saved": 0}
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError, TypeError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.loadingFinished":
+                report["requests_loaded"] += 1
+                report["bytes_loaded"] += int(params.get("encodedDataLength", 0))
+            elif method == "Network.loadingFailed" and params.get("blockedReason"):
+                report["requests_blocked"] += 1
+                resource_type = params.get("type", "Other")
+                report["estimated_bytes_saved"] += self.estimated_bytes.get(
+                    resource_type, self.estimated_bytes.get("Other", 0))
+        return report
+
+    def stats(self):
+        with self._lock:
+            return dict(self._totals, enabled=self.enabled, page_load_strategy=self.page_load_strategy,
+                        patterns=len(self.patterns))
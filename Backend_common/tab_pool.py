@@ -0,0 +1,304 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from chrome_process import ChromeProcess, DEFAULT_CHROME_ARGS, find_chrome_binary
+from driver_pool import DriverPoolTimeout, is_driver_healthy, quit_driver
+from calculator_page import loaded_page, forget_page
+from contextlib import contextmanager
+import threading
+
+
+class Tab:
+    def __init__(self, driver, chrome, context_id, target_id):
+        self.driver = driver
+        self.chrome = chrome
+        self.context_id = context_id
+        self.target_id = target_id
+        self.uses = 0
+
+
+class TabPool:
+    """
+    Drop-in replacement for DriverPool that serves every request of a backend from one long-lived
+    Chrome. Each lease gets its own tab, opened in its own browser context so tabs don't share
+    cookies or ASP.NET sessions, and driven by a chromedriver session attached to that tab.
+    Returning a lease throws the context away and opens a fresh tab for the next request,
+    which costs a few milliseconds instead of a browser start.
+    """
+
+    def __init__(self, service_factory, options, max_tabs=6, acquire_timeout=120, max_uses=20, warm_tabs=2,
+                 chrome_binary=None, blocker=None, profile=None):
+        self.service_factory = service_factory
+        self.max_tabs = max_tabs
+        self.acquire_timeout = acquire_timeout
+        self.max_uses = max_uses
+        self.warm_tabs = min(warm_tabs, max_tabs)
+        self.chrome_binary = chrome_binary
+        self.blocker = blocker
+        self.profile = profile
+
+        # the shared browser is always headless, the backend's other flags (e.g. media flags) are kept
+        self.args = DEFAULT_CHROME_ARGS + [a for a in options.arguments if not a.startswith("--headless")]
+
+        self._chrome = None
+        self._browser = None
+        self._browser_lock = threading.Lock()
+
+        # idle tabs ready to be leased, leased tabs by driver, and a semaphore bounding the open tabs
+        self._idle = []
+        self._tabs = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_tabs)
+        self._closed = False
+
+        # counters exposed through stats()
+        self._opened = 0
+        self._closed_tabs = 0
+        self._recycled = 0
+        self._browser_starts = 0
+        self._leases = 0
+        self._in_use = 0
+
+    # This method starts the browser and its first tabs in the background, like DriverPool.start
+    def start(self):
+        threading.Thread(target=self._warm_up, name="tab-pool-warmup", daemon=True).start()
+
+    def _warm_up(self):
+        if self.profile is not None:
+            self.profile.ensure()
+        for _ in range(self.warm_tabs):
+            if not self._slots.acquire(blocking=False):
+                break
+            try:
+                tab = self._create_tab()
+                with self._lock:
+                    self._idle.append(tab)
+            except Exception as e:
+                print(f"Tab pool warm-up failed: {e}")
+                break
+            finally:
+                self._slots.release()
+
+    # This method returns the shared browser, (re)starting it if it is not running
+    def _ensure_browser(self):
+        with self._browser_lock:
+            if self._chrome is not None and self._chrome.is_alive():
+                return self._chrome
+            if self._chrome is not None:
+                print("Shared Chrome is gone, starting a new one")
+                self._stop_browser()
+            # the shared browser starts from the profile template, so its disk cache is warm
+            user_data_dir = self.profile.clone() if self.profile is not None else None
+            chrome = ChromeProcess(find_chrome_binary(self.chrome_binary), self.args).start(user_data_dir=user_data_dir)
+            self._browser = chrome.connect_browser()
+            self._chrome = chrome
+            self._browser_starts += 1
+
+        # tabs of the previous browser can't be used anymore
+        with self._lock:
+            stale = [tab for tab in self._idle if tab.chrome is not chrome]
+            self._idle = [tab for tab in self._idle if tab.chrome is chrome]
+        for tab in stale:
+            self._close_tab(tab)
+        return chrome
+
+    def _stop_browser(self):
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._chrome is not None:
+            self._chrome.terminate()
+            self._chrome = None
+
+    def _open_target(self):
+        context_id = self._browser.send("Target.createBrowserContext")["browserContextId"]
+        target_id = self._browser.send("Target.createTarget", {
+            "url": "about:blank",
+            "browserContextId": context_id,
+        })["targetId"]
+        return context_id, target_id
+
+    # chromedriver names windows after their DevTools target, older versions add a prefix
+    def _switch_to_target(self, driver, target_id):
+        for handle in driver.window_handles:
+            if handle == target_id or handle.endswith(target_id):
+                driver.switch_to.window(handle)
+                return
+        raise RuntimeError(f"Tab {target_id} is not visible to chromedriver")
+
+    def _create_tab(self):
+        chrome = self._ensure_browser()
+        context_id, target_id = self._open_target()
+        options = Options()
+        options.debugger_address = chrome.debugger_address
+        if self.blocker is not None:
+            self.blocker.prepare_options(options)
+        try:
+            driver = webdriver.Chrome(service=self.service_factory(), options=options)
+        except Exception:
+            self._dispose_context(chrome, context_id)
+            raise
+        tab = Tab(driver, chrome, context_id, target_id)
+        try:
+            self._switch_to_target(driver, target_id)
+        except Exception:
+            self._close_tab(tab)
+            raise
+        with self._lock:
+            self._opened += 1
+        return tab
+
+    # This method replaces the tab of a returned driver with a blank one in a fresh browser context
+    def _recycle_tab(self, tab):
+        try:
+            self._dispose_context(tab.chrome, tab.context_id)
+            tab.context_id, tab.target_id = self._open_target()
+            self._switch_to_target(tab.driver, tab.target_id)
+            return True
+        except Exception as e:
+            print(f"Tab reset failed, closing tab: {e}")
+            return False
+
+    # This method resets a tab that keeps a calculator page loaded, the page resets its own form. Every tab
+    # of the shared Chrome is a window of every attached chromedriver, so only the targets of the tab's own
+    # browser context are touched: the popups the site opened there are closed and the tab itself is kept
+    def _reset_tab(self, tab):
+        if tab.chrome is not self._chrome or self._browser is None:
+            return False
+        try:
+            for target in self._browser.send("Target.getTargets")["targetInfos"]:
+                if target.get("browserContextId") == tab.context_id and target["targetId"] != tab.target_id:
+                    self._browser.send("Target.closeTarget", {"targetId": target["targetId"]})
+            self._switch_to_target(tab.driver, tab.target_id)
+            tab.driver.switch_to.default_content()
+            return True
+        except Exception as e:
+            print(f"Tab reset failed, closing tab: {e}")
+            return False
+
+    def _dispose_context(self, chrome, context_id):
+        # disposing a context closes all of its tabs, including popups opened by the site
+        if chrome is not self._chrome or self._browser is None:
+            return
+        try:
+            self._browser.send("Target.disposeBrowserContext", {"browserContextId": context_id})
+        except Exception:
+            pass
+
+    def _close_tab(self, tab):
+        quit_driver(tab.driver)
+        self._dispose_context(tab.chrome, tab.context_id)
+        with self._lock:
+            self._closed_tabs += 1
+
+    # This method takes an idle tab, preferring one that keeps the given calculator page loaded (lock held)
+    def _take_idle(self, page):
+        if page is not None:
+            for index in range(len(self._idle) - 1, -1, -1):
+                if loaded_page(self._idle[index].driver) == page:
+                    return self._idle.pop(index)
+        return self._idle.pop() if self._idle else None
+
+    def acquire(self, timeout=None, step=None, page=None):
+        if self._closed:
+            raise DriverPoolTimeout("Tab pool is shut down")
+
+        timeout = self.acquire_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise DriverPoolTimeout(f"No tab became available within {timeout} seconds")
+
+        try:
+            chrome = self._ensure_browser()
+            with self._lock:
+                tab = self._take_idle(page)
+                self._leases += 1
+                self._in_use += 1
+            if tab is not None and (tab.chrome is not chrome or not is_driver_healthy(tab.driver)):
+                self._close_tab(tab)
+                tab = None
+            if tab is None:
+                tab = self._create_tab()
+            # a tab reused for another page starts from a fresh context
+            elif loaded_page(tab.driver) not in (None, page):
+                forget_page(tab.driver)
+                if not self._recycle_tab(tab):
+                    self._close_tab(tab)
+                    tab = self._create_tab()
+            tab.uses += 1
+            with self._lock:
+                self._tabs[tab.driver] = tab
+            if self.blocker is not None:
+                self.blocker.attach(tab.driver, step)
+            # tabs live in fresh browser contexts, which start without the profile's cookies
+            if self.profile is not None:
+                self.profile.prepare(tab.driver)
+            return tab.driver
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+            raise
+
+    # This method hands a tab back: it is recycled into a fresh blank tab, or closed if the request
+    # failed, the driver is unhealthy or it reached max_uses
+    def release(self, driver, discard=False):
+        if self.blocker is not None:
+            self.blocker.detach(driver)
+        with self._lock:
+            tab = self._tabs.pop(driver)
+            self._in_use -= 1
+            worn_out = tab.uses >= self.max_uses
+            if worn_out and not discard:
+                self._recycled += 1
+        try:
+            # a tab keeping a calculator page loaded keeps its context, the others get a fresh one
+            if loaded_page(driver):
+                reset = self._reset_tab
+            else:
+                reset = self._recycle_tab
+            if not (discard or worn_out or self._closed) and is_driver_healthy(driver) and reset(tab):
+                with self._lock:
+                    self._idle.append(tab)
+                return
+            self._close_tab(tab)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def lease(self, timeout=None, step=None, page=None):
+        driver = self.acquire(timeout, step, page)
+        try:
+            yield driver
+        except BaseException:
+            self.release(driver, discard=True)
+            raise
+        else:
+            self.release(driver)
+
+    # This method closes the idle tabs and the shared browser, which also ends any leased tab
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for tab in idle:
+            quit_driver(tab.driver)
+        with self._browser_lock:
+            self._stop_browser()
+
+    def stats(self):
+        chrome = self._chrome
+        with self._lock:
+            return {
+                "mode": "tabs",
+                "max_tabs": self.max_tabs,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "tabs_opened": self._opened,
+                "tabs_closed": self._closed_tabs,
+                "recycled": self._recycled,
+                "max_uses": self.max_uses,
+                "leases": self._leases,
+                "browser_starts": self._browser_starts,
+                "browser_pid": chrome.pid if chrome else None,
+                "blocking": self.blocker.stats() if self.blocker else None,
+                "profile": self.profile.stats() if self.profile else None,
+            }
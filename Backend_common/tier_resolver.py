@@ -0,0 +1,151 @@
+import inspect
+import threading
+import time
+from gotin_config import get_section
+
+TIER_DEFAULTS = {
+    # seconds a threshold read from a site is answered from memory, they change once a year
+    "threshold_ttl": 86400,
+}
+
+# The tiers a step can be answered by, cheapest first
+TIERS = ("engine", "threshold", "http", "browser")
+
+_totals = {"requests": {}, "steps": {}}
+_totals_lock = threading.Lock()
+
+
+class TierResolver:
+    """
+    Answers the steps of one request from the cheapest tier that can: a local formula engine, a cached
+    threshold, a direct HTTP client, and the Selenium flow last. A tier is skipped when it is missing
+    (None instead of a function), when its function returns None because it can't answer or isn't
+    validated for this request, or when it raises; the last tier's error is the request's. A request is
+    reported by the tier of its most expensive step.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        # step -> the tier that answered it
+        self.steps = {}
+
+    # This method returns the answer of the first tier that gives one. tiers is a list of (tier, function)
+    def resolve(self, step, tiers):
+        tiers = [(tier, answer) for tier, answer in tiers if answer is not None]
+        for index, (tier, answer) in enumerate(tiers):
+            try:
+                value = answer()
+            except Exception as e:
+                if index == len(tiers) - 1:
+                    raise
+                print(f"⚠️ {self.backend} {step}: the {tier} tier failed, trying the next one: {e}")
+                continue
+            if value is not None or index == len(tiers) - 1:
+                return self._answered(step, tier, value)
+        raise ValueError(f"{self.backend} {step}: no tier to answer it")
+
+    # This method is the async version of resolve, a function may also return an awaitable (a coroutine,
+    # or the future of a blocking client run in the loop's executor)
+    async def resolve_async(self, step, tiers):
+        tiers = [(tier, answer) for tier, answer in tiers if answer is not None]
+        for index, (tier, answer) in enumerate(tiers):
+            try:
+                value = answer()
+                if inspect.isawaitable(value):
+                    value = await value
+            except Exception as e:
+                if index == len(tiers) - 1:
+                    raise
+                print(f"⚠️ {self.backend} {step}: the {tier} tier failed, trying the next one: {e}")
+                continue
+            if value is not None or index == len(tiers) - 1:
+                return self._answered(step, tier, value)
+        raise ValueError(f"{self.backend} {step}: no tier to answer it")
+
+    def _answered(self, step, tier, value):
+        self.steps[step] = tier
+        with _totals_lock:
+            counts = _totals["steps"].setdefault(f"{self.backend} {step}", {})
+            counts[tier] = counts.get(tier, 0) + 1
+        return value
+
+    # This method makes the engine tier of a step: the engine's answer, unless the engine couldn't compute
+    # one or its validator sends this request to the site
+    def engine_tier(self, engine_value, validator):
+        if engine_value is None:
+            return None
+        return lambda: None if validator.should_validate() else engine_value
+
+    # This method compares the engine's answer with the one a costlier tier gave, key picks what is compared
+    def validate(self, step, validator, engine_value, value, key=None):
+        if engine_value is None or self.steps.get(step) in (None, "engine"):
+            return
+        key = key or (lambda answer: answer)
+        validator.record(key(engine_value), key(value))
+
+    # the tier of the request's most expensive step, None when no step was resolved
+    @property
+    def tier(self):
+        used = [TIERS.index(tier) for tier in self.steps.values()]
+        return TIERS[max(used)] if used else None
+
+    # This method adds the tiers that answered to a response, and counts the request under its tier
+    def report(self, response):
+        if isinstance(response, dict):
+            response["tier"] = self.tier
+            response["tiers"] = dict(self.steps)
+        with _totals_lock:
+            key = self.tier or "none"
+            _totals["requests"][key] = _totals["requests"].get(key, 0) + 1
+        if self.steps:
+            print(f"🪜 {self.backend} answered by {self.tier}: {self.steps}")
+        return response
+
+
+def tier_stats():
+    with _totals_lock:
+        stats = {"requests": dict(_totals["requests"]),
+                 "steps": {step: dict(counts) for step, counts in _totals["steps"].items()}}
+    with _caches_lock:
+        stats["threshold_caches"] = {name: cache.stats() for name, cache in _caches.items()}
+    return stats
+
+
+class ThresholdCache:
+    """
+    The cached threshold tier: thresholds read from a site by a costlier tier, answered from memory until
+    they are ttl seconds old. Shared by every request of the process.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._values = {}
+        self._lock = threading.Lock()
+
+    # This method returns the cached value of a key, None when it is missing or too old
+    def get(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._values[key] = (value, time.monotonic())
+
+    def stats(self):
+        with self._lock:
+            return {"cached": len(self._values)}
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+# This function returns the threshold cache of a name, shared by every request of the process
+def threshold_cache(name):
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = ThresholdCache(get_section("tier_resolver", TIER_DEFAULTS)["threshold_ttl"])
+        return _caches[name]
@@ -0,0 +1,109 @@
+import json
+import re
+import threading
+
+_record_lock = threading.Lock()
+
+# record_calls turns the recording on, record_file overrides the backend's default file. Off by default,
+# the recorded calls are redacted but still come from applicant requests
+RECORDING_DEFAULTS = {"record_calls": False, "record_file": None}
+
+# Wraps fetch and XMLHttpRequest of a page, and keeps every call whose response is JSON
+# in window.__gotinCalls with its method, url, request body and a prefix of its response
+CALL_RECORDER_SCRIPT = """
+    if (window.__gotinCalls) { return; }
+    window.__gotinCalls = [];
+    function keep(method, url, body, status, type, text) {
+        if (!type || type.indexOf('json') === -1) { return; }
+        window.__gotinCalls.push({method: method, url: String(url), body: body ? String(body) : null,
+                                  status: status, response: String(text).slice(0, 2000)});
+    }
+    var fetch = window.fetch;
+    if (fetch) {
+        window.fetch = function(input, init) {
+            var method = (init && init.method) || (input && input.method) || 'GET';
+            var url = typeof input === 'string' ? input : input.url;
+            var body = init && init.body;
+            return fetch.apply(this, arguments).then(function(response) {
+                response.clone().text().then(function(text) {
+                    keep(method, url, body, response.status, response.headers.get('content-type'), text);
+                });
+                return response;
+            });
+        };
+    }
+    var open = XMLHttpRequest.prototype.open;
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.open = function(method, url) {
+        this.__gotin = {method: method, url: url};
+        return open.apply(this, arguments);
+    };
+    XMLHttpRequest.prototype.send = function(body) {
+        var request = this;
+        request.addEventListener('load', function() {
+            if (!request.__gotin) { return; }
+            var text = request.responseType === '' || request.responseType === 'text' ? request.responseText : '';
+            keep(request.__gotin.method, request.__gotin.url, body, request.status,
+                 request.getResponseHeader('content-type'), text);
+        });
+        return send.apply(this, arguments);
+    };
+"""
+
+# Returns the calls recorded in the current document, or frame, of a Selenium driver
+READ_CALLS_SCRIPT = "return window.__gotinCalls || [];"
+
+
+# Numbers that stand on their own in a url, a body or a response, not parts of a name like "psy1"
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+
+
+# This function replaces the numbers of a recorded text with "<number>": the applicant's grades, units,
+# psychometric scores and average never reach the disk, while the keys and the nesting the payloads are
+# read off from are kept. Responses are cut at 2000 characters, so the text isn't parsed as JSON
+def redact(text):
+    if text is None:
+        return None
+    return _NUMBER.sub("<number>", str(text))
+
+
+# This function merges the JSON calls a Selenium run recorded into record_file, keyed by method and path,
+# so the endpoints an app talks to and their bodies can be read off when setting up its API client. The
+# calls are redacted, and only the last call of each endpoint is kept
+def save_recorded_calls(record_file, calls, label):
+    if not calls:
+        return
+    calls = [dict(call, url=redact(call["url"]), body=redact(call.get("body")), response=redact(call.get("response")))
+             for call in calls]
+    keys = [f"{call['method'].upper()} {call['url'].split('?')[0]}" for call in calls]
+    with _record_lock:
+        try:
+            with open(record_file, "r", encoding="utf-8") as f:
+                recorded = json.load(f)
+        except Exception:
+            recorded = {}
+        recorded.update(zip(keys, calls))
+        try:
+            with open(record_file, "w", encoding="utf-8") as f:
+                json.dump(recorded, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"⚠️ Could not save the recorded {label} calls: {e}")
+            return
+    print(f"🛰️ {label} made {len(calls)} JSON calls: {', '.join(sorted(set(keys)))}")
+
+
+class CallRecorder:
+    """
+    Records the JSON calls a calculator app makes while a Selenium run drives it, so its undocumented
+    endpoints and payloads can be read off later. The scraper injects CALL_RECORDER_SCRIPT into the app's
+    document when recording is on, and hands what READ_CALLS_SCRIPT returns to save
+    """
+
+    def __init__(self, config, default_file, label):
+        self.recording = bool(config["record_calls"])
+        self.record_file = config["record_file"] or default_file
+        self.label = label
+
+    def save(self, calls):
+        if self.recording:
+            save_recorded_calls(self.record_file, calls, self.label)
@@ -1,14 +1,22 @@
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from technion_scraper import TechnionUniversity
 import sys
+import os
+import atexit
 import traceback
 import logging
 import json
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend_common"))
+from driver_sources import create_driver_source, create_chrome_reaper, create_async_engine
+from driver_resolver import get_chromedriver_path, create_chrome_service
+from page_waits import wait_report, wait_stats
+from http_session import http_stats
+from engine_validation import engine_stats
+from tier_resolver import tier_stats
+
 app = Flask(__name__)
 CORS(app)
 
@@ -22,11 +30,37 @@ chrome_options.add_experimental_option("prefs", {
     "media.autoplay.allow-extension-media": False,
 })
 
+# resolve chromedriver once at boot, every driver of this process reuses the resolved path
+get_chromedriver_path()
+
+# warm drivers shared by all the requests of this backend (a local pool, or the machine-wide broker)
+driver_pool = create_driver_source("technion", chrome_options)
+atexit.register(driver_pool.shutdown)
+
+# background reaper of chrome/chromedriver processes leaked by crashed sessions
+chrome_reaper = create_chrome_reaper()
+
+# asyncio engine driving the requests' pages from one event loop, when enabled in config.json
+async_engine = create_async_engine("technion")
+
+# Route exposing the driver pool and reaper counters, including the memory reclaimed from leaked processes
+@app.route('/driver-stats', methods=['GET'])
+def driver_stats_handler():
+    return jsonify({
+        "pool": driver_pool.stats(),
+        "reaper": chrome_reaper.stats() if chrome_reaper else None,
+        "async_engine": async_engine.stats() if async_engine else None,
+        "waits": wait_stats(),
+        "http": http_stats(),
+        "engines": engine_stats(),
+        "tiers": tier_stats()
+    })
+
 # Route for Technion University analysis
 @app.route('/Technion', methods=['POST'])
 def technion_handler():
     ### initialize the university classes ###
-    technion_university = TechnionUniversity(chrome_options)
+    technion_university = TechnionUniversity(create_chrome_service(), chrome_options, driver_pool)
     try:
         request_data = request.get_json()
         logging.info("Received data: %s", request_data)
@@ -35,7 +69,11 @@ def technion_handler():
         if 'requested_degree' not in request_data and 'subject' in request_data:
             request_data['requested_degree'] = request_data['subject']
             
-        result = technion_university.run(request_data)
+        with wait_report("technion"):
+            if async_engine:
+                result = async_engine.run(lambda browser: technion_university.run_async(request_data, browser))
+            else:
+                result = technion_university.run(request_data)
         return jsonify(result)
 
     except Exception as e:
@@ -45,6 +83,12 @@ def technion_handler():
 
 ### main function ###
 if __name__ == '__main__':
+    driver_pool.start()
+    if chrome_reaper:
+        chrome_reaper.start()
+    if async_engine:
+        async_engine.start()
+        atexit.register(async_engine.shutdown)
     try:
         with open('../config.json', 'r') as f:
             config = json.load(f)
@@ -0,0 +1,78 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend_common"))
+from gotin_config import get_section
+
+SEKEM_DEFAULTS = {
+    # sekem = bagrut_weight * bagrut average + psychometric_weight * psychometric score + offset. These are the
+    # values the Technion's formula is usually quoted with, they weren't transcribed from the calculator page
+    # (admissions.technion.ac.il/sechem-for-admission/sekem/), which couldn't be reached when they were set.
+    # Neither were the bonus tables below, the engine only answers once technion_sekem's validator matched
+    # the calculator trust_after times in a row
+    "bagrut_weight": 0.5,
+    "psychometric_weight": 0.075,
+    "offset": -19.5,
+    # bonus points added to a grade by units level, for the subjects of bonus_subjects
+    "bonus": {"5": 25, "4": 12.5},
+    "math_bonus": {"5": 35, "4": 15},
+    "min_bonus_grade": 60,
+    "decimals": 3,
+}
+
+
+class SekemEngine:
+    """
+    The Technion's sekem formula, computed in-process: the bagrut average weighted by units with the bonus
+    points of the 4 and 5 units levels, combined with the psychometric score. It takes the subjects after
+    map_highschool_subjects, and answers like get_tech_match_score, (sum, None) or (None, message) when the
+    calculator would reject the form. The weights and bonus tables live in the technion_sekem section of
+    config.json. They are unverified (see SEKEM_DEFAULTS), the scraper checks them against the calculator.
+    """
+
+    # Subjects the calculator won't compute a sum without, and the least units they are accepted at
+    REQUIRED_SUBJECTS = ("מתמטיקה", "אנגלית")
+    MIN_REQUIRED_UNITS = 4
+
+    # Subjects the 4 and 5 units bonus applies to, every other subject counts at its plain grade. The list
+    # follows the calculator's mandatory rows and main electives, it is unverified like the bonus tables
+    BONUS_SUBJECTS = (
+        "מתמטיקה", "אנגלית", "פיזיקה", "כימיה", "ביולוגיה", "מדעי המחשב",
+        "היסטוריה / תולדות עם ישראל", "ספרות עברית", 'תנ"ך', "עברית (הבעה)", "אזרחות"
+    )
+
+    def __init__(self, config=None):
+        self.config = config if config is not None else get_section("technion_sekem", SEKEM_DEFAULTS)
+
+    # This method returns the bonus points of a grade, 0 for a failing grade or a subject without a bonus
+    def bonus(self, subject, units, grade):
+        if subject not in self.BONUS_SUBJECTS or grade < self.config["min_bonus_grade"]:
+            return 0
+        table = self.config["math_bonus"] if subject == "מתמטיקה" else self.config["bonus"]
+        return table.get(str(units), 0)
+
+    # This method returns the bagrut average, every grade with its bonus weighted by the subject's units
+    def bagrut_average(self, hs_dict):
+        total = 0
+        total_units = 0
+        for subject, (grade, units) in hs_dict.items():
+            grade = float(grade)
+            units = int(units)
+            total += (grade + self.bonus(subject, units, grade)) * units
+            total_units += units
+        if total_units == 0:
+            raise ValueError("no bagrut subjects")
+        return total / total_units
+
+    # This method returns (sum, None), or (None, message) when the mandatory subjects rule the applicant out
+    def compute(self, hs_dict, psycho_score):
+        for subject in self.REQUIRED_SUBJECTS:
+            if subject not in hs_dict:
+                return None, f"חסר ציון ב{subject}, מקצוע חובה בטכניון"
+            if int(hs_dict[subject][1]) < self.MIN_REQUIRED_UNITS:
+                return None, f"דחייה בגלל מספר יחידות לא מספק ב{subject}. בטכניון נדרש מינימום 4 יחידות."
+
+        calculated_sum = (self.config["bagrut_weight"] * self.bagrut_average(hs_dict)
+                          + self.config["psychometric_weight"] * float(psycho_score)
+                          + self.config["offset"])
+        return round(calculated_sum, self.config["decimals"]), None
@@ -1,19 +1,29 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import Select
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import NoSuchElementException, TimeoutException, UnexpectedAlertPresentException
+from selenium.common.exceptions import TimeoutException, UnexpectedAlertPresentException
+from contextlib import contextmanager
 
 import time
+import os
 import sys
 import re
 import json
+import asyncio
+import urllib.parse
 
 sys.stdout.reconfigure(encoding='utf-8')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend_common"))
+from driver_resolver import create_chrome_service
+from calculator_page import CalculatorPage
+from async_cdp import SET_VALUE_SCRIPT
+from page_waits import EventWait, wait_for_dom_quiet
+from http_session import HttpSession, http_enabled
+from html_forms import parse_forms, parse_rows, clean_text
+from engine_validation import engine_validator
+from sekem_engine import SekemEngine
+from tier_resolver import TierResolver
 
 class TechnionUniversity():
 
@@ -107,15 +117,142 @@ class TechnionUniversity():
         "תלמוד": "תלמוד / תושב\"ע"
     }
 
-    def __init__(self, options):
-        self.service = Service(ChromeDriverManager().install())
+    # calculator page kept loaded between requests. The form posts to a results page, so it is posted to a
+    # hidden frame instead; a page where the previous request opened elective rows is reloaded, since the
+    # site has no way to remove them in place
+    calculator_page = CalculatorPage(
+        "https://admissions.technion.ac.il/calculator/",
+        (By.NAME, "sehem_table"),
+        reset_script="""
+            var form = document.forms['sehem_table'];
+            if (!form) { return false; }
+            var rows = form.querySelectorAll('.four-column-table tr[id^="bhira"]');
+            var shown = 0;
+            for (var i = 0; i < rows.length; i++) { if (rows[i].offsetParent !== null) { shown++; } }
+            if (shown > 1) { return false; }
+            form.reset();
+            return true;
+        """,
+        post_to_frame=True
+    )
+
+    # Reads the bagrut form in one round trip: the subject of every mandatory row with the units it offers,
+    # and the elective rows with the subjects their dropdown lists
+    FORM_SNAPSHOT_SCRIPT = """
+        var form = document.getElementById('bagrotForm');
+        var mandatory = [];
+        var lines = form.querySelectorAll('.two-column-table tbody tr');
+        for (var i = 0; i < lines.length; i++) {
+            var th = lines[i].querySelector('th[id]');
+            var tds = lines[i].querySelectorAll('td');
+            var select = tds.length >= 2 ? tds[0].querySelector('select') : null;
+            mandatory.push({
+                subject: th ? th.textContent.trim() : null,
+                units: select ? Array.prototype.map.call(select.options, function(o) { return o.value; }) : null,
+                hasInput: tds.length >= 2 && !!tds[1].querySelector('input')
+            });
+        }
+        var electiveSelect = form.querySelector('[name="mikztootBhira_1"]');
+        return {
+            mandatory: mandatory,
+            electiveRows: form.querySelectorAll('.four-column-table tbody tr').length,
+            electiveSubjects: electiveSelect
+                ? Array.prototype.map.call(electiveSelect.options, function(o) { return o.text.trim(); }) : []
+        };
+    """
+
+    # Fills the whole form from a plan made by plan_form_fill, firing the input and change events the page
+    # listens to, and returns a description of the first field it couldn't find (null when all were filled)
+    BULK_FILL_SCRIPT = SET_VALUE_SCRIPT + """
+        var plan = arguments[0];
+        var form = document.getElementById('bagrotForm');
+        var lines = form.querySelectorAll('.two-column-table tbody tr');
+        for (var i = 0; i < plan.mandatory.length; i++) {
+            var row = plan.mandatory[i];
+            var tds = lines[row[0]].querySelectorAll('td');
+            if (!setValue(tds[0].querySelector('select'), row[1]) || !setValue(tds[1].querySelector('input'), row[2])) {
+                return 'Missing mandatory field in row ' + row[0];
+            }
+        }
+        for (var j = 0; j < plan.electives.length; j++) {
+            var elective = plan.electives[j];
+            var idx = elective[0];
+            var line = document.getElementById('bhira' + idx);
+            var subject = line ? line.querySelector('[name="mikztootBhira_' + idx + '"]') : null;
+            if (!subject) { return 'Missing elective row ' + idx; }
+            var value = null;
+            for (var k = 0; k < subject.options.length; k++) {
+                if (subject.options[k].text.trim() === elective[1]) { value = subject.options[k].value; break; }
+            }
+            setValue(subject, value);
+            if (!setValue(document.getElementById('y' + idx), elective[2]) || !setValue(document.getElementById('G_' + idx), elective[3])) {
+                return 'Missing elective field in row ' + idx;
+            }
+            // the add button shows the next row
+            if (elective[4]) { line.querySelector('button.add_bhira').click(); }
+        }
+        if (!setValue(document.getElementById('psychometry'), plan.psychometry)) {
+            return 'Missing psychometry input';
+        }
+        return null;
+    """
+
+    def __init__(self, service, options, pool=None):
+        self.service = service
         self.options = options
+        self.pool = pool
+        self.sekem_engine = SekemEngine()
+        self.engine_validator = engine_validator("technion_sekem")
+        # the tiers that answered this request's steps, reported in the response
+        self.tiers = TierResolver("technion")
+
+    # This method lends a driver from the backend's pool, or starts a private one when running without a pool
+    @contextmanager
+    def lease_driver(self, step=None, page=None):
+        if self.pool is not None:
+            with self.pool.lease(step=step, page=page) as driver:
+                yield driver
+        else:
+            driver = webdriver.Chrome(service=self.service, options=self.options)
+            try:
+                yield driver
+            finally:
+                driver.quit()
 
     # This method will be executed when the thread starts
     def run(self, data):
-        # Define default values
-        msg = ""
         url = "https://admissions.technion.ac.il/sechem-for-admission/sekem/"
+        rejection = self.check_degree(data, url)
+        if rejection:
+            return self.tiers.report(rejection)
+
+        calculated_sum, error_message = self.compute_match_score(data)
+        return self.tiers.report(self.build_response(calculated_sum, error_message, data, url))
+
+    # This function returns the sum from the cheapest tier that answers: the local sekem engine, the form
+    # posted over HTTP, and the browser last. The engine is skipped while it hasn't matched the calculator
+    # yet and every so often to check it still does, and is compared with whichever tier answered instead
+    def compute_match_score(self, data):
+        engine_result = self.compute_engine_score(data)
+        result = self.tiers.resolve("sekem", [
+            ("engine", self.tiers.engine_tier(engine_result, self.engine_validator)),
+            ("http", (lambda: self.get_tech_match_score_http(dict(data))) if http_enabled() else None),
+            ("browser", lambda: self.get_tech_match_score(data)),
+        ])
+        self.tiers.validate("sekem", self.engine_validator, engine_result, result, key=lambda answer: answer[0])
+        return result
+
+    # This function returns the engine's (sum, error message), or None when it can't compute them
+    def compute_engine_score(self, data):
+        try:
+            hs_dict = self.map_highschool_subjects(data["highschool_scores"])
+            return self.sekem_engine.compute(hs_dict, data["psycho_score"])
+        except Exception as e:
+            print(f"⚠️ sekem engine failed: {e}")
+            return None
+
+    # This function returns the response for a degree that doesn't exist in the Technion, or None if it exists
+    def check_degree(self, data, url):
         # Check if requested_degree exists in inputJson, if not, use degree
         if "requested_degree" not in data and "degree" in data:
             data["requested_degree"] = data["degree"]
@@ -132,9 +269,10 @@ class TechnionUniversity():
         # Check if the degree exists in the valid Technion degrees list
         if technion_degree not in self.valid_technion_degrees:
             return {"isAccepted": None, "url": url, "message": f"תואר {requested_degree} לא קיים בטכניון"}
-        
-        calculated_sum, error_message = self.get_tech_match_score(data)
-        
+        return None
+
+    # This function turns the calculated sum (or the calculator's error message) into the response
+    def build_response(self, calculated_sum, error_message, data, url):
         # If there's an error message, return rejection with the message
         if error_message:
             if "דחייה בגלל מספר יחידות לא מספק" in error_message:
@@ -155,27 +293,110 @@ class TechnionUniversity():
         }
 
     def get_tech_match_score(self, inputJson):
-        driver = webdriver.Chrome(service=self.service, options=self.options)
-        wait = WebDriverWait(driver, 10)
-        driver.get("https://admissions.technion.ac.il/calculator/")
+        # lease a driver for the whole calculator flow, preferring one that keeps the calculator page loaded
+        with self.lease_driver("sekem calculator", self.calculator_page.url) as driver:
+            reused = self.calculator_page.open(driver)
+            try:
+                result = self.fill_tech_calculator(driver, dict(inputJson))
+            except Exception as e:
+                # a reused page that misbehaves is reloaded once before giving up
+                if not reused:
+                    raise
+                print(f"Reused calculator page failed, reloading it: {e}")
+                self.calculator_page.open(driver, reload=True)
+                result = self.fill_tech_calculator(driver, dict(inputJson))
+            self.calculator_page.leave_result(driver)
+            return result
+
+    # This function computes the sum without a browser: it GETs the calculator, reads the sehem_table form
+    # into the same snapshot FORM_SNAPSHOT_SCRIPT takes in the browser, posts the planned fields with the
+    # bagrotYes choice and regex-parses the sum from the "הסכם לדיוני הקבלה" header of the results page
+    def get_tech_match_score_http(self, inputJson):
+        hs_dict = self.map_highschool_subjects(inputJson["highschool_scores"])
+        session = HttpSession()
+        page = session.get(self.calculator_page.url)
+
+        form = next((f for f in parse_forms(page.text) if "sehem_table" in (f["name"], f["id"])), None)
+        if form is None:
+            raise ValueError("the calculator page has no sehem_table form")
+
+        # the mandatory rows: the subject header, the units select and the grade input of every line
+        snapshot = {"mandatory": [], "electiveRows": 0, "electiveSubjects": []}
+        mandatory_inputs = []
+        for cells in parse_rows(page.text, container_class="two-column-table"):
+            names = [name for cell in cells for name in cell["inputs"]]
+            if len(cells) < 3 or cells[0]["inputs"] or not cells[0]["text"]:
+                continue
+            units_name = next((name for name in names if name in form["options"]), None)
+            grade_name = next((name for name in names if name not in form["options"]), None)
+            snapshot["mandatory"].append({
+                "subject": cells[0]["text"],
+                "units": [value for value, _ in form["options"][units_name]] if units_name else None,
+                "hasInput": grade_name is not None
+            })
+            mandatory_inputs.append((units_name, grade_name))
+
+        # the elective rows are all in the page, the add button only shows them
+        while f"mikztootBhira_{snapshot['electiveRows'] + 1}" in form["options"]:
+            snapshot["electiveRows"] += 1
+        elective_options = form["options"].get("mikztootBhira_1", [])
+        snapshot["electiveSubjects"] = [text for _, text in elective_options]
+
+        plan, error_message = self.plan_form_fill(snapshot, hs_dict, inputJson["psycho_score"])
+        if error_message:
+            return None, error_message
+        self.check_parsed_rows(snapshot, plan, hs_dict)
+
+        values = {}
+        for index, units, score in plan["mandatory"]:
+            units_name, grade_name = mandatory_inputs[index]
+            values[units_name] = units
+            values[grade_name] = score
+        for idx, subject_text, units, grade, _ in plan["electives"]:
+            if idx > snapshot["electiveRows"] or f"y{idx}" not in form["ids"] or f"G_{idx}" not in form["ids"]:
+                raise ValueError(f"Missing elective row {idx}")
+            values[f"mikztootBhira_{idx}"] = next(value for value, text in elective_options if text == subject_text)
+            values[form["ids"][f"y{idx}"][0]] = units
+            values[form["ids"][f"G_{idx}"][0]] = grade
+        if "psychometry" not in form["ids"] or "bagrotYes" not in form["ids"]:
+            raise ValueError("the calculator has no psychometry or bagrotYes field")
+        values[form["ids"]["psychometry"][0]] = plan["psychometry"]
+
+        # the form's fields with the planned values, and the bagrotYes radio as the checked one
+        bagrot_name, _, bagrot_value = form["ids"]["bagrotYes"]
+        fields = [(name, values.get(name, value)) for name, value in form["fields"] if name != bagrot_name]
+        posted = {name for name, _ in fields}
+        fields += [(name, value) for name, value in values.items() if name not in posted]
+        fields.append((bagrot_name, bagrot_value))
+        if form["submits"]:
+            fields.append((form["submits"][0]["name"], form["submits"][0]["value"]))
+
+        action = urllib.parse.urljoin(page.url, form["action"] or page.url)
+        if form["method"] == "post":
+            result = session.post(action, data=fields, headers={"Referer": page.url})
+        else:
+            result = session.get(action, params=fields, headers={"Referer": page.url})
+
+        for header in re.findall(r"<h2[^>]*>(.*?)</h2>", result.text, re.S):
+            text = clean_text(re.sub(r"<[^>]+>", " ", header))
+            if "הסכם לדיוני הקבלה" in text:
+                match = re.search(r"([\d.]+)$", text)
+                if match:
+                    return float(match.group(1)), None
+                return None, "לא ניתן לחשב את הסכם שלך"
+        raise ValueError("the results page has no sum header")
+
+    def fill_tech_calculator(self, driver, inputJson):
+        wait = EventWait(driver, 10)
 
         psycho_score = inputJson["psycho_score"]
         
         # Map high school subject names to Technion names
-        hs_dict_original = inputJson["highschool_scores"]
+        hs_dict = self.map_highschool_subjects(inputJson["highschool_scores"])
         
         # Check if requested_degree exists in inputJson, if not, use degree
         if "requested_degree" not in inputJson and "degree" in inputJson:
             inputJson["requested_degree"] = inputJson["degree"]
-            
-        hs_dict = {}
-        
-        for subject, values in hs_dict_original.items():
-            if subject in self.highschool_subject_name_dict:
-                technion_subject = self.highschool_subject_name_dict[subject]
-                hs_dict[technion_subject] = values
-            else:
-                hs_dict[subject] = values
 
         try:
             # Set up to handle unexpected alerts
@@ -183,12 +404,12 @@ class TechnionUniversity():
             
             # Wait for form to load
             form = wait.until(EC.presence_of_element_located((By.NAME, "sehem_table")))
-            tech_calc = WebDriverWait(form, 10).until(
+            tech_calc = EventWait(form, 10).until(
                 EC.presence_of_element_located((By.CLASS_NAME, "technion-calculator"))
             )
 
             # Wait and click the "bagrotYes" button
-            # click_button = WebDriverWait(tech_calc, 10).until(
+            # click_button = EventWait(tech_calc, 10).until(
             #     EC.element_to_be_clickable((By.ID, "bagrotYes"))
             # )
             # driver.execute_script("arguments[0].scrollIntoView(true);", click_button)
@@ -197,226 +418,46 @@ class TechnionUniversity():
             bagrot_radio = driver.find_element(By.ID, "bagrotYes")
             driver.execute_script("arguments[0].click();", bagrot_radio)
             # Wait for the mandatory table to be visible
-            bagrut_form = WebDriverWait(tech_calc, 10).until(
+            bagrut_form = EventWait(tech_calc, 10).until(
                 EC.presence_of_element_located((By.ID, "bagrotForm"))
             )
             
-            tables = WebDriverWait(bagrut_form, 10).until(
-                EC.presence_of_all_elements_located((By.CLASS_NAME, "two-column-table"))
+            # Wait for the mandatory subjects, then read the whole form in one round trip
+            EventWait(bagrut_form, 10).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, ".two-column-table tbody tr th[id]"))
             )
-            lines = []
-            for table in tables:
-                table_name = WebDriverWait(table, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "sub-title"))
-                )
-                tbody = WebDriverWait(table, 10).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "tbody"))
-                )
-                rows = tbody.find_elements(By.TAG_NAME, "tr")
-                lines.extend(rows)
-
-            for line in lines:
-                try:
-                    subject_th = WebDriverWait(line, 20).until(
-                        EC.visibility_of_element_located((By.XPATH, "./th[@id]"))
-                    )
-                    if subject_th.is_displayed():
-                        subject_name = subject_th.text
-                    else:
-                        # Use JavaScript to get the text content if the element is not visible
-                        subject_name = driver.execute_script("return arguments[0].textContent;", subject_th).strip()
-                    if subject_name in hs_dict:
-                        score, units = hs_dict[subject_name]
-                        td_elements = line.find_elements(By.TAG_NAME, "td")
-                        if len(td_elements) >= 2:
-                            dropdown_td = td_elements[0]
-                            input_td = td_elements[1]
-
-                            dropdown_menu = dropdown_td.find_elements(By.TAG_NAME, "select")
-                            if dropdown_menu:
-                                # Wait for the element to be both present AND interactable
-                                dropdown_menu = WebDriverWait(line, 10).until(
-                                    EC.element_to_be_clickable((By.TAG_NAME, "select"))
-                                )
-                                
-                                # Scroll the element into view before interacting
-                                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", dropdown_menu)
-                                time.sleep(0.5)  # Give time for scroll to complete
-                                
-                                select = Select(dropdown_menu)
-
-                                # For all subjects
-                                if ((subject_name == "אנגלית" or subject_name == "מתמטיקה") and int(units) < 4):
-                                    driver.quit()
-                                    subject_hebrew = "אנגלית" if subject_name == "אנגלית" else "מתמטיקה"
-                                    return None, f"דחייה בגלל מספר יחידות לא מספק ב{subject_hebrew}. בטכניון נדרש מינימום 4 יחידות."
-                                select.select_by_value(units)
-                            else:
-                                self.exit(driver, "Missing dropdown")
-                            
-                            score_input = input_td.find_elements(By.TAG_NAME, "input")
-                            if score_input:
-                                score_input[0].clear()
-                                score_input[0].send_keys(score)
-                            else:
-                                self.exit(driver, "Missing input field")
-                            time.sleep(1)
-                            
-                            # Remove the subject from hs_dict after processing it
-                            del hs_dict[subject_name]
-                        else:
-                            self.exit(driver, "Insufficient <td> elements")
-                        
-                except Exception as e:
-                    raise Exception("מקצועות חובה לא הופיעו")
+            snapshot = driver.execute_script(self.FORM_SNAPSHOT_SCRIPT)
+            plan, error_message = self.plan_form_fill(snapshot, hs_dict, psycho_score)
+            if error_message:
+                return None, error_message
 
-            
-            miktzoaBhira_section = bagrut_form.find_element(By.CLASS_NAME, "four-column-table")
-            tbody = miktzoaBhira_section.find_element(By.TAG_NAME, "tbody")
-            miktzoot = tbody.find_elements(By.TAG_NAME, "tr")
-            time.sleep(1)
-            idx = 1
-            for hs_miktzoa, (grade, unit) in hs_dict.items():
-                    time.sleep(1)
-                    # Find the row for the current index
-                    miktzoa_row = miktzoaBhira_section.find_element(By.ID, f"bhira{idx}")
-                    time.sleep(1)
-                    # Find the dropdown for subject selection
-                    subject_dropdown = miktzoa_row.find_element(By.NAME, f"mikztootBhira_{idx}")
-                    select_subject = Select(subject_dropdown)
-                    try:
-                            select_subject.select_by_visible_text(hs_miktzoa)
-                    except NoSuchElementException:
-                            try:
-                                    select_subject.select_by_visible_text("מקצוע אחר שאינו ברשימה")
-                            except NoSuchElementException:
-                                            # Handle the case when "מקצוע אחר שאינו ברשימה" is not found in the dropdown
-                                            # You can choose to skip this subject or take any other appropriate action
-                                            raise Exception("מקצוע אחר שאינו ברשימה לא הופיע")
-                    
-                    # Find and set the units
-                    # Try to find and interact with the dropdown using standard Selenium approach
-                    try:
-                        # Wait for the dropdown to be clickable
-                        units_dropdown = WebDriverWait(miktzoa_row, 10).until(
-                            EC.element_to_be_clickable((By.ID, f"y{idx}"))
-                        )
-                        
-                        # Scroll into view
-                        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", units_dropdown)
-                        time.sleep(0.5)  # Give time for scroll to complete
-                        
-                        # Try standard Select approach
-                        select_units = Select(units_dropdown)
-                        select_units.select_by_value(unit)
-                        
-                    except Exception as e:
-                        print(f"Standard unit select failed, trying JavaScript fallback: {str(e)}")
-                        
-                        # JavaScript fallback approach
-                        js_script = f"""
-                        var select = document.getElementById('y{idx}');
-                        if(select) {{
-                            select.value = '{unit}';
-                            
-                            // Create and dispatch change event
-                            var event = new Event('change', {{ bubbles: true }});
-                            select.dispatchEvent(event);
-                            return true;
-                        }}
-                        return false;
-                        """
-                        
-                        success = driver.execute_script(js_script)
-                        if not success:
-                            print(f"JavaScript fallback also failed for dropdown y{idx}")
-                            raise
-
-                    
-                    # Find and set the score
-                    score_input = miktzoa_row.find_element(By.ID, f"G_{idx}")
-                    score_input.clear()
-                    score_input.send_keys(grade)
-                    
-                    idx += 1
-                    
-                    # Check if there are more subjects to add
-                    if idx <= len(miktzoot):
-                            # Click the "Add" button to add more subjects
-                            add_button = miktzoa_row.find_element(By.CSS_SELECTOR, "button.add_bhira")
-                            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", add_button)
-                            time.sleep(0.5)
-                            driver.execute_script("arguments[0].click();", add_button)
-                            # Wait for the new row to be added
-                            time.sleep(1)
-            
-            try:
-                # Wait for the element to be clickable (both visible and enabled)
-                psychometry_input = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.ID, "psychometry"))
-                )
-                
-                # Scroll the element into view
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", psychometry_input)
-                time.sleep(0.5)  # Give time for scroll to complete
-                
-                
-                # Try standard approach first
-                try:
-                    psychometry_input.clear()
-                    psychometry_input.send_keys(str(psycho_score))  # Convert to string to be safe
-                except Exception as e:
-                    print(f"Standard psychometry input failed, trying JavaScript fallback: {str(e)}")
-                    
-                    # JavaScript fallback for both clearing and entering text
-                    js_script = f"""
-                    var input = document.getElementById('psychometry');
-                    if(input) {{
-                        input.value = '';  // Clear first
-                        input.value = '{psycho_score}';  // Set new value
-                        
-                        // Create and dispatch input event
-                        var event = new Event('input', {{ bubbles: true }});
-                        input.dispatchEvent(event);
-                        
-                        // Also dispatch change event
-                        var changeEvent = new Event('change', {{ bubbles: true }});
-                        input.dispatchEvent(changeEvent);
-                        
-                        return true;
-                    }}
-                    return false;
-                    """
-                    
-                    success = driver.execute_script(js_script)
-                    if not success:
-                        print("JavaScript fallback also failed for psychometry input")
-                    
-            except Exception as e:
-                print(f"Failed to interact with psychometry input: {str(e)}")
-                raise
+            # Fill the mandatory and elective rows and the psychometric score with a single script
+            missing = driver.execute_script(self.BULK_FILL_SCRIPT, plan)
+            if missing:
+                raise Exception(missing)
 
             # Wait for the "חישוב סכם" button to be visible
             calculate_button_selector = 'input[value="חישוב סכם"]'
-            calculate_button = WebDriverWait(driver, 10).until(
+            calculate_button = EventWait(driver, 10).until(
                 EC.visibility_of_element_located((By.CSS_SELECTOR, calculate_button_selector))
             )
 
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", calculate_button)
-            time.sleep(0.5)
+            # let whatever the scroll renders settle
+            wait_for_dom_quiet(driver, quiet=0.05, timeout=0.5, replaces=0.5)
             driver.execute_script("arguments[0].click();", calculate_button)
             
             # Handle both types of popups that might appear
             try:
                 # First check for browser alert (this is what's causing the error)
-                alert = WebDriverWait(driver, 3).until(EC.alert_is_present())
+                alert = EventWait(driver, 3).until(EC.alert_is_present())
                 if alert:
                     alert_text = alert.text
                     alert.accept() 
             except TimeoutException:
                 
                 try:
-                    popup = WebDriverWait(driver, 3).until(
+                    popup = EventWait(driver, 3).until(
                         EC.presence_of_element_located((By.CLASS_NAME, "ui-dialog"))
                     )
                     popup_text = popup.find_element(By.CLASS_NAME, "ui-dialog-content").text
@@ -426,9 +467,8 @@ class TechnionUniversity():
                 except TimeoutException:
                     print("No UI dialog popup appeared")
             
-            # Wait for the new page to load
-            wait = WebDriverWait(driver, 10)
-            wait.until(EC.presence_of_element_located((By.CLASS_NAME, "one_line_results")))
+            # Wait for the results page to load (in the hidden frame when the calculator page is kept loaded)
+            self.calculator_page.wait_for_result(driver, (By.CLASS_NAME, "one_line_results"))
             # Find and extract the calculated sum from the new page
             calculated_sum_element = driver.find_element(By.XPATH, "//h2[contains(text(), 'הסכם לדיוני הקבלה')]")
             # Extract the text
@@ -438,10 +478,8 @@ class TechnionUniversity():
             match = re.search(r"([\d.]+)$", text)
             if match:
                 calculated_sum = float(match.group(1))
-                driver.quit()
                 return calculated_sum, None
             else:
-                driver.quit()
                 return None, "לא ניתן לחשב את הסכם שלך"
 
         except UnexpectedAlertPresentException as alert_error:
@@ -455,26 +493,87 @@ class TechnionUniversity():
                 # Try to continue after accepting the alert
                 try:
                     # Wait for the results page to load
-                    wait.until(EC.presence_of_element_located((By.CLASS_NAME, "one_line_results")))
+                    self.calculator_page.wait_for_result(driver, (By.CLASS_NAME, "one_line_results"))
                     calculated_sum_element = driver.find_element(By.XPATH, "//h2[contains(text(), 'הסכם לדיוני הקבלה')]")
                     text = calculated_sum_element.text
                     match = re.search(r"([\d.]+)$", text)
                     if match:
                         calculated_sum = float(match.group(1))
                         print("Extracted number after handling alert:", calculated_sum)
-                        driver.quit()
-                        return calculated_sum
+                        return calculated_sum, None
                 except Exception:
                     print("Could not continue after handling alert")
             except Exception as e:
                 print(f"Failed to handle alert: {e}")
-            driver.quit()
             raise Exception("שגיאה בחישוב הסכם - אירעה בעיה בטיפול בהתראה")
         except Exception as e:
             print(f"Failed to load form or interact with page: {e}")
-            driver.quit()
             raise Exception("שגיאה בחישוב הסכם - אירעה בעיה בטעינת הטופס")
 
+    # This function decides from a form snapshot what goes into every row. It returns (plan, None), or
+    # (None, message) when the units of english or math rule the applicant out
+    def plan_form_fill(self, snapshot, hs_dict, psycho_score):
+        hs_dict = dict(hs_dict)
+        mandatory = []
+        for index, row in enumerate(snapshot["mandatory"]):
+            subject_name = row["subject"]
+            if subject_name not in hs_dict:
+                continue
+            if row["units"] is None or not row["hasInput"]:
+                raise Exception("מקצועות חובה לא הופיעו")
+            score, units = hs_dict.pop(subject_name)
+            if ((subject_name == "אנגלית" or subject_name == "מתמטיקה") and int(units) < 4):
+                return None, f"דחייה בגלל מספר יחידות לא מספק ב{subject_name}. בטכניון נדרש מינימום 4 יחידות."
+            mandatory.append([index, str(units), str(score)])
+
+        # the remaining subjects go to the elective rows, in order
+        electives = []
+        idx = 1
+        for hs_miktzoa, (grade, unit) in hs_dict.items():
+            if hs_miktzoa in snapshot["electiveSubjects"]:
+                subject_text = hs_miktzoa
+            elif "מקצוע אחר שאינו ברשימה" in snapshot["electiveSubjects"]:
+                subject_text = "מקצוע אחר שאינו ברשימה"
+            else:
+                raise Exception("מקצוע אחר שאינו ברשימה לא הופיע")
+            electives.append([idx, subject_text, str(unit), str(grade), idx + 1 <= snapshot["electiveRows"]])
+            idx += 1
+
+        return {"mandatory": mandatory, "electives": electives, "psychometry": str(psycho_score)}, None
+
+    # This function checks that the rows parsed from the calculator's html hold the requested subjects the
+    # way the browser sees them: the required subjects as mandatory rows, every subject on exactly one row
+    # and every units value one the row's select offers. A parse that misread the form raises ValueError,
+    # so the HTTP tier gives the request to the browser instead of posting a wrong form
+    def check_parsed_rows(self, snapshot, plan, hs_dict):
+        mandatory_subjects = [row["subject"] for row in snapshot["mandatory"]]
+        for subject in SekemEngine.REQUIRED_SUBJECTS:
+            if subject not in mandatory_subjects:
+                raise ValueError(f"the parsed calculator has no mandatory row for {subject}")
+        if not snapshot["electiveRows"] or not snapshot["electiveSubjects"]:
+            raise ValueError("the parsed calculator has no elective rows")
+
+        planned = [mandatory_subjects[index] for index, _, _ in plan["mandatory"]]
+        if len(set(planned)) != len(planned) or len(planned) + len(plan["electives"]) != len(hs_dict):
+            raise ValueError("the parsed calculator rows don't match the requested subjects")
+        if len(plan["electives"]) > snapshot["electiveRows"]:
+            raise ValueError(f"{len(plan['electives'])} electives requested, the parsed calculator has {snapshot['electiveRows']} rows")
+
+        for index, units, _ in plan["mandatory"]:
+            if units not in snapshot["mandatory"][index]["units"]:
+                raise ValueError(f"{mandatory_subjects[index]} has no {units} units option in the parsed calculator")
+
+    # This function maps the high school subject names to the Technion's names
+    def map_highschool_subjects(self, hs_dict_original):
+        hs_dict = {}
+        for subject, values in hs_dict_original.items():
+            if subject in self.highschool_subject_name_dict:
+                technion_subject = self.highschool_subject_name_dict[subject]
+                hs_dict[technion_subject] = values
+            else:
+                hs_dict[subject] = values
+        return hs_dict
+
     def check_if_accepted(self, calculated_sum, inputJson):
         if calculated_sum is None:
             return None, "לא ניתן לחשב את הסכם שלך"
@@ -488,12 +587,90 @@ class TechnionUniversity():
             return "קבלה", None
 
 
-    def exit(self, driver, exit_msg):
-        print(exit_msg)
-        driver.quit()
+    ### async engine ###
+
+    # This method is the asyncio version of run, it drives the calculator through the async CDP engine
+    async def run_async(self, data, browser):
+        url = "https://admissions.technion.ac.il/sechem-for-admission/sekem/"
+        rejection = self.check_degree(data, url)
+        if rejection:
+            return self.tiers.report(rejection)
+
+        # the same tiers as compute_match_score, the HTTP client runs in the loop's executor so the blocking
+        # client doesn't stall the other pages
+        engine_result = self.compute_engine_score(data)
+        result = await self.tiers.resolve_async("sekem", [
+            ("engine", self.tiers.engine_tier(engine_result, self.engine_validator)),
+            ("http", (lambda: asyncio.get_running_loop().run_in_executor(
+                None, self.get_tech_match_score_http, dict(data))) if http_enabled() else None),
+            ("browser", lambda: self.get_tech_match_score_async(data, browser)),
+        ])
+        self.tiers.validate("sekem", self.engine_validator, engine_result, result, key=lambda answer: answer[0])
+        return self.tiers.report(self.build_response(*result, data, url))
+
+    async def get_tech_match_score_async(self, inputJson, browser):
+        async with browser.page() as page:
+            await page.goto(self.calculator_page.url, "form[name='sehem_table'] .technion-calculator")
+            try:
+                return await self.fill_tech_calculator_async(page, inputJson)
+            except Exception as e:
+                print(f"Failed to load form or interact with page: {e}")
+                raise Exception("שגיאה בחישוב הסכם - אירעה בעיה בטעינת הטופס")
+
+    # This function is the async version of fill_tech_calculator
+    async def fill_tech_calculator_async(self, page, inputJson):
+        psycho_score = inputJson["psycho_score"]
+        hs_dict = self.map_highschool_subjects(inputJson["highschool_scores"])
+
+        # open the bagrut tables, read the form and fill it, like the Selenium flow
+        await page.evaluate("window.onbeforeunload = null; document.getElementById('bagrotYes').click();")
+        await page.wait_for_selector("#bagrotForm .two-column-table tbody tr th[id]")
+        snapshot = await page.evaluate(self.FORM_SNAPSHOT_SCRIPT)
+        plan, error_message = self.plan_form_fill(snapshot, hs_dict, psycho_score)
+        if error_message:
+            return None, error_message
+        missing = await page.evaluate(self.BULK_FILL_SCRIPT, plan)
+        if missing:
+            raise Exception(missing)
+
+        # calculate
+        await page.click('input[value="חישוב סכם"]')
+
+        # alerts are accepted by the page itself, the jQuery UI dialog about math units needs its OK button
+        state = await page.wait_for("""
+            if (document.querySelector('.one_line_results')) { return 'results'; }
+            var dialog = document.querySelector('.ui-dialog');
+            if (dialog && dialog.offsetParent !== null) { return 'dialog'; }
+            return null;
+        """)
+        for alert_text in page.dialogs:
+            print(f"Handled alert: {alert_text}")
+        if state == "dialog":
+            await page.evaluate("""
+                var dialog = document.querySelector('.ui-dialog');
+                var text = dialog.querySelector('.ui-dialog-content').innerText;
+                if (text.indexOf('4 יחידות') !== -1 && text.indexOf('מתמטיקה') !== -1) {
+                    dialog.querySelector('.ui-button').click();
+                }
+            """)
+            await page.wait_for_selector(".one_line_results")
+
+        # extract the calculated sum from the results page
+        text = await page.evaluate("""
+            var headers = document.querySelectorAll('h2');
+            for (var i = 0; i < headers.length; i++) {
+                if (headers[i].textContent.indexOf('הסכם לדיוני הקבלה') !== -1) { return headers[i].innerText.trim(); }
+            }
+            return '';
+        """)
+        match = re.search(r"([\d.]+)$", text)
+        if match:
+            return float(match.group(1)), None
+        return None, "לא ניתן לחשב את הסכם שלך"
+
 
 if __name__ == '__main__':
-    service = Service("/Users/ophirp/Downloads/chromedriver-mac-arm64/chromedriver")
+    service = create_chrome_service()
     options = Options()
     options.add_argument("--headless")  # Run in headless mode (no GUI)
     uni = TechnionUniversity(service, options)
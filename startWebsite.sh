@@ -21,6 +21,7 @@ start_backend() {
     local backend_dir=$1
     local pid_file=$2
     local server_name=$3
+    local script=${4:-app.py}
     local max_retries=3
     local retry_delay=2
     
@@ -28,7 +29,7 @@ start_backend() {
         echo "Starting $server_name (attempt $attempt/$max_retries)..."
         
         cd "$backend_dir"
-        $PYTHON_CMD app.py & 
+        $PYTHON_CMD $script & 
         local pid=$!
         echo $pid > "../$pid_file"
         
@@ -54,6 +55,15 @@ start_backend() {
     return 1
 }
 
+# Resolve chromedriver once so every backend starts from the cached driver path
+$PYTHON_CMD Backend_common/driver_resolver.py || echo "⚠️ chromedriver could not be resolved ahead of the backends"
+
+# Start the machine-wide browser broker first when it is enabled in config.json
+BROKER_ENABLED=$($PYTHON_CMD -c "import json; print(json.load(open('config.json')).get('browser_broker', {}).get('enabled', False))")
+if [[ "$BROKER_ENABLED" == "True" ]]; then
+    start_backend "Backend_common" "backend_broker.pid" "Browser Broker" "browser_broker.py"
+fi
+
 # Start backend servers with retry mechanism
 start_backend "Backend_Hebrew_university" "backend_hu.pid" "Hebrew University Backend"
 start_backend "Backend_technion" "backend_technion.pid" "Technion Backend"
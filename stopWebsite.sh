@@ -1,6 +1,6 @@
 #!/bin/bash
 
-for pidfile in backend_hu.pid backend_technion.pid backend_bgu.pid backend_ta.pid; do
+for pidfile in backend_hu.pid backend_technion.pid backend_bgu.pid backend_ta.pid backend_broker.pid; do
     if [[ -f $pidfile ]]; then
         PID=$(cat $pidfile)
         if kill -0 $PID 2>/dev/null; then
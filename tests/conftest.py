@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The backends import each other's modules through sys.path, as their app.py files do
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ("Backend_common", "Backend-BGU", "Backend-TelAvivUniversity", "Backend_Hebrew_university",
+                  "Backend_technion"):
+    sys.path.insert(0, os.path.join(ROOT, directory))
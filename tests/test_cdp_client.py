@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+pytest.importorskip("websocket")
+from cdp_client import CDPConnection, CDPError
+
+
+class FakeSocket:
+    """A DevTools websocket that answers every command after the events queued for it"""
+
+    def __init__(self, events=None, errors=None):
+        self.sent = []
+        self.incoming = []
+        self.events = events or []
+        self.errors = errors or {}
+
+    def send(self, text):
+        command = json.loads(text)
+        self.sent.append(command)
+        self.incoming += [json.dumps(event) for event in self.events]
+        self.events = []
+        if command["method"] in self.errors:
+            self.incoming.append(json.dumps({"id": command["id"], "error": {"message": self.errors[command["method"]]}}))
+        else:
+            self.incoming.append(json.dumps({"id": command["id"], "result": {"method": command["method"]}}))
+
+    def recv(self):
+        return self.incoming.pop(0)
+
+    def settimeout(self, timeout):
+        pass
+
+    def close(self):
+        pass
+
+
+def connected(socket, **kwargs):
+    connection = CDPConnection("ws://devtools", **kwargs)
+    connection._socket = socket
+    return connection
+
+
+def test_commands_are_numbered_and_matched_to_their_response():
+    socket = FakeSocket(events=[{"method": "Page.loadEventFired", "params": {}}])
+    connection = connected(socket)
+    assert connection.send("Page.enable") == {"method": "Page.enable"}
+    assert connection.send("Runtime.evaluate", {"expression": "1"}, session_id="S") == {"method": "Runtime.evaluate"}
+    assert socket.sent == [{"id": 1, "method": "Page.enable", "params": {}},
+                           {"id": 2, "method": "Runtime.evaluate", "params": {"expression": "1"}, "sessionId": "S"}]
+
+
+def test_protocol_errors_raise():
+    connection = connected(FakeSocket(errors={"Page.navigate": "Cannot navigate"}))
+    with pytest.raises(CDPError, match="Cannot navigate"):
+        connection.send("Page.navigate", {"url": "about:blank"})
+
+
+def test_events_are_dropped_unless_kept():
+    event = {"method": "Page.lifecycleEvent", "params": {"name": "networkIdle", "frameId": "F"}}
+    dropping = connected(FakeSocket(events=[event]))
+    dropping.send("Page.setLifecycleEventsEnabled", {"enabled": True})
+    assert not dropping._events
+
+    keeping = connected(FakeSocket(events=[{"method": "Page.lifecycleEvent", "params": {"name": "load"}}, event]),
+                        keep_events=True)
+    keeping.send("Page.setLifecycleEventsEnabled", {"enabled": True})
+    assert keeping.wait_for_event("Page.lifecycleEvent", lambda params: params["name"] == "networkIdle",
+                                  timeout=1) == event["params"]
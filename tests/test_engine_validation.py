@@ -0,0 +1,158 @@
+import asyncio
+import json
+
+import pytest
+
+from engine_validation import EngineValidator
+from sechem_engine import ThresholdTable
+from tier_resolver import TierResolver, ThresholdCache
+
+VALIDATOR_CONFIG = {"enabled": True, "trust_after": 3, "validate_every": 2, "tolerance": 0.01}
+
+
+# === EngineValidator ===
+def test_validator_trusts_only_after_consecutive_matches():
+    validator = EngineValidator("test", dict(VALIDATOR_CONFIG))
+    for _ in range(2):
+        assert validator.should_validate()
+        assert validator.record(95.0, "95.00")
+    assert not validator.trusted
+    validator.record(95.0, 95.004)
+    assert validator.trusted
+
+
+def test_validator_mismatch_resets_the_streak():
+    validator = EngineValidator("test", dict(VALIDATOR_CONFIG))
+    for _ in range(3):
+        validator.record(1, 1)
+    assert not validator.record(1, 2)
+    assert not validator.trusted
+    assert validator.stats()["streak"] == 0
+    assert validator.stats()["last_mismatch"] == {"engine": 1, "site": 2}
+
+
+def test_validator_samples_every_nth_request_once_trusted():
+    validator = EngineValidator("test", dict(VALIDATOR_CONFIG))
+    for _ in range(3):
+        validator.record(1, 1)
+    assert [validator.should_validate() for _ in range(4)] == [False, True, False, True]
+
+
+def test_validator_ignores_requests_without_a_number_on_either_side():
+    validator = EngineValidator("test", dict(VALIDATOR_CONFIG))
+    assert not validator.record(None, 95)
+    assert not validator.record(95, None)
+    assert validator.stats()["validated"] == 0
+
+
+def test_validator_matches_numbers_and_non_empty_dicts_only():
+    validator = EngineValidator("test", dict(VALIDATOR_CONFIG))
+    assert validator.matches({"a": 1, "b": 0}, {"a": 1.0, "b": 0})
+    assert not validator.matches({"a": 1}, {"a": 1, "b": 0})
+    assert not validator.matches({}, {})
+    assert not validator.matches("קבלה", "קבלה")
+
+
+def test_disabled_validator_sends_every_request_to_the_site():
+    validator = EngineValidator("test", dict(VALIDATOR_CONFIG, enabled=False))
+    validator.trusted = True
+    assert all(validator.should_validate() for _ in range(5))
+
+
+# === ThresholdTable ===
+def test_published_threshold_decides_alone(tmp_path):
+    table = ThresholdTable(str(tmp_path / "bounds.json"), {"כלכלה": 100})
+    assert table.verdict("כלכלה", 100) is True
+    assert table.verdict("כלכלה", 99.9) is False
+
+
+def test_learned_bounds_leave_the_gap_to_the_browser(tmp_path):
+    path = tmp_path / "bounds.json"
+    table = ThresholdTable(str(path))
+    assert table.verdict("הנדסה", 100) is None
+    table.learn({"הנדסה": (110, True)})
+    table.learn({"הנדסה": (90, False)})
+    assert table.verdict("הנדסה", 110) is True
+    assert table.verdict("הנדסה", 90) is False
+    assert table.verdict("הנדסה", 100) is None
+    # the bounds are kept for the next process
+    assert json.loads(path.read_text(encoding="utf-8")) == {"הנדסה": {"accepted": 110, "rejected": 90}}
+    assert ThresholdTable(str(path)).verdict("הנדסה", 111) is True
+
+
+def test_crossed_bounds_start_over(tmp_path):
+    table = ThresholdTable(str(tmp_path / "bounds.json"))
+    table.learn({"הנדסה": (110, True)})
+    table.learn({"הנדסה": (120, False)})
+    # only the run that crossed them is kept
+    assert table.verdict("הנדסה", 120) is False
+    assert table.verdict("הנדסה", 200) is None
+
+
+# === TierResolver ===
+def failing():
+    raise RuntimeError("down")
+
+
+def test_resolver_skips_missing_unanswered_and_failing_tiers():
+    tiers = TierResolver("test")
+    answer = tiers.resolve("step", [("engine", None), ("threshold", lambda: None), ("http", failing),
+                                    ("browser", lambda: "browser answer")])
+    assert answer == "browser answer"
+    assert tiers.steps == {"step": "browser"}
+
+
+def test_resolver_raises_the_last_tiers_error():
+    with pytest.raises(RuntimeError):
+        TierResolver("test").resolve("step", [("engine", lambda: None), ("browser", failing)])
+
+
+def test_resolver_reports_the_most_expensive_step():
+    tiers = TierResolver("test")
+    tiers.resolve("bagrut", [("engine", lambda: 1)])
+    tiers.resolve("thresholds", [("engine", lambda: None), ("http", lambda: 2)])
+    assert tiers.report({"isAccepted": "קבלה"}) == {"isAccepted": "קבלה", "tier": "http",
+                                                      "tiers": {"bagrut": "engine", "thresholds": "http"}}
+
+
+def test_engine_tier_defers_to_the_validator():
+    validator = EngineValidator("test", dict(VALIDATOR_CONFIG))
+    tiers = TierResolver("test")
+    assert tiers.engine_tier(None, validator) is None
+    # an untrusted engine sends the request on, and its answer is checked against the site's
+    answer = tiers.resolve("step", [("engine", tiers.engine_tier(5, validator)), ("browser", lambda: 5)])
+    tiers.validate("step", validator, 5, answer)
+    assert validator.stats()["validated"] == 1
+
+
+def test_validate_skips_steps_the_engine_answered():
+    validator = EngineValidator("test", dict(VALIDATOR_CONFIG))
+    tiers = TierResolver("test")
+    tiers.resolve("step", [("engine", lambda: 5)])
+    tiers.validate("step", validator, 5, 5)
+    assert validator.stats()["validated"] == 0
+
+
+def test_resolve_async_awaits_coroutines_and_futures():
+    async def browser():
+        return "async answer"
+
+    async def run():
+        tiers = TierResolver("test")
+        loop = asyncio.get_running_loop()
+        first = await tiers.resolve_async("a", [("http", lambda: loop.run_in_executor(None, lambda: None)),
+                                                ("browser", browser)])
+        second = await tiers.resolve_async("b", [("http", lambda: loop.run_in_executor(None, lambda: 7))])
+        return first, second, tiers.steps
+
+    assert asyncio.run(run()) == ("async answer", 7, {"a": "browser", "b": "http"})
+
+
+def test_threshold_cache_expires_after_its_ttl():
+    cache = ThresholdCache(ttl=60)
+    cache.put("url", (80, 70))
+    assert cache.get("url") == (80, 70)
+    assert cache.get("other") is None
+    expired = ThresholdCache(ttl=-1)
+    expired.put("url", (80, 70))
+    assert expired.get("url") is None
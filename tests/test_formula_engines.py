@@ -0,0 +1,120 @@
+import pytest
+
+from sekem_engine import SekemEngine
+from bagrut_engine import BagrutEngine
+from huji_engine import HujiEngine
+from sechem_engine import SechemEngine
+
+BONUS_TABLES = {"bonus": {"4": 12.5, "5": 25}, "math_bonus": {"4": 12.5, "5": 35}, "min_bonus_grade": 60,
+                "drop_lowering_electives": True, "decimals": 2}
+
+
+# === Technion sekem ===
+SEKEM_CONFIG = {"bagrut_weight": 0.5, "psychometric_weight": 0.075, "offset": -19.5,
+                "bonus": {"5": 25, "4": 12.5}, "math_bonus": {"5": 35, "4": 15}, "min_bonus_grade": 60,
+                "decimals": 3}
+
+
+def test_sekem_weights_the_bonused_grades_by_units():
+    engine = SekemEngine(SEKEM_CONFIG)
+    hs_dict = {"מתמטיקה": (90, 5), "אנגלית": (80, 5), "פיזיקה": (70, 4), "ערבית": (50, 3)}
+    # (125 * 5 + 105 * 5 + 82.5 * 4 + 50 * 3) / 17, arabic has no bonus
+    assert engine.bagrut_average(hs_dict) == pytest.approx(1630 / 17)
+    assert engine.compute(hs_dict, 700) == (round(0.5 * 1630 / 17 + 0.075 * 700 - 19.5, 3), None)
+
+
+def test_sekem_gives_no_bonus_below_the_minimum_grade():
+    engine = SekemEngine(SEKEM_CONFIG)
+    assert engine.bonus("מתמטיקה", 5, 59) == 0
+    assert engine.bonus("מתמטיקה", 5, 60) == 35
+    assert engine.bonus("ערבית", 5, 90) == 0
+
+
+def test_sekem_rejects_missing_or_low_required_subjects():
+    engine = SekemEngine(SEKEM_CONFIG)
+    total, message = engine.compute({"מתמטיקה": (90, 5)}, 700)
+    assert total is None and "אנגלית" in message
+    total, message = engine.compute({"מתמטיקה": (90, 5), "אנגלית": (90, 3)}, 700)
+    assert total is None and "4 יחידות" in message
+
+
+# === TAU Bagrut.aspx ===
+def test_tau_bagrut_drops_the_electives_that_lower_the_average():
+    engine = BagrutEngine(BONUS_TABLES)
+    scores = {"מתמטיקה": (80, 5), "אנגלית": (90, 4), "כימיה": (100, 5)}
+    # mandatory 115 * 5 + 102.5 * 4, chemistry at 125 raises the average, the special 95 would lower it
+    assert engine.average(scores, [(95, 2)]) == "115.00"
+
+
+def test_tau_bagrut_keeps_every_subject_without_dropping():
+    engine = BagrutEngine(dict(BONUS_TABLES, drop_lowering_electives=False))
+    scores = {"מתמטיקה": (80, 5), "אנגלית": (90, 4), "כימיה": (100, 5)}
+    assert engine.average(scores, [(95, 2)]) == "112.50"
+
+
+def test_tau_bagrut_without_subjects_raises():
+    with pytest.raises(ValueError):
+        BagrutEngine(BONUS_TABLES).average({}, [])
+
+
+# === HUJI bagrut calculator and emphases ===
+def test_huji_average_skips_subjects_and_lowering_electives():
+    engine = HujiEngine(["אנגלית", "מתמטיקה"], ["קולנוע"], BONUS_TABLES)
+    hs_dict = {"מתמטיקה": (90, 5), "אנגלית": (80, 4), "קולנוע": (100, 5), "ביולוגיה": (70, 5)}
+    assert engine.average(hs_dict) == ("110.56", None)
+
+
+def test_huji_average_rejects_english_below_four_units():
+    engine = HujiEngine(["אנגלית"], [], BONUS_TABLES)
+    assert engine.average({"אנגלית": (100, 3)}) == (None, HujiEngine.ENGLISH_UNITS_MSG)
+
+
+def test_huji_emphases_move_the_total_by_the_weighted_sections():
+    engine = HujiEngine([], [], BONUS_TABLES)
+    assert engine.emphases(700, 130, 140, 120) == {"verbal_emphasis": 700, "quant_emphasis": 721,
+                                                   "multi_emphasis": 711}
+    # clamped to the psychometric scale
+    assert engine.emphases(790, 80, 150, 80)["quant_emphasis"] == 800
+
+
+def test_huji_batch_matches_the_single_applicant_emphases():
+    engine = HujiEngine([], [], BONUS_TABLES)
+    applicants = [(700, 130, 140, 120), (550, 100, 120, 110), (790, 80, 150, 80)]
+    batch = engine.emphases_batch(*zip(*applicants))
+    for index, scores in enumerate(applicants):
+        assert {key: values[index] for key, values in batch.items()} == engine.emphases(*scores)
+
+
+def test_huji_batch_takes_the_averages_of_another_tier():
+    engine = HujiEngine(["אנגלית", "מתמטיקה"], [], BONUS_TABLES)
+    applicant = {"highschool_scores": {"מתמטיקה": (90, 5)}, "psycho_score": 700, "psycho_hebrew": 130,
+                 "psycho_math": 140, "psycho_english": 120}
+    assert engine.score_batch([applicant])[0]["average"] == "125.00"
+    result = engine.score_batch([applicant], average=lambda hs_dict: ("99.00", None))[0]
+    assert result["average"] == "99.00" and result["emphases"] == engine.emphases(700, 130, 140, 120)
+
+
+# === BGU average and sechem ===
+SECHEM_CONFIG = {"bonus": {"4": 10, "5": 20}, "math_bonus": {"4": 10, "5": 30}, "min_bonus_grade": 60,
+                 "drop_lowering_electives": True, "decimals": 2,
+                 "science_bonus": {"4": 2, "5": 4}, "science_bonus_cap": 8,
+                 "formulas": {
+                     "default": {"bagrut": 0.5, "psychometric": 0.075, "section": "total", "science_bonus": 1,
+                                 "offset": 0},
+                     "הנדסה": {"bagrut": 0.4, "psychometric": 0.1, "section": "quantitative", "science_bonus": 0,
+                               "offset": -10}}}
+SECHEM_SCORES = {"מתמטיקה": (90, 5), "אנגלית": (80, 5), "פיזיקה": (95, 5), "כימיה": (90, 5)}
+
+
+def test_bgu_average_and_capped_science_bonus():
+    engine = SechemEngine(("פיזיקה", "כימיה"), SECHEM_CONFIG)
+    assert engine.average(SECHEM_SCORES) == 111.67
+    assert engine.science_bonus(SECHEM_SCORES) == 8
+
+
+def test_bgu_sechem_per_degree_formula():
+    engine = SechemEngine(("פיזיקה", "כימיה"), SECHEM_CONFIG)
+    average, sechems = engine.sechems(SECHEM_SCORES, {"total": 700, "quantitative": 140}, ["כלכלה", "הנדסה"])
+    assert average == 111.67
+    assert sechems["כלכלה"] == round(0.5 * 111.67 + 0.075 * 700 + 8, 3)
+    assert sechems["הנדסה"] == round(0.4 * 111.67 + 0.1 * 140 - 10, 3)
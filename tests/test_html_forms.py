@@ -0,0 +1,74 @@
+from html_forms import parse_forms, parse_rows, submit_action, ElementTextParser
+
+ASPX_PAGE = """
+<form name="aspnetForm" method="post" action="./Bagrut.aspx" id="aspnetForm">
+  <input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="abc" />
+  <input type="hidden" name="__EVENTVALIDATION" value="xyz" />
+  <input type="text" name="grade1" id="grade1" value="" />
+  <input type="text" name="locked" value="1" disabled />
+  <input type="checkbox" name="agree" checked />
+  <input type="checkbox" name="newsletter" value="yes" />
+  <select name="units1" id="units1">
+    <option value="3">3 יח"ל</option>
+    <option value="5" selected>5 יח"ל</option>
+  </select>
+  <select name="track"><option>ראשון</option><option>שני</option></select>
+  <textarea name="notes">hello  there</textarea>
+  <input type="submit" name="btnCalc" value="חשב"
+         onclick="WebForm_DoPostBackWithOptions(new WebForm_PostBackOptions(&quot;btnCalc&quot;, &quot;&quot;, true, &quot;&quot;, &quot;Bagrut_T.aspx&quot;, false, false))" />
+</form>
+"""
+
+
+def test_form_fields_are_read_the_way_a_browser_posts_them():
+    form = parse_forms(ASPX_PAGE)[0]
+    assert form["method"] == "post"
+    assert form["fields"] == [("__VIEWSTATE", "abc"), ("__EVENTVALIDATION", "xyz"), ("grade1", ""), ("agree", "on"),
+                              ("units1", "5"), ("track", "ראשון"), ("notes", "hello  there")]
+    assert form["options"]["units1"] == [("3", '3 יח"ל'), ("5", '5 יח"ל')]
+    assert form["ids"]["__VIEWSTATE"] == ("__VIEWSTATE", "hidden", "abc")
+    assert form["ids"]["units1"] == ("units1", "select", None)
+
+
+def test_cross_page_postback_moves_the_action():
+    form = parse_forms(ASPX_PAGE)[0]
+    submit = form["submits"][0]
+    assert submit["name"] == "btnCalc"
+    assert submit_action(form, submit) == "Bagrut_T.aspx"
+    assert submit_action(form) == "./Bagrut.aspx"
+
+
+def test_rows_of_a_container_with_their_inputs():
+    html = """
+    <table><tr><td>outside</td></tr></table>
+    <div class="trtblscont"><table>
+      <tr><td><input name="g1"></td><td><select name="u1"></select></td><td> אנגלית </td></tr>
+      <tr><td>inner<table><tr><td>nested</td></tr></table></td><td>after</td></tr>
+    </table></div>
+    """
+    rows = parse_rows(html, container_class="trtblscont")
+    assert rows[0] == [{"text": "", "inputs": ["g1"]}, {"text": "", "inputs": ["u1"]}, {"text": "אנגלית", "inputs": []}]
+    assert [cell["text"] for cell in rows[1]] == ["inner", "after"]
+    assert rows[2] == [{"text": "nested", "inputs": []}]
+
+
+def test_rows_by_class_survive_missing_end_tags():
+    html = '<table><tr class="rowalter"><td>a<td>b<td> 101.5 </table><tr><td>other</td></tr>'
+    assert parse_rows(html, row_class="rowalter") == [[{"text": "a", "inputs": []}, {"text": "b", "inputs": []},
+                                                       {"text": "101.5", "inputs": []}]]
+
+
+def test_element_text_parser_stops_once_every_id_is_read():
+    parser = ElementTextParser(["acceptanceThreshold", "rejectionThreshold"])
+    chunks = ['<div id="acceptanceThreshold"> 7', '20 </div><span id="rejec', 'tionThreshold">680</span>',
+              "<p>never parsed</p>"]
+    done = [parser.consume(chunk) for chunk in chunks[:3]]
+    assert done == [False, False, True]
+    assert parser.texts == {"acceptanceThreshold": "720", "rejectionThreshold": "680"}
+
+
+def test_element_text_parser_reads_values_from_scripts():
+    parser = ElementTextParser(["acceptanceThreshold"])
+    parser.consume('<div id="acceptanceThreshold"></div><script>var data = {"acceptanceThreshold": 715};</script>')
+    assert not parser.complete()
+    assert parser.script_value("acceptanceThreshold") == "715"